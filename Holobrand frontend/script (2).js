@@ -12,6 +12,16 @@ window.addEventListener("DOMContentLoaded", () => {
   document.getElementById('generateLayoutBtn').addEventListener('click', submitForm);
 });
 
+// Identifies this browser to the server, which keeps its recent layouts for follow-up previews
+function clientId() {
+  let id = localStorage.getItem('holobrandClientId');
+  if (!id) {
+    id = crypto.randomUUID();
+    localStorage.setItem('holobrandClientId', id);
+  }
+  return id;
+}
+
 // Export submitForm to make it globally available
 window.submitForm = async function submitForm() {
   const formData = new FormData();
@@ -40,6 +50,7 @@ window.submitForm = async function submitForm() {
     // Use the config.apiUrl and change to the endpoint that exists in your Flask app
     const response = await fetch(`${config.apiUrl}/api/generate-layout`, {
       method: 'POST',
+      headers: { 'X-Client-Id': clientId() },
       body: formData
       // No need to set Content-Type header as the browser will set it correctly for FormData
     });
@@ -53,7 +64,9 @@ window.submitForm = async function submitForm() {
       resultMessage.textContent = 'Layout generated successfully! Opening preview...';
       // Store the layout data in sessionStorage so it can be accessed by the preview page
       sessionStorage.setItem('generatedLayout', JSON.stringify(result));
-      setTimeout(() => window.open(`${config.apiUrl}/preview`, '_blank'), 1000);
+      // Stored layouts get a short preview link; fall back to the plain preview page
+      const previewPath = result.preview_url || '/preview';
+      setTimeout(() => window.open(`${config.apiUrl}${previewPath}`, '_blank'), 1000);
     } else {
       resultMessage.textContent = 'Generation failed. Please try again.';
     }
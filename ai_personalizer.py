@@ -3,12 +3,16 @@ import json
 import math
 from typing import Dict, Any, List, Optional
 from openai_utils import OpenAIPersonalizer
+from resilience_utils import LatencyBudget
+from style_library import default_library, style_prompt_for
+from timing_utils import timed
 
 class AIPersonalizationEngine:
     """Enhanced AI personalization engine for HoloBrand layouts"""
     
     def __init__(self):
         self.openai_personalizer = OpenAIPersonalizer()
+        self.style_library = default_library()
         self.style_mappings = {
             'elegant': ['luxury', 'premium', 'sophisticated', 'high-end', 'classy'],
             'modern': ['contemporary', 'sleek', 'tech', 'innovative', 'cutting-edge'],
@@ -19,6 +23,7 @@ class AIPersonalizationEngine:
             'fitness', 'automotive', 'jewelry', 'furniture', 'art'
         ]
     
+    @timed('personalize.analyze')
     def analyze_product_image(self, image_features: Dict[str, Any]) -> Dict[str, Any]:
         """Perform advanced analysis on product image features"""
         dominant_colors = image_features.get('dominant_colors', [])
@@ -124,10 +129,13 @@ class AIPersonalizationEngine:
             'count': len(colors)
         }
     
-    def enhance_3d_layout(self, layout_data: Dict[str, Any], image_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Enhance 3D layout based on AI analysis"""
+    @timed('personalize.enhance')
+    def enhance_3d_layout(self, layout_data: Dict[str, Any], image_analysis: Optional[Dict[str, Any]] = None,
+                          budget: Optional[LatencyBudget] = None) -> Dict[str, Any]:
+        """Enhance 3D layout based on AI analysis, keeping the OpenAI step within the latency budget"""
         enhanced_layout = layout_data.copy()
-        template = enhanced_layout.get('template', 'modern')
+        template = enhanced_layout.get('template') or enhanced_layout.get('metadata', {}).get('template', 'modern')
+        category = (image_analysis or {}).get('suggested_category', 'general')
         
         # Apply enhancements based on template and image analysis
         if image_analysis:
@@ -149,22 +157,34 @@ class AIPersonalizationEngine:
                     enhanced_layout['camera']['field_of_view'] = 55  # Narrower for complex layouts
                     enhanced_layout['camera']['depth_of_field'] = True  # Add depth of field for complex scenes
         
-        # Add AI-generated suggestions
-        if os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_KEY") != "your_api_key_here":
+        # Serve precomputed style descriptions without a network call; no AI ran for this request
+        style_description = self.style_library.get(template, category)
+        if style_description:
+            if 'metadata' in enhanced_layout:
+                enhanced_layout['metadata']['style_description'] = style_description
+                enhanced_layout['metadata']['style_source'] = 'library'
+                enhanced_layout['metadata']['ai_enhanced'] = False
+        # Fall back to live generation for combinations outside the library
+        elif os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_KEY") != "your_api_key_here":
             try:
                 # Get style description from OpenAI
-                style_prompt = f"A {template} style 3D layout for e-commerce"
-                style_description = self.openai_personalizer.generate_style_description(style_prompt)
+                style_prompt = style_prompt_for(template, category)
+                style_description = self.openai_personalizer.request_style_description(style_prompt, budget)
                 
                 # Add to layout metadata
                 if 'metadata' in enhanced_layout:
                     enhanced_layout['metadata']['style_description'] = style_description
+                    enhanced_layout['metadata']['style_source'] = 'openai'
                     enhanced_layout['metadata']['ai_enhanced'] = True
             except Exception as e:
                 print(f"OpenAI enhancement failed: {str(e)}")
+                # Slow, failing or circuit-broken OpenAI: mark the layout as not AI enhanced
+                if 'metadata' in enhanced_layout:
+                    enhanced_layout['metadata']['ai_enhanced'] = False
         
         return enhanced_layout
     
+    @timed('personalize.interactive')
     def generate_interactive_elements(self, layout_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate interactive elements for 3D layout with dynamic positioning and template-based interactions"""
         if not isinstance(layout_data, dict) or 'layout' not in layout_data or 'sections' not in layout_data['layout']:
@@ -1,13 +1,21 @@
+import io
 import os
-import cv2
-import numpy as np
-from PIL import Image
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, TYPE_CHECKING
 import json
 
+from timing_utils import stage, timed
+
+# OpenCV and NumPy are imported on first use; they dominate app import time
+if TYPE_CHECKING:
+    import numpy as np
+
+# A small, highly compressible file can decode to gigabytes; 25 megapixels is about 75MB decoded
+DEFAULT_MAX_PIXELS = 25_000_000
+
 class AIProcessor:
     def __init__(self):
         self.image_size = (512, 512)
+        self.max_pixels = int(os.getenv('IMAGE_MAX_PIXELS', str(DEFAULT_MAX_PIXELS)))
         self.style_features = {
             'elegant': ['symmetry', 'minimal', 'luxury'],
             'modern': ['asymmetric', 'bold', 'dynamic'],
@@ -16,26 +24,56 @@ class AIProcessor:
 
     def process_image(self, image_path: str) -> Dict[str, Any]:
         """Process uploaded product image and extract features"""
+        import cv2
         try:
             # Read and preprocess image
-            image = cv2.imread(image_path)
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            image = cv2.resize(image, self.image_size)
-
-            # Extract basic image features
-            features = {
-                'dimensions': image.shape,
-                'dominant_colors': self._extract_dominant_colors(image),
-                'brightness': np.mean(image),
-                'contrast': np.std(image)
-            }
+            with stage('image.decode'):
+                image = cv2.imread(image_path)
+            return self._analyze_image(image)
+        except Exception as e:
+            raise Exception(f'Error processing image: {str(e)}')
 
-            return features
+    def process_image_bytes(self, data: bytes) -> Dict[str, Any]:
+        """Extract features from an encoded image held in memory (no temporary file)"""
+        import cv2
+        import numpy as np
+        from PIL import Image
+        try:
+            # Only the header is parsed here, so oversized images are skipped before decoding
+            width, height = Image.open(io.BytesIO(data)).size
+            if width * height > self.max_pixels:
+                raise ValueError(f'image is {width}x{height} pixels, above the {self.max_pixels} pixel limit')
+            with stage('image.decode'):
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError('unsupported or corrupt image data')
+            return self._analyze_image(image)
         except Exception as e:
             raise Exception(f'Error processing image: {str(e)}')
 
-    def _extract_dominant_colors(self, image: np.ndarray, num_colors: int = 3) -> List[str]:
+    def _analyze_image(self, image: 'np.ndarray') -> Dict[str, Any]:
+        import cv2
+        import numpy as np
+        with stage('image.resize'):
+            # Shrink first, so the color conversion copies the small image, not the full decode
+            image = cv2.resize(image, self.image_size)
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        # Extract basic image features
+        features = {
+            'dimensions': image.shape,
+            'dominant_colors': self._extract_dominant_colors(image),
+            'brightness': np.mean(image),
+            'contrast': np.std(image)
+        }
+
+        return features
+
+    @timed('image.kmeans')
+    def _extract_dominant_colors(self, image: 'np.ndarray', num_colors: int = 3) -> List[str]:
         """Extract dominant colors from image"""
+        import cv2
+        import numpy as np
         pixels = image.reshape(-1, 3)
         pixels = np.float32(pixels)
 
@@ -48,6 +86,7 @@ class AIProcessor:
 
         return [f'#{int(r):02x}{int(g):02x}{int(b):02x}' for r, g, b in colors]
 
+    @timed('style.analysis')
     def analyze_brand_style(self, image_features: Dict[str, Any], style_prompt: str) -> Dict[str, Any]:
         """Analyze brand style based on image features and style prompt"""
         # Basic style analysis based on image features
@@ -1,66 +1,219 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template
+from flask import Flask, Blueprint, Response, abort, current_app, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
-from dotenv import load_dotenv
 import os
 import json
-from PIL import Image
-import io
-import numpy as np
-import cv2
+import itertools
 from werkzeug.utils import secure_filename
 import base64
-import subprocess
+from typing import Dict, Any, Optional
+from config import load_config
 
 # Import custom modules
 from layout_generator import LayoutGenerator
 from ai_utils import AIProcessor
-from openai_utils import OpenAIPersonalizer
-from github_utils import GitHubIntegration
+from openai_utils import OpenAIPersonalizer, prompt_cache
+from github_utils import GitHubIntegration, GitHubRateLimitError
+from resilience_utils import LatencyBudget
+from repo_index import RepoIndex, DEFAULT_INDEX_PATH
+from github_webhooks import verify_signature, handle_event
+from asset_ingestion import AssetIngestor
+from concurrency_utils import run_cpu_bound
+from asset_manifest import AssetManifest
+from layout_store import LayoutStore, LayoutTooLargeError, DEFAULT_STORE_PATH, layout_id
+from recent_layouts import RecentLayouts, CLIENT_COOKIE, client_id_for
+from singleflight import SingleFlight, DEFAULT_LOCK_DIR, file_digest, request_key
+from viewer_manager import ViewerManager, ViewerError, ViewerBusyError, DEFAULT_VIEWER_PATH
+from http_utils import content_etag, conditional_response, etag_matches, json_response, not_modified, payload_cache
+import timing_utils
+from timing_utils import add_labels, counter, gauge, request_seconds, stage_seconds
+import profiler_utils
+import memory_utils
+from memory_utils import peak_tracker, request_peak_bytes
+from profiler_utils import is_admin, process_profile_lock, request_profiles, to_collapsed, to_speedscope
 
 # Load environment variables
-load_dotenv()
+load_config()
 
-# Initialize Flask app
-app = Flask(__name__, static_folder='static')
-CORS(app)
+# Imported lazily on first use so the app (and the test suite) start fast
+HEAVY_MODULES = ('cv2', 'numpy', 'PIL.Image', 'openai', 'requests')
 
-# Initialize layout generator and AI processor
+# Initialize layout generator and AI processor. These are built once at import
+# time, so a preloading server (see gunicorn.conf.py) shares them across workers.
 layout_generator = LayoutGenerator()
 ai_processor = AIProcessor()
 openai_personalizer = OpenAIPersonalizer()
 github_integration = GitHubIntegration()
 
-# Configuration
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-
-# Ensure upload directory exists
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Local full-text index of fetched GitHub repositories
+github_integration.repo_index = RepoIndex(os.getenv('GITHUB_INDEX_PATH', DEFAULT_INDEX_PATH))
+
+# Brand images pulled from merchants' GitHub repositories
+asset_ingestor = AssetIngestor(github_integration, ai_processor)
+
+# Frontend files, read into memory once with content-hashed URLs
+FRONTEND_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Holobrand frontend')
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+INDEX_PAGE = 'Index (2).html'
+asset_manifest = AssetManifest.build([FRONTEND_FOLDER, STATIC_FOLDER])
+
+# Generated layouts, addressable by short IDs at /preview/<id>
+layout_store = LayoutStore(os.getenv('LAYOUT_STORE_PATH', DEFAULT_STORE_PATH))
+
+# Each client's recent layouts, so any worker can serve follow-up requests
+recent_layouts = RecentLayouts(os.getenv('LAYOUT_STORE_PATH', DEFAULT_STORE_PATH))
+
+# Warm Unreal viewer processes that 3D previews are sent to
+viewer_manager = ViewerManager()
+
+# Identical concurrent generation requests share one computation, also across workers
+# (SINGLEFLIGHT_DIR holds the lock files; empty coalesces within each worker only)
+generation_flight = SingleFlight('generation', os.getenv('SINGLEFLIGHT_DIR', DEFAULT_LOCK_DIR) or None)
+
+bp = Blueprint('holobrand', __name__)
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """Create the Flask application around the shared module-level services"""
+    flask_app = Flask(__name__, static_folder='static')
+    CORS(flask_app)
+
+    # Configuration
+    flask_app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    flask_app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads'))
+    flask_app.config['AI_LATENCY_BUDGET_MS'] = float(os.getenv('AI_LATENCY_BUDGET_MS', '2500'))  # 0 disables the budget
+    if config:
+        flask_app.config.update(config)
+
+    # Ensure upload directory exists
+    os.makedirs(flask_app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    timing_utils.init_app(flask_app)
+    profiler_utils.init_app(flask_app)
+    memory_utils.init_app(flask_app)
+    flask_app.register_blueprint(bp)
+    flask_app.jinja_env.globals['asset_url'] = asset_manifest.url_for
+    return flask_app
+
+def preload_heavy_modules():
+    """Import the lazily loaded libraries now, e.g. in a server master before forking workers"""
+    import importlib
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+def reset_after_fork():
+    """Reopen per-process connections in a freshly forked worker"""
+    # Sockets and SQLite handles must not be shared between processes
+    github_integration.reset_session()
+    github_integration.repo_index.reopen()
+    layout_store.reopen()
+    recent_layouts.reopen()
+    viewer_manager.reset()
+    generation_flight.reset()
 
 # Error handlers
-@app.errorhandler(400)
+@bp.app_errorhandler(400)
 def bad_request(error):
     return jsonify({'error': 'Bad request'}), 400
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 # Health check endpoint
-@app.route('/health', methods=['GET'])
+@bp.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy'})
 
+# Prompt cache hit-rate metrics for tuning PROMPT_CACHE_SIMILARITY
+@bp.route('/api/ai/cache-stats', methods=['GET'])
+def prompt_cache_stats():
+    return jsonify(prompt_cache.stats())
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms and cache/pool gauges in Prometheus text format"""
+    prompt = prompt_cache.stats()
+    payload = payload_cache.stats()
+    viewers = viewer_manager.stats()
+    github = github_integration.rate_limiter.status()
+    lines = request_seconds.exposition() + stage_seconds.exposition() + request_peak_bytes.exposition()
+    lines += counter('holobrand_memory_untracked_requests_total',
+                     'Requests not measured because another measurement was running.',
+                     [({}, peak_tracker.untracked)])
+    lines += counter('holobrand_prompt_cache_lookups_total', 'Prompt cache lookups by outcome.',
+                   [({'outcome': 'exact'}, prompt['hits_exact']), ({'outcome': 'similar'}, prompt['hits_similar']),
+                    ({'outcome': 'miss'}, prompt['misses'])])
+    lines += gauge('holobrand_prompt_cache_entries', 'Entries in the prompt cache.', [({}, prompt['entries'])])
+    lines += counter('holobrand_payload_cache_lookups_total', 'Compressed payload cache lookups by outcome.',
+                   [({'outcome': 'hit'}, payload['hits']), ({'outcome': 'miss'}, payload['misses'])])
+    lines += gauge('holobrand_payload_cache_bytes', 'Bytes held by the compressed payload cache.',
+                   [({}, payload['bytes'])])
+    flights = generation_flight.stats()
+    lines += counter('holobrand_singleflight_calls_total', 'Generation computations run or shared with a concurrent duplicate.',
+                   [({'outcome': 'run'}, flights['leaders']), ({'outcome': 'shared'}, flights['shared']),
+                    ({'outcome': 'shared_across_processes'}, flights['shared_across_processes']),
+                    ({'outcome': 'wait_timeout'}, flights['wait_timeouts'])])
+    lines += gauge('holobrand_viewers', 'Viewer processes by state.',
+                   [({'state': 'running'}, viewers['running']), ({'state': 'idle'}, viewers['idle'])])
+    lines += gauge('holobrand_github_rate_limit_remaining', 'Remaining GitHub requests per resource.',
+                   [({'resource': resource}, state['remaining']) for resource, state in github['resources'].items()])
+    lines += counter('holobrand_github_shed_requests_total', 'GitHub requests shed to protect the rate limit.',
+                   [({}, github['shed_requests'])])
+    # Per-process figures: a scrape reaches one gunicorn worker, so label its series with the worker
+    lines = add_labels(lines, {'worker': os.getpid()})
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+def admin_error() -> Optional[Response]:
+    """Error response unless the request is authorized for admin endpoints"""
+    if not os.getenv('ADMIN_TOKEN'):
+        return jsonify({'error': 'Admin endpoints are disabled'}), 404
+    if not is_admin(request):
+        return jsonify({'error': 'Admin token required'}), 401
+    return None
+
+def profile_response(sampler, name: str) -> Response:
+    if request.args.get('format', 'collapsed') == 'speedscope':
+        return jsonify(to_speedscope(sampler, name))
+    response = Response(to_collapsed(sampler.counts), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(sampler.samples)
+    return response
+
+@bp.route('/admin/profile', methods=['GET'])
+def profile_process():
+    """Sample every thread of this worker for `seconds` (max 60)"""
+    error = admin_error()
+    if error:
+        return error
+    seconds = min(max(request.args.get('seconds', 10.0, type=float), 0.1), 60.0)
+    interval = max(request.args.get('interval_ms', 5.0, type=float), 1.0) / 1000
+    if not process_profile_lock.acquire(blocking=False):
+        return jsonify({'error': 'A profile is already running'}), 409
+    try:
+        sampler = profiler_utils.profile(seconds, interval, include_idle=request.args.get('idle') == '1')
+    finally:
+        process_profile_lock.release()
+    return profile_response(sampler, f'pid {os.getpid()}, {seconds:g}s')
+
+@bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_request_profile(profile_id):
+    """Profile of a request sent with `X-Profile: 1`"""
+    error = admin_error()
+    if error:
+        return error
+    entry = request_profiles.get(profile_id)
+    if entry is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    label, sampler = entry
+    return profile_response(sampler, label)
+
 
 
 
 # Upload endpoint for product images
-@app.route('/api/upload', methods=['POST'])
+@bp.route('/api/upload', methods=['POST'])
 def upload_file():
     try:
         # Check if the post request has the file part
@@ -80,13 +233,15 @@ def upload_file():
                 'error': 'Invalid file type. Allowed types: PNG, JPG, JPEG, GIF, WEBP'
             }), 400
 
-        # Validate file size (max 16MB)
-        if len(file.read()) > 16 * 1024 * 1024:  # 16MB in bytes
+        # Validate file size (max 16MB) from the stream position, without reading it into memory
+        file.stream.seek(0, os.SEEK_END)
+        if file.stream.tell() > 16 * 1024 * 1024:  # 16MB in bytes
             return jsonify({'error': 'File too large. Maximum size is 16MB'}), 400
-        file.seek(0)  # Reset file pointer after reading
+        file.stream.seek(0)
 
         # Validate image can be opened
         try:
+            from PIL import Image
             img = Image.open(file)
             img.verify()  # Verify it's actually an image
             file.seek(0)  # Reset file pointer after verification
@@ -95,7 +250,7 @@ def upload_file():
 
         # Save the file in the images subdirectory
         filename = secure_filename(file.filename)
-        images_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'images')
+        images_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'images')
         if not os.path.exists(images_dir):
             os.makedirs(images_dir, exist_ok=True)
         filepath = os.path.join(images_dir, filename)
@@ -110,12 +265,23 @@ def upload_file():
     except Exception as e:
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
+def image_digest(image_path: str) -> Optional[str]:
+    """Content hash of an uploaded image, or None if it cannot be read"""
+    try:
+        return file_digest(image_path)
+    except OSError:
+        return None
+
+def analyze_image_file(image_path: str, digest: Optional[str]) -> Dict[str, Any]:
+    """Image features, computed once for concurrent requests with the same image content"""
+    if digest is None:
+        return run_cpu_bound(ai_processor.process_image, image_path)
+    return generation_flight.do(f'image-{digest}', lambda: run_cpu_bound(ai_processor.process_image, image_path))
+
 # Generate layout endpoint
-@app.route('/api/generate-layout', methods=['POST'])
+@bp.route('/api/generate-layout', methods=['POST'])
 def generate_layout():
     try:
-        global latest_generated_layout
-        
         # Check if the request is form data or JSON
         if request.content_type and 'multipart/form-data' in request.content_type:
             # Handle form data
@@ -129,7 +295,7 @@ def generate_layout():
             if 'image' in request.files and request.files['image'].filename:
                 file = request.files['image']
                 filename = secure_filename(file.filename)
-                images_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'images')
+                images_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'images')
                 if not os.path.exists(images_dir):
                     os.makedirs(images_dir, exist_ok=True)
                 filepath = os.path.join(images_dir, filename)
@@ -144,26 +310,46 @@ def generate_layout():
             preview_mode = data.get('preview_mode', '2d')
             image_filename = data.get('image_filename')
         
-        # Process image if provided
-        image_features = {}
-        brand_analysis = {}
+        image_path = None
+        digest = None
         if image_filename:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], image_filename)
-            if os.path.exists(image_path):
-                image_features = ai_processor.process_image(image_path)
-                brand_analysis = ai_processor.analyze_brand_style(image_features, style_prompt)
-        
-        # Generate layout based on selected template style
-        layout = layout_generator.generate_layout(brand_color, font, style_prompt)
-        latest_generated_layout = layout
-
-        return jsonify(layout)
+            # Uploads and the form above save to images/; older files sit in the folder root
+            image_path = next((path for path in (os.path.join(current_app.config['UPLOAD_FOLDER'], 'images', image_filename),
+                                                 os.path.join(current_app.config['UPLOAD_FOLDER'], image_filename))
+                               if os.path.exists(path)), None)
+            if image_path:
+                digest = image_digest(image_path)
+
+        def generate():
+            # Process image if provided
+            if image_path:
+                image_features = analyze_image_file(image_path, digest)
+                ai_processor.analyze_brand_style(image_features, style_prompt)
+
+            # Generate layout based on selected template style
+            return layout_generator.generate_layout(brand_color, font, style_prompt)
+
+        # Concurrent requests for the same image and parameters share one generated layout
+        key = request_key(brand_color, font, style_prompt, digest or image_path)
+        layout = generation_flight.do(f'layout-{key}', generate)
+
+        # Persist the layout so the preview can be linked by a short ID,
+        # and remember it as this client's latest for /api/3d-preview
+        stored_id = layout_store.put(layout)
+        client_id, issued = client_id_for(request)
+        recent_layouts.record(client_id, stored_id)
+
+        response = json_response({**layout, 'layout_id': stored_id, 'preview_url': f'/preview/{stored_id}'})
+        if issued:
+            response.set_cookie(CLIENT_COOKIE, client_id, max_age=int(recent_layouts.ttl_seconds),
+                                httponly=True, samesite='Lax')
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Remove the duplicate generate_ui endpoint
 # Keep only this version
-@app.route('/generate-ui', methods=['POST'])
+@bp.route('/generate-ui', methods=['POST'])
 def generate_ui():
     try:
         # Get form data
@@ -179,7 +365,7 @@ def generate_ui():
             
         # Save the uploaded image
         filename = secure_filename(image.filename)
-        images_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'images')
+        images_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'images')
         os.makedirs(images_dir, exist_ok=True)
         image_path = os.path.join(images_dir, filename)
         image.save(image_path)
@@ -199,70 +385,139 @@ def generate_ui():
         })
         
     except Exception as e:
-        app.logger.error(f'Error in generate_ui: {str(e)}')
+        current_app.logger.error(f'Error in generate_ui: {str(e)}')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def resolve_layout(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Layout sent inline, referenced by `layout_id`, or else the client's most recent one"""
+    if 'layout' in data:
+        return data['layout']
+    stored_id = data.get('layout_id')
+    if stored_id is None:
+        stored_id = recent_layouts.latest(client_id_for(request)[0])
+        if stored_id is None:
+            return {}
+    layout = layout_store.get(stored_id)
+    # Copy, as the preview adds analysis fields to the layout
+    return dict(layout) if layout is not None else None
+
 # Update the 3D preview endpoint to fix the duplicate code block
-@app.route('/api/3d-preview', methods=['POST'])
+@bp.route('/api/3d-preview', methods=['POST'])
 def get_3d_preview():
     try:
+        # Latency budget for the AI step; clients may ask for a tighter one
+        budget_ms = request.headers.get('X-Latency-Budget-Ms', type=float)
+        if budget_ms is None or budget_ms > current_app.config['AI_LATENCY_BUDGET_MS'] > 0:
+            budget_ms = current_app.config['AI_LATENCY_BUDGET_MS']
+        budget = LatencyBudget.from_ms(budget_ms)
+
         data = request.get_json()
-        layout_data = data.get('layout', {})
+        layout_data = resolve_layout(data)
+        if layout_data is None:
+            return jsonify({'error': 'Layout not found'}), 404
         
-        # Process image if provided
+        image_path = None
+        digest = None
         image_filename = data.get('image_filename')
         if image_filename:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], 'images', image_filename)
+            image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'images', image_filename)
             if os.path.exists(image_path):
-                image_features = ai_processor.process_image(image_path)
-                brand_analysis = ai_processor.analyze_brand_style(image_features, layout_data.get('template', 'modern'))
-                layout_data['image_analysis'] = image_features
-                layout_data['brand_analysis'] = brand_analysis
-
-        # Ensure colors are initialized
-        if 'colors' not in layout_data:
-            layout_data['colors'] = {
-                'primary': '#2196F3',
-                'secondary': '#FF4081',
-                'accent': '#00BCD4',
-                'background': '#FFFFFF'
-            }
+                digest = image_digest(image_path)
+            else:
+                image_path = None
+
+        def build_preview():
+            prepared = dict(layout_data)
+
+            # Process image if provided
+            image_features = None
+            brand_analysis = None
+            if image_path:
+                image_features = analyze_image_file(image_path, digest)
+                brand_analysis = ai_processor.analyze_brand_style(image_features, prepared.get('template', 'modern'))
+                prepared['image_analysis'] = image_features
+                prepared['brand_analysis'] = brand_analysis
+
+            # Ensure colors are initialized
+            if 'colors' not in prepared:
+                prepared['colors'] = {
+                    'primary': '#2196F3',
+                    'secondary': '#FF4081',
+                    'accent': '#00BCD4',
+                    'background': '#FFFFFF'
+                }
+
+            # Build the 3D scene; the AI step falls back to the plain scene when the budget runs out
+            scene = layout_generator.generate_3d_preview_data(prepared, image_features, brand_analysis, budget=budget)
+            return prepared, scene
+
+        # Concurrent requests for the same layout and image share one scene
+        key = request_key(layout_data, digest or image_path, budget_ms)
+        # A duplicate waits at most for its own budget before building the scene itself
+        wait_for = budget.remaining() if budget is not None else None
+        layout_data, scene = generation_flight.do(f'preview-{key}', build_preview, timeout=wait_for)
 
-        # Path to Unreal Engine executable
-        unreal_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'unreal_assets', 'Brand_Visualizer', 'HolobrandViewer.exe')
-        
         # Generate preview URL with layout data
         preview_url = f"holobrand://{base64.b64encode(json.dumps(layout_data).encode()).decode()}"
-        
-        # Launch Unreal Engine viewer with the data
-        if os.path.exists(unreal_path):
-            try:
-                subprocess.Popen([unreal_path, preview_url])
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Launching 3D preview...',
-                    'preview_url': preview_url,
-                    'layout_data': layout_data
-                })
-            except subprocess.SubprocessError as e:
-                app.logger.error(f'Failed to launch Unreal Engine viewer: {str(e)}')
-                return jsonify({
-                    'error': 'Failed to launch 3D preview',
-                    'details': str(e)
-                }), 500
-        else:
-            app.logger.error(f'Unreal Engine viewer not found at: {unreal_path}')
+
+        if not viewer_manager.configured():
+            current_app.logger.error('Unreal Engine viewer not found')
             return jsonify({
                 'error': 'Unreal Engine viewer not found',
-                'path': unreal_path
+                'path': DEFAULT_VIEWER_PATH
             }), 404
+
+        # Hand the scene to a warm viewer process instead of launching a new one
+        try:
+            viewer_manager.show(preview_url, scene)
+        except ViewerBusyError as e:
+            return jsonify({'error': 'All 3D viewers are busy', 'details': str(e)}), 503
+        except ViewerError as e:
+            current_app.logger.error(f'Failed to show 3D preview: {str(e)}')
+            return jsonify({
+                'error': 'Failed to launch 3D preview',
+                'details': str(e)
+            }), 500
+
+        return json_response({
+            **scene,
+            'status': 'success',
+            'message': 'Launching 3D preview...',
+            'preview_url': preview_url,
+            'layout_data': layout_data
+        })
             
     except Exception as e:
-        app.logger.error(f'Error in 3D preview: {str(e)}')
+        current_app.logger.error(f'Error in 3D preview: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
 # GitHub integration endpoints
-@app.route('/api/github/repos', methods=['GET'])
+def github_rate_limited(error):
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(int(error.retry_after) + 1)
+    return response, 429
+
+def stream_ndjson(items):
+    # Pull the first item before responding so rate-limit errors still map to 429
+    first = list(itertools.islice(items, 1))
+
+    def generate():
+        try:
+            for item in itertools.chain(first, items):
+                yield json.dumps(item) + '\n'
+        except Exception as e:
+            # The 200 is already sent; a final error line marks the list as incomplete
+            current_app.logger.error(f'NDJSON stream stopped early: {str(e)}')
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route('/api/github/rate-limit', methods=['GET'])
+def get_github_rate_limit():
+    # Remaining GitHub budget per resource, as tracked from response headers
+    return jsonify(github_integration.rate_limiter.status())
+
+@bp.route('/api/github/repos', methods=['GET'])
 def get_github_repos():
     try:
         # Check if GitHub token is valid
@@ -273,17 +528,24 @@ def get_github_repos():
         
         # Get username from query parameter (optional)
         username = request.args.get('username')
+        limit = request.args.get('limit', type=int)
+        
+        # Stream repositories as NDJSON while pages are still being fetched
+        if request.args.get('stream', type=int):
+            return stream_ndjson(github_integration.iter_repositories(username, limit))
         
         # Get repositories
-        repos = github_integration.get_repositories(username)
+        repos = github_integration.get_repositories(username, limit)
         
         return jsonify({
             'repositories': repos
         })
+    except GitHubRateLimitError as e:
+        return github_rate_limited(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/github/search', methods=['GET'])
+@bp.route('/api/github/search', methods=['GET'])
 def search_github_repos():
     try:
         # Check if GitHub token is valid
@@ -299,22 +561,81 @@ def search_github_repos():
                 'error': 'Search query parameter "q" is required'
             }), 400
         
+        limit = request.args.get('limit', type=int)
+        if request.args.get('stream', type=int):
+            return stream_ndjson(github_integration.iter_search_repositories(query, limit))
+        
         # Search repositories
-        repos = github_integration.search_repositories(query)
+        repos = github_integration.search_repositories(query, limit)
         
         return jsonify({
             'repositories': repos
         })
+    except GitHubRateLimitError as e:
+        return github_rate_limited(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/github/ingest-assets', methods=['POST'])
+def ingest_github_assets():
+    try:
+        if not github_integration.check_token_validity():
+            return jsonify({
+                'error': 'Invalid GitHub token. Please set a valid GITHUB_TOKEN in your .env file.'
+            }), 401
+
+        data = request.get_json(silent=True) or {}
+        repository = data.get('repository', '')
+        owner, _, repo = repository.partition('/')
+        if not owner or not repo:
+            return jsonify({'error': 'Field "repository" must be of the form owner/repo'}), 400
+
+        ref = data.get('ref') or 'HEAD'
+        limit = data.get('limit')
+        if limit is not None:
+            if isinstance(limit, str) and limit.strip().isdigit():
+                limit = int(limit)
+            if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+                return jsonify({'error': 'Field "limit" must be a positive integer'}), 400
+
+        # Stream each analyzed asset as NDJSON as soon as it is ready
+        if data.get('stream'):
+            return stream_ndjson(asset_ingestor.iter_ingest(owner, repo, ref, limit))
+
+        return jsonify(asset_ingestor.ingest(owner, repo, ref, limit))
+    except GitHubRateLimitError as e:
+        return github_rate_limited(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/github/webhook', methods=['POST'])
+def github_webhook():
+    # Only accept deliveries signed with the shared webhook secret
+    body = request.get_data()
+    if not verify_signature(os.getenv('GITHUB_WEBHOOK_SECRET'), body,
+                            request.headers.get('X-Hub-Signature-256')):
+        return jsonify({'error': 'Invalid webhook signature'}), 401
+
+    try:
+        payload = json.loads(body or b'{}')
+    except json.JSONDecodeError:
+        return jsonify({'error': 'Invalid JSON payload'}), 400
+
+    try:
+        result = handle_event(github_integration, request.headers.get('X-GitHub-Event', ''), payload)
+        return jsonify(result)
+    except Exception as e:
+        current_app.logger.error(f'Error handling GitHub webhook: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
 # Serve frontend files
-@app.route('/')
+@bp.route('/')
 def index():
-    return send_from_directory('Holobrand frontend', 'Index (2).html')
+    # The page revalidates on every load; the assets it references are hashed and immutable
+    return asset_manifest.response(INDEX_PAGE) or abort(404)
 
 # Add the generate-ui endpoint to handle frontend requests
-@app.route('/preview')
+@bp.route('/preview')
 def preview():
     # Get the layout data from session storage or use default values
     layout_data = request.args.get('layout')
@@ -349,17 +670,60 @@ def preview():
                 'heading_font': 'Playfair Display'
             }
         }
-    return render_template('preview.html', layout=layout)
+
+    # Fallback for links that carry the whole layout; stored layouts use /preview/<id>
+    return render_preview(layout_id(layout), layout)
+
+@bp.route('/preview/<stored_id>')
+def preview_stored(stored_id):
+    layout = layout_store.get(stored_id)
+    if layout is None:
+        return jsonify({'error': 'Layout not found'}), 404
+    return render_preview(stored_id, layout)
+
+def render_preview(stored_id: str, layout: Dict[str, Any]) -> Response:
+    # The page depends only on the layout and the template, so revalidate before rendering
+    template_path = os.path.join(current_app.root_path, 'templates', 'preview.html')
+    version = os.path.getmtime(template_path)
+    etag = content_etag(f'{stored_id}:{version}'.encode())
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return not_modified(etag)
+
+    html = layout_store.get_rendered(stored_id, version)
+    if html is None:
+        html = render_template('preview.html', layout=layout).encode()
+        layout_store.put_rendered(stored_id, version, html)
+    return conditional_response(html, etag, 'text/html')
+
+@bp.route('/api/layouts', methods=['POST'])
+def store_layout():
+    too_large = jsonify({'error': f'Layout must be at most {layout_store.max_layout_bytes} bytes'}), 413
+    if (request.content_length or 0) > layout_store.max_layout_bytes:
+        return too_large
+    layout = request.get_json(silent=True)
+    if not isinstance(layout, dict):
+        return jsonify({'error': 'Request body must be a JSON layout object'}), 400
+    try:
+        stored_id = layout_store.put(layout)
+    except LayoutTooLargeError:
+        return too_large
+    return jsonify({'layout_id': stored_id, 'preview_url': f'/preview/{stored_id}'}), 201
+
+@bp.route('/api/layouts/recent', methods=['GET'])
+def list_recent_layouts():
+    client_id, issued = client_id_for(request)
+    ids = [] if issued else recent_layouts.recent(client_id)
+    return jsonify({'layouts': [{'layout_id': stored_id, 'preview_url': f'/preview/{stored_id}'} for stored_id in ids]})
 
 
-@app.route('/<path:path>')
+@bp.route('/<path:path>')
 def serve_static(path):
-    # First try to serve from Holobrand frontend folder
-    frontend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Holobrand frontend')
-    if os.path.exists(os.path.join(frontend_path, path)):
-        return send_from_directory('Holobrand frontend', path)
-    # Fall back to static folder for other assets
-    return send_from_directory('static', path)
+    # Served from memory: Holobrand frontend files first, then the static folder
+    return asset_manifest.response(path) or abort(404)
+
+# Blueprint routes are registered by create_app(), so define the default app last
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Development server only; use `gunicorn -c gunicorn.conf.py wsgi:app` in production
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,123 @@
+"""
+Brand-asset ingestion from GitHub repositories
+
+Lists a repository tree in one recursive call, downloads every logo/image file
+with bounded parallelism and hands each download straight to
+`AIProcessor.process_image_bytes`, yielding results as they finish.
+
+Usage:
+    python asset_ingestion.py owner/repo [--ref main] [--concurrency 8] [--limit 50]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Iterator, List, Optional
+
+from concurrency_utils import run_cpu_bound
+
+# Formats OpenCV can decode; SVG logos are vector files and GIFs are not supported by OpenCV
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp'}
+
+DEFAULT_MAX_FILE_BYTES = 16 * 1024 * 1024
+
+
+def is_image_path(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+class AssetIngestor:
+    """Concurrent download-and-analyze pipeline for image files in a GitHub repository"""
+
+    def __init__(self, github_integration, ai_processor, concurrency: Optional[int] = None,
+                 max_file_bytes: Optional[int] = None):
+        self.github_integration = github_integration
+        self.ai_processor = ai_processor
+        self.concurrency = max(1, concurrency or int(os.getenv('ASSET_INGEST_CONCURRENCY', '8')))
+        self.max_file_bytes = max_file_bytes or int(os.getenv('ASSET_MAX_FILE_BYTES', str(DEFAULT_MAX_FILE_BYTES)))
+
+    def list_image_files(self, owner: str, repo: str, ref: str = 'HEAD') -> List[Dict[str, Any]]:
+        """Image blobs in the repository tree that are small enough to analyze"""
+        return [entry for entry in self.github_integration.get_tree(owner, repo, ref)
+                if entry.get('type') == 'blob' and is_image_path(entry.get('path', ''))
+                and entry.get('size', 0) <= self.max_file_bytes]
+
+    def _ingest_file(self, owner: str, repo: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = {'path': entry['path'], 'sha': entry['sha'], 'size': entry.get('size')}
+        try:
+            data = self.github_integration.download_blob(owner, repo, entry['sha'], self.max_file_bytes)
+            # Downloads overlap freely; decoding and k-means share the bounded CPU pool
+            result['features'] = run_cpu_bound(self.ai_processor.process_image_bytes, data)
+            result['status'] = 'done'
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        result['latency_ms'] = (time.perf_counter() - start) * 1000
+        return result
+
+    def iter_ingest(self, owner: str, repo: str, ref: str = 'HEAD',
+                    limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield one result per image file in completion order.
+
+        At most `concurrency` files are in flight at once, so memory stays
+        bounded however many assets the repository holds.
+        """
+        entries = iter(self.list_image_files(owner, repo, ref)[:limit])
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='asset-ingest') as executor:
+            in_flight = set()
+            try:
+                while True:
+                    for entry in entries:
+                        in_flight.add(executor.submit(self._ingest_file, owner, repo, entry))
+                        if len(in_flight) >= self.concurrency:
+                            break
+                    if not in_flight:
+                        return
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def ingest(self, owner: str, repo: str, ref: str = 'HEAD',
+               limit: Optional[int] = None) -> Dict[str, Any]:
+        """Ingest every image file and summarize the run"""
+        start = time.perf_counter()
+        assets = list(self.iter_ingest(owner, repo, ref, limit))
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for asset in assets if asset['status'] != 'done')
+        return {
+            'repository': f'{owner}/{repo}',
+            'ref': ref,
+            'assets': assets,
+            'processed': len(assets) - failed,
+            'failed': failed,
+            'elapsed_seconds': elapsed
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Ingest brand images from a GitHub repository')
+    parser.add_argument('repository', help='owner/repo')
+    parser.add_argument('--ref', default='HEAD', help='Branch, tag or commit (default: HEAD)')
+    parser.add_argument('--concurrency', type=int)
+    parser.add_argument('--limit', type=int, help='Ingest at most this many files')
+    args = parser.parse_args(argv)
+
+    from github_utils import GitHubIntegration
+    from ai_utils import AIProcessor
+    owner, _, repo = args.repository.partition('/')
+    ingestor = AssetIngestor(GitHubIntegration(), AIProcessor(), args.concurrency)
+    for asset in ingestor.iter_ingest(owner, repo, args.ref, args.limit):
+        print(json.dumps(asset, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+In-memory manifest of frontend assets
+
+Built once at startup from the `Holobrand frontend` and `static` folders. Every
+file is read into memory and given a content-hashed URL
+(`style (2).css` -> `/style (2).1a2b3c4d5e6f.css`) that may be cached forever.
+References between HTML, CSS and JS files are rewritten to the hashed URLs, and
+gzip/brotli variants of text assets are compressed ahead of time. Serving a file
+is then a dictionary lookup, with no filesystem calls per request.
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import posixpath
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
+
+from flask import Response, request
+
+from http_utils import BROTLI_AVAILABLE, etag_for_encoding, etag_matches, negotiate_encoding
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Text assets whose references to other assets are rewritten to hashed URLs
+REWRITE_EXTENSIONS = {'.html', '.css', '.js'}
+
+COMPRESSIBLE_TYPES = {'application/javascript', 'text/javascript', 'application/json', 'image/svg+xml'}
+MIN_COMPRESS_BYTES = 256
+
+REFERENCE_PATTERNS = [
+    re.compile(r'''(?:href|src)\s*=\s*(["'])(?P<ref>[^"']+)\1'''),
+    re.compile(r'''url\(\s*(["']?)(?P<ref>[^"')]+)\1\s*\)'''),
+    re.compile(r'''(?:import|from)\s*\(?\s*(["'])(?P<ref>[^"']+)\1'''),
+]
+
+
+class Asset:
+    """One file held in memory with its hashed URL and pre-compressed variants"""
+
+    def __init__(self, path: str, content: bytes, mimetype: str):
+        self.path = path
+        self.content = content
+        self.mimetype = mimetype
+        digest = hashlib.sha256(content).hexdigest()
+        self.etag = f'"{digest[:32]}"'
+        stem, ext = posixpath.splitext(path)
+        self.hashed_path = f'{stem}.{digest[:12]}{ext}'
+        self.variants = {'identity': content}
+        if is_compressible(mimetype) and len(content) >= MIN_COMPRESS_BYTES:
+            candidates = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+            if BROTLI_AVAILABLE:
+                candidates['br'] = brotli.compress(content, quality=11)
+            self.variants.update({encoding: data for encoding, data in candidates.items()
+                                  if len(data) < len(content)})
+
+    @property
+    def url(self) -> str:
+        return '/' + quote(self.hashed_path)
+
+
+def is_compressible(mimetype: str) -> bool:
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+class AssetManifest:
+    """Maps request paths, original and hashed, to in-memory assets"""
+
+    def __init__(self):
+        self.assets = {}  # original relative path -> Asset
+        self.routes = {}  # request path (original or hashed) -> (Asset, immutable)
+
+    @classmethod
+    def build(cls, roots: List[str]) -> 'AssetManifest':
+        """Read every file under `roots`; earlier roots win when paths collide"""
+        sources = {}
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.startswith('.'):
+                        continue
+                    full_path = os.path.join(directory, filename)
+                    path = os.path.relpath(full_path, root).replace(os.sep, '/')
+                    if path not in sources:
+                        with open(full_path, 'rb') as f:
+                            sources[path] = f.read()
+
+        manifest = cls()
+        for path in sorted(sources):
+            manifest._resolve(path, sources, set())
+        return manifest
+
+    def _resolve(self, path: str, sources: Dict[str, bytes], visiting: set) -> Asset:
+        """Hash `path` after its dependencies, so rewritten references are final"""
+        if path in self.assets:
+            return self.assets[path]
+        content = sources[path]
+        if posixpath.splitext(path)[1].lower() in REWRITE_EXTENSIONS:
+            visiting.add(path)
+            content = self._rewrite_references(path, content, sources, visiting)
+            visiting.discard(path)
+
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        asset = Asset(path, content, mimetype)
+        self.assets[path] = asset
+        self.routes[path] = (asset, False)
+        self.routes[asset.hashed_path] = (asset, True)
+        return asset
+
+    def _rewrite_references(self, path: str, content: bytes, sources: Dict[str, bytes],
+                            visiting: set) -> bytes:
+        try:
+            text = content.decode('utf-8')
+        except UnicodeDecodeError:
+            return content
+        directory = posixpath.dirname(path)
+
+        def replace(match):
+            ref = unquote(match.group('ref')).split('?')[0].split('#')[0]
+            if ref.startswith('/'):
+                target = posixpath.normpath(ref.lstrip('/'))
+            else:
+                target = posixpath.normpath(posixpath.join(directory, ref))
+            # Cycles (a.js <-> b.js) keep their original references
+            if target not in sources or target in visiting:
+                return match.group(0)
+            url = self._resolve(target, sources, visiting).url
+            start, end = match.span('ref')
+            return match.group(0)[:start - match.start()] + url + match.group(0)[end - match.start():]
+
+        for pattern in REFERENCE_PATTERNS:
+            text = pattern.sub(replace, text)
+        return text.encode('utf-8')
+
+    def get(self, request_path: str) -> Optional[Asset]:
+        route = self.routes.get(request_path)
+        return route[0] if route else None
+
+    def url_for(self, path: str) -> str:
+        """Hashed URL of an asset, or the plain path if it is not in the manifest"""
+        asset = self.assets.get(path)
+        return asset.url if asset else '/' + quote(path)
+
+    def response(self, request_path: str) -> Optional[Response]:
+        """Serve an asset from memory, or None if the path is not in the manifest"""
+        route = self.routes.get(request_path)
+        if route is None:
+            return None
+        asset, immutable = route
+
+        encoding = 'identity'
+        if etag_matches(request.headers.get('If-None-Match'), asset.etag):
+            response = Response(status=304)
+        else:
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+            if encoding not in asset.variants:
+                encoding = 'identity'
+            response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.headers['ETag'] = etag_for_encoding(asset.etag, encoding)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        if len(asset.variants) > 1:
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,191 @@
+"""
+Offline batch LLM processing for catalog onboarding
+
+Writes AI-suggestion requests for many stored layouts to a JSONL job file,
+processes it with bounded parallelism, checkpoints every finished item so an
+interrupted job resumes where it stopped, and merges results back into the
+stored layouts.
+
+Usage:
+    python batch_processor.py create layouts.json job.jsonl [--style-prompt "modern"]
+    python batch_processor.py run job.jsonl [--concurrency 8]
+    python batch_processor.py merge layouts.json job.results.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
+
+from timing_utils import percentile
+
+
+def results_path_for(job_path: str) -> str:
+    """Default checkpoint/results file next to the job file"""
+    root, _ = os.path.splitext(job_path)
+    return f"{root}.results.jsonl"
+
+
+def read_jsonl(path: str) -> List[Dict[str, Any]]:
+    items = []
+    if not os.path.exists(path):
+        return items
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line from an interrupted run; the item is simply redone
+                continue
+    return items
+
+
+def create_job(layouts: Dict[str, Dict[str, Any]], job_path: str,
+               style_prompt: Optional[str] = None) -> int:
+    """Write one request per stored layout to a JSONL job file"""
+    with open(job_path, 'w') as f:
+        for layout_id, layout in layouts.items():
+            f.write(json.dumps({
+                'id': layout_id,
+                'layout': layout,
+                'style_prompt': style_prompt or layout.get('style_prompt') or layout.get('template', 'modern'),
+                'image_features': layout.get('image_analysis')
+            }) + '\n')
+    return len(layouts)
+
+
+class BatchProcessor:
+    """Processes a JSONL job file through OpenAIPersonalizer with bounded parallelism"""
+
+    def __init__(self, personalizer=None, concurrency: int = 8):
+        if personalizer is None:
+            from openai_utils import OpenAIPersonalizer
+            personalizer = OpenAIPersonalizer()
+        self.personalizer = personalizer
+        self.concurrency = max(1, concurrency)
+        self.lock = threading.Lock()
+
+    def _process_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            # Raise rather than get the original layout back, which may already carry suggestions
+            enhanced = self.personalizer.enhance_layout_with_ai(
+                item['layout'], item['style_prompt'], item.get('image_features'), raise_errors=True
+            )
+        except Exception as e:
+            print(f"Batch item {item['id']} failed: {str(e)}")
+            return {'id': item['id'], 'status': 'failed', 'latency_ms': (time.perf_counter() - start) * 1000}
+        latency_ms = (time.perf_counter() - start) * 1000
+        return {
+            'id': item['id'],
+            'status': 'done',
+            'ai_suggestions': enhanced['ai_suggestions'],
+            'latency_ms': latency_ms
+        }
+
+    def run(self, job_path: str, results_path: Optional[str] = None,
+            limit: Optional[int] = None) -> Dict[str, Any]:
+        """Process every item not yet checkpointed in `results_path` and report throughput"""
+        results_path = results_path or results_path_for(job_path)
+        completed = {result['id'] for result in read_jsonl(results_path) if result.get('status') == 'done'}
+        pending = [item for item in read_jsonl(job_path) if item['id'] not in completed]
+        if limit is not None:
+            pending = pending[:limit]
+
+        latencies = []
+        failed = 0
+        start = time.perf_counter()
+        with open(results_path, 'a') as results_file, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._process_item, item) for item in pending]
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Batch item failed: {str(e)}")
+                    failed += 1
+                    continue
+                latencies.append(result['latency_ms'])
+                if result['status'] != 'done':
+                    failed += 1
+                    continue
+                # Checkpoint each finished item so a restart skips it
+                with self.lock:
+                    results_file.write(json.dumps(result) + '\n')
+                    results_file.flush()
+        elapsed = time.perf_counter() - start
+
+        return {
+            'processed': len(pending) - failed,
+            'failed': failed,
+            'skipped': len(completed),
+            'elapsed_seconds': elapsed,
+            'throughput_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': {
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': max(latencies) if latencies else 0.0
+            }
+        }
+
+
+def merge_results(layouts: Dict[str, Dict[str, Any]], results_path: str) -> int:
+    """Merge AI suggestions from a results file into stored layouts; returns the number merged"""
+    merged = 0
+    for result in read_jsonl(results_path):
+        if result.get('status') == 'done' and result['id'] in layouts:
+            layouts[result['id']]['ai_suggestions'] = result['ai_suggestions']
+            merged += 1
+    return merged
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline batch AI suggestions for stored layouts')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create', help='Write a JSONL job file from stored layouts')
+    create_parser.add_argument('layouts', help='JSON file mapping layout IDs to layouts')
+    create_parser.add_argument('job', help='JSONL job file to write')
+    create_parser.add_argument('--style-prompt', help='Style prompt for every layout (default: layout template)')
+
+    run_parser = subparsers.add_parser('run', help='Process a job file, resuming from its checkpoint')
+    run_parser.add_argument('job')
+    run_parser.add_argument('--results', help='Results/checkpoint file (default: <job>.results.jsonl)')
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--limit', type=int, help='Process at most this many pending items')
+
+    merge_parser = subparsers.add_parser('merge', help='Merge results back into the stored layouts')
+    merge_parser.add_argument('layouts')
+    merge_parser.add_argument('results')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        with open(args.layouts) as f:
+            layouts = json.load(f)
+        count = create_job(layouts, args.job, args.style_prompt)
+        print(f"Wrote {count} requests to {args.job}")
+    elif args.command == 'run':
+        report = BatchProcessor(concurrency=args.concurrency).run(args.job, args.results, args.limit)
+        print(json.dumps(report, indent=2))
+        return 1 if report['failed'] else 0
+    elif args.command == 'merge':
+        with open(args.layouts) as f:
+            layouts = json.load(f)
+        merged = merge_results(layouts, args.results)
+        with open(args.layouts, 'w') as f:
+            json.dump(layouts, f, indent=2)
+        print(f"Merged AI suggestions into {merged} layouts")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""
+HoloBrand benchmark helpers
+
+Scripts in this package run offline against local stand-in services.
+Run them from the repository root, e.g. `python -m benchmarks.bench_personalizer`.
+"""
+
+from typing import Dict, List
+
+from timing_utils import percentile
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """Summarize latency samples (seconds) collected over `elapsed` seconds"""
+    return {
+        'count': len(samples),
+        'throughput_rps': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples) * 1000 if samples else 0.0
+    }
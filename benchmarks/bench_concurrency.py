@@ -0,0 +1,135 @@
+"""
+Queueing delay of I/O-bound endpoints under many concurrent slow upstream calls
+
+Serves `/api/github/repos` through gunicorn against a local GitHub stand-in that
+answers after a fixed delay. It then fires a burst of concurrent requests. The
+same burst is also sent straight to the stand-in, and the latency on top of that
+baseline is the time requests spent queued for a worker. Sync workers are
+compared with threaded workers.
+
+Usage:
+    python -m benchmarks.bench_concurrency [--requests 200] [--upstream-ms 1000]
+                                           [--workers 4] [--threads 64]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from benchmarks import summarize
+from benchmarks.bench_serving import ROOT, free_port, wait_until_healthy
+
+
+def slow_github(delay: float) -> ThreadingHTTPServer:
+    """A GitHub stand-in that answers every request after `delay` seconds"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            path = self.path.split('?')[0]
+            body = json.dumps({'login': 'bench'} if path == '/user' else
+                              [{'id': 1, 'name': 'brand-kit', 'full_name': 'bench/brand-kit'}]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024  # listen backlog for the whole burst
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    return server
+
+
+def burst(url: str, count: int):
+    """Send `count` requests at once and return their latencies"""
+    barrier = threading.Barrier(count)
+
+    def timed(_):
+        barrier.wait()
+        start = time.perf_counter()
+        requests.get(url, timeout=120).raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        samples = list(executor.map(timed, range(count)))
+    return samples, time.perf_counter() - start
+
+
+def bench_mode(worker_class: str, threads: int, args, github_url: str) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(args.workers), '--worker-class', worker_class, '--threads', str(threads),
+               '--backlog', '2048', 'wsgi:app']
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, 'ACCESS_LOG': '', 'GITHUB_TOKEN': 'bench', 'GITHUB_API_URL': github_url,
+               'GITHUB_INDEX_PATH': os.path.join(tmp, 'index.db'), 'WORKER_TIMEOUT': '300'}
+        process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_healthy(url, process)
+            endpoint = f"{url}/api/github/repos?username=bench"
+            burst(endpoint, args.workers * threads)  # warm up token validation in every worker
+            samples, elapsed = burst(endpoint, args.requests)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=35)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return summarize(samples, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Queueing delay with slow upstream calls')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--upstream-ms', type=float, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    github = slow_github(args.upstream_ms / 1000)
+    github_url = f"http://127.0.0.1:{github.server_address[1]}"
+    try:
+        # The load generator and stand-in share this machine; measure what they add on their own
+        results = {'direct': summarize(*burst(f"{github_url}/users/bench/repos", args.requests))}
+        results['sync'] = bench_mode('sync', 1, args, github_url)
+        results['gthread'] = bench_mode('gthread', args.threads, args, github_url)
+    finally:
+        github.shutdown()
+
+    for stats in results.values():
+        stats['queueing_p50_ms'] = max(0.0, stats['p50_ms'] - results['direct']['p50_ms'])
+        stats['queueing_p99_ms'] = max(0.0, stats['p99_ms'] - results['direct']['p99_ms'])
+
+    print(f"{args.requests} concurrent requests, upstream {args.upstream_ms:.0f} ms, "
+          f"{args.workers} workers, {args.threads} threads")
+    for mode, stats in results.items():
+        print(f"{mode:<8} {stats['throughput_rps']:8.1f} req/s  p50 {stats['p50_ms']:8.1f} ms  "
+              f"p99 {stats['p99_ms']:8.1f} ms  queueing p99 {stats['queueing_p99_ms']:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
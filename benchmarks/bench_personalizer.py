@@ -0,0 +1,89 @@
+"""
+Throughput and tail-latency benchmark of the personalization path
+
+Runs `OpenAIPersonalizer.enhance_layout_with_ai` and
+`AIPersonalizationEngine.enhance_3d_layout` against the local OpenAI stand-in,
+so results are reproducible and need no network access.
+
+Usage:
+    python -m benchmarks.bench_personalizer [--requests 200] [--concurrency 16]
+                                            [--latency lognormal:150,0.6] [--error-rate 0.02]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import summarize
+from openai_stub_server import OpenAIStubServer
+
+
+def run(name, func, requests, concurrency):
+    """Call `func` `requests` times with the given concurrency and summarize latencies"""
+    def timed(_):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed, range(requests)))
+    return name, summarize(samples, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the AI personalization path offline')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', default='lognormal:150,0.6')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    with OpenAIStubServer(latency=args.latency, error_rate=args.error_rate, seed=args.seed) as stub:
+        os.environ['OPENAI_API_KEY'] = 'stub'
+        os.environ['OPENAI_API_BASE'] = stub.url
+
+        import openai
+        openai.api_key = 'stub'
+        openai.api_base = stub.url
+
+        from openai_utils import OpenAIPersonalizer
+        from ai_personalizer import AIPersonalizationEngine
+        from layout_generator import LayoutGenerator
+        from style_library import StyleLibrary
+
+        generator = LayoutGenerator()
+        layout = generator.generate_layout('#3366ff', 'Arial', 'modern tech')
+        scene = generator.generate_3d_preview_data(layout)
+        image_analysis = {'color_temperature': 'cool', 'visual_complexity': 'moderate'}
+        personalizer = OpenAIPersonalizer()
+        engine = AIPersonalizationEngine()
+        engine.style_library = StyleLibrary()  # Benchmark the live path, not precomputed descriptions
+
+        results = dict([
+            run('enhance_layout_with_ai',
+                lambda: personalizer.enhance_layout_with_ai(layout, 'modern tech'),
+                args.requests, args.concurrency),
+            run('enhance_3d_layout',
+                lambda: engine.enhance_3d_layout(json.loads(json.dumps(scene)), image_analysis),
+                args.requests, args.concurrency),
+        ])
+
+    print(f"Stub latency: {args.latency}, error rate: {args.error_rate}, "
+          f"concurrency: {args.concurrency}")
+    for name, stats in results.items():
+        print(f"{name:<24} {stats['throughput_rps']:8.1f} req/s  "
+              f"p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms  "
+              f"p99 {stats['p99_ms']:7.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
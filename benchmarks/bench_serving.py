@@ -0,0 +1,132 @@
+"""
+Load test comparing the development server with the production gunicorn setup
+
+Starts the app in each serving mode on a local port, drives it with concurrent
+keep-alive clients and reports throughput and tail latency per mode.
+
+Usage:
+    python -m benchmarks.bench_serving [--modes dev,gunicorn] [--requests 2000]
+                                       [--concurrency 32] [--workers 4]
+                                       [--path /api/generate-layout]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAYOUT_REQUEST = {'brand_color': '#3366ff', 'font': 'Arial', 'style_prompt': 'modern tech'}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode: str, port: int, workers: int):
+    if mode == 'dev':
+        # What `python app.py` runs, minus the reloader's file-watching parent process
+        return [sys.executable, '-c',
+                f"from app import app; app.run(debug=True, use_reloader=False, host='127.0.0.1', port={port})"]
+    if mode == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                '--bind', f'127.0.0.1:{port}', '--workers', str(workers), 'wsgi:app']
+    raise ValueError(f"Unknown serving mode: {mode}")
+
+
+def wait_until_healthy(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not become healthy within {timeout}s")
+
+
+def drive(url: str, path: str, requests_count: int, concurrency: int):
+    """Send `requests_count` requests from `concurrency` keep-alive clients"""
+    local = threading.local()
+
+    def timed(_):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        if path == '/api/generate-layout':
+            response = local.session.post(url + path, json=LAYOUT_REQUEST, timeout=30)
+        else:
+            response = local.session.get(url + path, timeout=30)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed, range(requests_count)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def bench_mode(mode: str, args) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, 'ACCESS_LOG': '', 'GITHUB_INDEX_PATH': os.path.join(tmp, 'index.db'),
+               'LAYOUT_STORE_PATH': os.path.join(tmp, 'layouts.db'),
+               'SINGLEFLIGHT_DIR': os.path.join(tmp, 'singleflight')}
+        process = subprocess.Popen(server_command(mode, port, args.workers), cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_healthy(url, process)
+            drive(url, args.path, min(100, args.requests), args.concurrency)  # warm up
+            return drive(url, args.path, args.requests, args.concurrency)
+        finally:
+            # SIGTERM lets gunicorn finish in-flight requests within graceful_timeout
+            process.terminate()
+            try:
+                process.wait(timeout=35)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare dev-server and gunicorn throughput')
+    parser.add_argument('--modes', default='dev,gunicorn')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--path', default='/api/generate-layout')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {mode: bench_mode(mode, args) for mode in args.modes.split(',')}
+
+    print(f"{args.requests} requests to {args.path}, concurrency {args.concurrency}, "
+          f"gunicorn workers {args.workers}")
+    for mode, stats in results.items():
+        print(f"{mode:<10} {stats['throughput_rps']:8.1f} req/s  "
+              f"p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms  "
+              f"p99 {stats['p99_ms']:7.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
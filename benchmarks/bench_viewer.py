@@ -0,0 +1,85 @@
+"""
+Latency of 3D previews: spawning a viewer per request vs. a warm viewer pool
+
+Uses the stand-in viewer (viewer_stub.py) with a simulated engine startup time.
+"spawn" launches a new process for every preview, as the old endpoint did.
+"pool" sends each scene to a ViewerManager of long-lived processes.
+
+Usage:
+    python -m benchmarks.bench_viewer [--requests 40] [--concurrency 4]
+                                      [--startup-ms 800] [--render-ms 20]
+                                      [--max-viewers 2]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import summarize
+from benchmarks.bench_serving import ROOT
+from viewer_manager import ViewerManager
+
+STUB = os.path.join(ROOT, 'viewer_stub.py')
+
+SCENE = {'ui_elements': [{'type': 'header'}, {'type': 'product_grid'}, {'type': 'button'}]}
+
+
+def run(requests_count: int, concurrency: int, preview) -> dict:
+    def timed(index):
+        start = time.perf_counter()
+        preview(f'holobrand://bench-{index}')
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed, range(requests_count)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def bench_spawn(args) -> dict:
+    def preview(url):
+        subprocess.run([sys.executable, STUB, url, '--startup-ms', str(args.startup_ms),
+                        '--render-ms', str(args.render_ms)], check=True)
+    return run(args.requests, args.concurrency, preview)
+
+
+def bench_pool(args) -> dict:
+    manager = ViewerManager([sys.executable, STUB, '--ipc', '--startup-ms', str(args.startup_ms),
+                             '--render-ms', str(args.render_ms)],
+                            max_viewers=args.max_viewers, acquire_timeout=60)
+    try:
+        return run(args.requests, args.concurrency, lambda url: manager.show(url, SCENE))
+    finally:
+        manager.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare spawn-per-request and pooled 3D viewers')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--startup-ms', type=float, default=800)
+    parser.add_argument('--render-ms', type=float, default=20)
+    parser.add_argument('--max-viewers', type=int, default=2)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {'spawn': bench_spawn(args), 'pool': bench_pool(args)}
+
+    print(f"{args.requests} previews, concurrency {args.concurrency}, "
+          f"startup {args.startup_ms:.0f} ms, render {args.render_ms:.0f} ms")
+    for mode, stats in results.items():
+        print(f"{mode:<6} {stats['throughput_rps']:8.1f} previews/s  "
+              f"p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms  "
+              f"max {stats['max_ms']:7.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Hot-path benchmarks with regression thresholds
+
+Times the image pipeline, layout and scene generation, interactive elements and
+the main Flask endpoints. Images come from a deterministic synthetic corpus at
+several resolutions. Random choices (k-means initial centers, template variants)
+are seeded before every call, and OpenCV runs single-threaded, so each call does
+the same work.
+
+Cases run in several interleaved rounds, so a burst of other load on the machine
+only affects some samples. The median time of each case is compared with
+benchmarks/baseline.json, after scaling by a fixed calibration workload. That way
+a generally slower or busier machine is not reported as a regression. Each case
+also records its spread (interquartile range relative to the median). A case
+fails when it is slower than its baseline by more than the threshold, widened to
+NOISE_FACTOR times the spread for cases that are noisy by nature.
+
+Everything runs offline: OpenAI is disabled, stores are in memory and 3D previews
+go to the stand-in viewer.
+
+Usage:
+    python -m benchmarks.hot_paths [--threshold 0.25] [--filter image.]
+                                   [--update-baseline] [--output results.json]
+    python run_tests.py --bench
+"""
+
+import os
+import sys
+import random
+import json
+import time
+import platform
+import argparse
+import statistics
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.bench_serving import ROOT
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# (width, height) of the synthetic product images
+RESOLUTIONS = [(320, 240), (1280, 960), (3000, 2000)]
+
+DEFAULT_THRESHOLD = 0.25
+
+# Slowdowns smaller than this are timer noise, whatever the ratio
+MIN_DELTA_MS = 0.05
+
+# A case may vary by this many times its relative interquartile range. Same-code
+# runs on a 1-CPU VM moved by up to ~30%, within each case's spread.
+NOISE_FACTOR = 1.0
+
+
+def offline_environment():
+    """Keep the benchmarks off the network and out of instance/"""
+    os.environ['OPENAI_API_KEY'] = ''
+    os.environ.setdefault('LAYOUT_STORE_PATH', ':memory:')
+    os.environ.setdefault('SINGLEFLIGHT_DIR', '')
+    os.environ.setdefault('GITHUB_INDEX_PATH', ':memory:')
+    os.environ.setdefault('HOLOBRAND_VIEWER_CMD',
+                          f'"{sys.executable}" "{os.path.join(ROOT, "viewer_stub.py")}" --ipc')
+    os.environ.setdefault('SERVER_TIMING', '0')
+    # OpenCV's thread pool makes k-means timings depend on scheduling
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def synthetic_image(width: int, height: int, seed: int = 0):
+    """A product-shot-like BGR image: gradient backdrop, flat brand-colored shapes, sensor noise"""
+    import numpy as np
+    rng = np.random.RandomState(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[..., 0] = 200 + 40 * x / width
+    image[..., 1] = 210 + 30 * y / height
+    image[..., 2] = 220 - 20 * (x + y) / (width + height)
+    for _ in range(6):
+        color = rng.randint(0, 256, size=3)
+        cx, cy = rng.randint(0, width), rng.randint(0, height)
+        radius = rng.randint(min(width, height) // 10, min(width, height) // 3)
+        image[(x - cx) ** 2 + (y - cy) ** 2 < radius ** 2] = color
+    image += rng.normal(0, 4, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def build_corpus(directory: str) -> Dict[Tuple[int, int], str]:
+    """Write one PNG per resolution and return their paths"""
+    import cv2
+    paths = {}
+    for index, (width, height) in enumerate(RESOLUTIONS):
+        path = os.path.join(directory, f'product_{width}x{height}.png')
+        cv2.imwrite(path, synthetic_image(width, height, seed=index))
+        paths[(width, height)] = path
+    return paths
+
+
+def calibration_workload():
+    """Fixed pure-Python and NumPy work used to normalize for machine speed"""
+    import numpy as np
+    total = 0
+    for index in range(20000):
+        total += index * index % 7
+    matrix = np.arange(40000, dtype=np.float64).reshape(200, 200)
+    return total + float((matrix @ matrix).sum())
+
+
+def seeded(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Reset Python's and OpenCV's RNGs before each call"""
+    import cv2
+
+    def call():
+        random.seed(0)
+        cv2.setRNGSeed(0)
+        return func()
+    return call
+
+
+def sample(func: Callable[[], Any], min_time: float, min_repeats: int = 2,
+           max_repeats: int = 200) -> List[float]:
+    """Durations of repeated calls, at least `min_repeats` and for about `min_time` seconds"""
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < min_repeats or (time.perf_counter() - start < min_time and len(samples) < max_repeats):
+        call_start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_start)
+    return samples
+
+
+def summarize_samples(samples: List[float]) -> Dict[str, float]:
+    median = statistics.median(samples)
+    if len(samples) >= 4:
+        lower, _, upper = statistics.quantiles(samples, n=4)
+    else:
+        lower = upper = median
+    return {
+        'median_ms': median * 1000,
+        'min_ms': min(samples) * 1000,
+        'spread': (upper - lower) / median if median else 0.0,
+        'repeats': len(samples)
+    }
+
+
+def run_rounds(selected: List[Tuple[str, Callable[[], Any]]], rounds: int,
+               min_time: float, min_repeats: int = 3) -> Dict[str, Dict[str, float]]:
+    """Sample every case in each round, after one warm-up call each"""
+    for _, func in selected:
+        func()
+    samples = {name: [] for name, _ in selected}
+    for _ in range(rounds):
+        for name, func in selected:
+            samples[name].extend(sample(func, min_time / rounds, min_repeats))
+    return {name: summarize_samples(values) for name, values in samples.items()}
+
+
+def cases(corpus: Dict[Tuple[int, int], str]) -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-argument callable) for every hot path"""
+    import cv2
+    from ai_utils import AIProcessor
+    from layout_generator import LayoutGenerator
+    from ai_personalizer import AIPersonalizationEngine
+    from app import create_app
+
+    processor = AIProcessor()
+    generator = LayoutGenerator()
+    engine = AIPersonalizationEngine()
+    layout = generator.generate_layout('#3366ff', 'Playfair Display', 'elegant luxury skincare')
+    features = processor.process_image(corpus[RESOLUTIONS[0]])
+    brand_analysis = processor.analyze_brand_style(features, 'elegant')
+    client = create_app({'TESTING': True}).test_client()
+
+    selected = []
+    for (width, height), path in corpus.items():
+        selected.append((f'image.process_image[{width}x{height}]', lambda path=path: processor.process_image(path)))
+    for size in (64, 128, 256):
+        resized = cv2.resize(cv2.imread(corpus[RESOLUTIONS[-1]]), (size, size))
+        selected.append((f'image.extract_dominant_colors[{size}x{size}]',
+                         lambda image=resized: processor._extract_dominant_colors(image)))
+    selected += [
+        ('layout.generate_layout', lambda: generator.generate_layout('#3366ff', 'Arial', 'modern tech')),
+        ('layout.generate_3d_preview_data',
+         lambda: generator.generate_3d_preview_data(layout, features, brand_analysis)),
+        ('personalizer.generate_interactive_elements', lambda: engine.generate_interactive_elements(layout)),
+        ('http.generate_layout',
+         lambda: client.post('/api/generate-layout', json={'brand_color': '#3366ff', 'style_prompt': 'modern'})),
+        ('http.3d_preview', lambda: client.post('/api/3d-preview', json={'layout': dict(layout)})),
+        ('http.index', lambda: client.get('/')),
+    ]
+    return [(name, seeded(func)) for name, func in selected]
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, min_delta_ms: float = MIN_DELTA_MS,
+            speed_factor: float = 1.0, noise_factor: float = NOISE_FACTOR) -> List[Dict[str, Any]]:
+    """
+    One row per case, comparing medians; `regressed` when slower than baseline by
+    more than `threshold`, or by more than `noise_factor` times the case's baseline
+    spread if that is larger. Only the stored spread widens the allowance, so a
+    regression that also makes the case noisier still fails.
+
+    `speed_factor` is baseline calibration time / current calibration time, so
+    current timings are scaled to the baseline machine's speed.
+    """
+    rows = []
+    for name, stats in results.items():
+        current = stats['median_ms'] * speed_factor
+        row = {'name': name, 'median_ms': current, 'baseline_ms': None,
+               'change': None, 'allowed': threshold, 'regressed': False}
+        base = baseline.get(name)
+        if base:
+            row['allowed'] = max(threshold, noise_factor * base.get('spread', 0.0))
+            row['baseline_ms'] = base['median_ms']
+            row['change'] = current / base['median_ms'] - 1 if base['median_ms'] else 0.0
+            row['regressed'] = (row['change'] > row['allowed']
+                                and current - base['median_ms'] > min_delta_ms)
+        rows.append(row)
+    return rows
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Any]:
+    """The stored baseline document: calibration time and per-case results"""
+    if not os.path.exists(path):
+        return {'calibration_ms': None, 'results': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, Dict[str, float]], calibration_ms: float, path: str = BASELINE_PATH):
+    document = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'calibration_ms': calibration_ms,
+        'results': results
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark hot paths against a stored baseline')
+    parser.add_argument('--threshold', type=float, default=float(os.getenv('BENCH_THRESHOLD', DEFAULT_THRESHOLD)),
+                        help='Allowed slowdown as a fraction of the baseline (default 0.25)')
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Seconds to spend per case')
+    parser.add_argument('--rounds', type=int, default=5, help='Interleaved rounds over all cases')
+    parser.add_argument('--min-repeats', type=int, default=3, help='Calls per case in each round, at least')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    offline_environment()
+    with tempfile.TemporaryDirectory() as tmp:
+        selected = [(name, func) for name, func in cases(build_corpus(tmp)) if args.filter in name]
+        results = run_rounds([('calibration', calibration_workload)] + selected, args.rounds, args.min_time,
+                             args.min_repeats)
+    calibration_ms = results.pop('calibration')['median_ms']
+    print(f"{'calibration':<48} median {calibration_ms:10.3f} ms")
+    for name, stats in results.items():
+        print(f"{name:<48} median {stats['median_ms']:10.3f} ms  min {stats['min_ms']:10.3f} ms  "
+              f"spread {stats['spread']:6.1%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline:
+        if args.filter and baseline['results']:
+            # Cases from a partial run must be comparable with the ones kept
+            speed_factor = baseline['calibration_ms'] / calibration_ms
+            results = {name: {key: value * speed_factor if key.endswith('_ms') else value
+                              for key, value in stats.items()} for name, stats in results.items()}
+            calibration_ms = baseline['calibration_ms']
+        save_baseline({**baseline['results'], **results}, calibration_ms, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    speed_factor = baseline['calibration_ms'] / calibration_ms if baseline['calibration_ms'] else 1.0
+    print(f"\nMachine speed vs baseline: {1 / speed_factor:.2f}x calibration time")
+    rows = compare(results, baseline['results'], args.threshold, speed_factor=speed_factor)
+    print(f"{'case (median ms, scaled)':<48} {'baseline':>10} {'current':>10} {'change':>8} {'allowed':>8}")
+    for row in rows:
+        base = f"{row['baseline_ms']:10.3f}" if row['baseline_ms'] is not None else f"{'-':>10}"
+        change = f"{row['change']:+8.1%}" if row['change'] is not None else f"{'new':>8}"
+        flag = '  REGRESSION' if row['regressed'] else ''
+        print(f"{row['name']:<48} {base} {row['median_ms']:10.3f} {change} {row['allowed']:8.0%}{flag}")
+
+    regressions = [row for row in rows if row['regressed']]
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than their allowed change")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Import-time report for the Flask app
+
+Imports a module in a fresh interpreter under `python -X importtime` and lists
+the slowest imports, so startup regressions are easy to spot.
+
+Usage:
+    python -m benchmarks.import_time [--module app] [--top 15] [--runs 3] [--budget-ms 400]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output into entries with self/cumulative ms and nesting depth"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                'module': name,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2
+            })
+    return entries
+
+
+def measure(module: str = 'app') -> Dict[str, Any]:
+    """Import `module` once in a fresh interpreter; returns its import time and loaded modules"""
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    entries = parse_importtime(result.stderr)
+    target = [entry for entry in entries if entry['module'] == module and entry['depth'] == 0]
+    return {
+        'module': module,
+        'total_ms': target[-1]['cumulative_ms'] if target else 0.0,
+        'imports': entries,
+        'loaded_modules': json.loads(result.stdout.strip().splitlines()[-1])
+    }
+
+
+def best_of(module: str = 'app', runs: int = 3) -> Dict[str, Any]:
+    """Fastest of several runs, to filter out noise from a busy machine"""
+    return min((measure(module) for _ in range(max(1, runs))), key=lambda report: report['total_ms'])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Report import time of the Flask app')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--budget-ms', type=float, help='Exit non-zero when the import exceeds this')
+    args = parser.parse_args(argv)
+
+    report = best_of(args.module, args.runs)
+    print(f"import {report['module']}: {report['total_ms']:.1f} ms")
+    slowest = sorted(report['imports'], key=lambda entry: entry['self_ms'], reverse=True)[:args.top]
+    for entry in slowest:
+        print(f"  {entry['self_ms']:8.1f} ms self  {entry['cumulative_ms']:8.1f} ms cumulative  {entry['module']}")
+
+    if args.budget_ms is not None and report['total_ms'] > args.budget_ms:
+        print(f"Import time exceeds the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
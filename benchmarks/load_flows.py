@@ -0,0 +1,303 @@
+"""
+Load generator replaying the Postman collection's user flows
+
+Each virtual user runs the brand flow from tests/postman: Upload Image →
+Generate Layout → 3D Preview → Preview (the generated `preview_url`). Requests
+are built from the collection, with each step fed by the previous responses.
+Two arrival models are supported:
+
+  closed loop  --concurrency N     N users each start a new flow as soon as one ends
+  open loop    --rate R            flows arrive as a Poisson process at R per second,
+                                   whether or not earlier ones have finished
+
+In open-loop runs, flow latency is measured from the scheduled arrival time, so
+time spent queued behind a saturated server is included.
+
+By default a gunicorn server is started against local stand-ins: the OpenAI stub
+server, the stand-in viewer, and temporary stores and upload folder. Use --url to
+target a running server instead.
+
+Usage:
+    python -m benchmarks.load_flows [--concurrency 8 | --rate 4] [--duration 30]
+                                    [--workers 2] [--openai-latency lognormal:150,0.5]
+                                    [--output run.json] [--compare previous.json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from benchmarks import summarize
+from benchmarks.bench_serving import ROOT, free_port, server_command, wait_until_healthy
+
+COLLECTION_PATH = os.path.join(ROOT, 'tests', 'postman', 'HoloBrand.postman_collection.json')
+ENVIRONMENT_PATH = os.path.join(ROOT, 'tests', 'postman', 'HoloBrand.postman_environment.json')
+
+# Collection items in flow order; "Preview" follows the generated preview_url
+BRAND_FLOW = ['Upload Image', 'Generate Layout', '3D Preview', 'Preview']
+
+# Keys the server adds to a generated layout that are not part of the layout itself
+RESPONSE_ONLY_KEYS = {'layout_id', 'preview_url'}
+
+
+def load_collection(path: str = COLLECTION_PATH) -> Dict[str, Dict[str, Any]]:
+    """Postman requests by item name"""
+    with open(path) as f:
+        collection = json.load(f)
+    return {item['name']: item['request'] for item in collection['item']}
+
+
+def load_variables(path: str = ENVIRONMENT_PATH) -> Dict[str, str]:
+    with open(path) as f:
+        environment = json.load(f)
+    return {value['key']: value['value'] for value in environment['values'] if value.get('enabled', True)}
+
+
+def substitute(text: str, variables: Dict[str, str]) -> str:
+    for key, value in variables.items():
+        text = text.replace('{{' + key + '}}', value)
+    return text
+
+
+def sample_image() -> bytes:
+    """A 640x480 PNG from the benchmark corpus generator"""
+    import cv2
+    from benchmarks.hot_paths import synthetic_image
+    ok, encoded = cv2.imencode('.png', synthetic_image(640, 480))
+    return encoded.tobytes()
+
+
+class Recorder:
+    """Latency samples and errors per endpoint, shared by all virtual users"""
+
+    def __init__(self):
+        self.samples = {}  # endpoint -> [seconds]
+        self.errors = {}  # endpoint -> {status or exception name: count}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if error is not None:
+                counts = self.errors.setdefault(endpoint, {})
+                counts[error] = counts.get(error, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        with self.lock:
+            endpoints = {}
+            for endpoint, samples in self.samples.items():
+                errors = self.errors.get(endpoint, {})
+                stats = summarize(samples, elapsed)
+                stats['errors'] = sum(errors.values())
+                stats['error_rate'] = stats['errors'] / len(samples) if samples else 0.0
+                stats['error_kinds'] = dict(errors)
+                endpoints[endpoint] = stats
+            return endpoints
+
+
+class FlowRunner:
+    """Runs the brand flow for one virtual user, building requests from the collection"""
+
+    def __init__(self, base_url: str, recorder: Recorder, collection: Optional[Dict[str, Dict[str, Any]]] = None,
+                 image: Optional[bytes] = None):
+        self.variables = {**load_variables(), 'base_url': base_url.rstrip('/')}
+        self.collection = collection or load_collection()
+        self.recorder = recorder
+        self.image = image if image is not None else sample_image()
+        self.local = threading.local()
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def url(self, name: str) -> str:
+        return substitute(self.collection[name]['url']['raw'], self.variables)
+
+    def json_body(self, name: str) -> Dict[str, Any]:
+        return json.loads(substitute(self.collection[name]['body']['raw'], self.variables))
+
+    def call(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        """One timed request; returns None (after recording the error) unless it succeeded"""
+        start = time.perf_counter()
+        try:
+            response = self.session().request(method, url, timeout=120, **kwargs)
+        except requests.RequestException as e:
+            self.recorder.record(endpoint, time.perf_counter() - start, type(e).__name__)
+            return None
+        error = None if response.ok else str(response.status_code)
+        self.recorder.record(endpoint, time.perf_counter() - start, error)
+        return response if error is None else None
+
+    def run(self, user: int) -> bool:
+        """One pass through the flow; stops at the first failed step"""
+        # Each user re-uploads under its own name, so the upload folder stays bounded
+        filename = f'load-user-{user}.png'
+        upload_field = self.collection['Upload Image']['body']['formdata'][0]['key']
+        response = self.call('Upload Image', 'POST', self.url('Upload Image'),
+                             files={upload_field: (filename, self.image, 'image/png')})
+        if response is None:
+            return False
+        image_filename = response.json()['filename']
+
+        body = self.json_body('Generate Layout')
+        body['image_filename'] = image_filename
+        response = self.call('Generate Layout', 'POST', self.url('Generate Layout'), json=body)
+        if response is None:
+            return False
+        generated = response.json()
+
+        body = self.json_body('3D Preview')
+        body['layout'] = {key: value for key, value in generated.items() if key not in RESPONSE_ONLY_KEYS}
+        body['image_filename'] = image_filename
+        if self.call('3D Preview', 'POST', self.url('3D Preview'), json=body) is None:
+            return False
+
+        preview_url = self.variables['base_url'] + generated.get('preview_url', '/preview')
+        return self.call('Preview', 'GET', preview_url) is not None
+
+
+def closed_loop(runner: FlowRunner, concurrency: int, duration: float, recorder: Recorder):
+    deadline = time.monotonic() + duration
+
+    def user(index):
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            ok = runner.run(index)
+            recorder.record('flow', time.perf_counter() - start, None if ok else 'failed')
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(user, range(concurrency)))
+
+
+def open_loop(runner: FlowRunner, rate: float, duration: float, recorder: Recorder,
+              max_in_flight: int, seed: int):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+
+    def flow(index, scheduled):
+        ok = runner.run(index % max_in_flight)
+        recorder.record('flow', time.perf_counter() - scheduled, None if ok else 'failed')
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        arrival, index = start, 0
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival - start >= duration:
+                break
+            time.sleep(max(0.0, arrival - time.perf_counter()))
+            executor.submit(flow, index, arrival)
+            index += 1
+
+
+def stand_in_stack(args, tmp: str):
+    """Start the OpenAI stub and a gunicorn server wired to stand-ins; returns (url, stop)"""
+    from openai_stub_server import OpenAIStubServer
+    stub = OpenAIStubServer(latency=args.openai_latency, seed=args.seed).start()
+    viewer = f'"{sys.executable}" "{os.path.join(ROOT, "viewer_stub.py")}" --ipc --startup-ms {args.viewer_startup_ms}'
+    env = {**os.environ, 'ACCESS_LOG': '', 'OPENAI_API_KEY': 'stub', 'OPENAI_API_BASE': stub.url,
+           'HOLOBRAND_VIEWER_CMD': viewer, 'WORKER_TIMEOUT': '300',
+           'LAYOUT_STORE_PATH': os.path.join(tmp, 'layouts.db'),
+           'SINGLEFLIGHT_DIR': os.path.join(tmp, 'singleflight'),
+           'GITHUB_INDEX_PATH': os.path.join(tmp, 'index.db'),
+           'UPLOAD_FOLDER': os.path.join(tmp, 'uploads')}
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(server_command(args.server, port, args.workers), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def stop():
+        process.terminate()
+        try:
+            process.wait(timeout=35)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        stub.stop()
+
+    try:
+        wait_until_healthy(url, process)
+    except Exception:
+        stop()
+        raise
+    return url, stop
+
+
+def print_report(results: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+    header = f"{'endpoint':<16} {'count':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header + ('   p95 vs previous' if previous else ''))
+    for endpoint, stats in results['endpoints'].items():
+        line = (f"{endpoint:<16} {stats['count']:>6} {stats['throughput_rps']:8.2f} {stats['p50_ms']:9.1f} "
+                f"{stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['error_rate']:7.1%}")
+        before = (previous or {}).get('endpoints', {}).get(endpoint)
+        if before and before['p95_ms']:
+            line += f"   {stats['p95_ms'] / before['p95_ms'] - 1:+.1%}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replay the Postman user flows under load')
+    arrival = parser.add_mutually_exclusive_group()
+    arrival.add_argument('--concurrency', type=int, help='Closed loop: concurrent virtual users (default 8)')
+    arrival.add_argument('--rate', type=float, help='Open loop: flow arrivals per second')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='Open loop: concurrent flows at most')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to generate load')
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--server', default='gunicorn', choices=['gunicorn', 'dev'])
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--openai-latency', default='lognormal:150,0.5')
+    parser.add_argument('--viewer-startup-ms', type=float, default=800)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier --output file to compare p95 latencies with')
+    args = parser.parse_args(argv)
+    if args.rate is None and args.concurrency is None:
+        args.concurrency = 8
+
+    recorder = Recorder()
+    with tempfile.TemporaryDirectory() as tmp:
+        url, stop = (args.url, lambda: None) if args.url else stand_in_stack(args, tmp)
+        try:
+            runner = FlowRunner(url, recorder)
+            start = time.perf_counter()
+            if args.rate is not None:
+                open_loop(runner, args.rate, args.duration, recorder, args.max_in_flight, args.seed)
+            else:
+                closed_loop(runner, args.concurrency, args.duration, recorder)
+            elapsed = time.perf_counter() - start
+        finally:
+            stop()
+
+    results = {
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'elapsed_seconds': elapsed,
+        'endpoints': recorder.report(elapsed)
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    mode = f"rate {args.rate}/s" if args.rate is not None else f"concurrency {args.concurrency}"
+    print(f"Brand flow ({' -> '.join(BRAND_FLOW)}), {mode}, {elapsed:.1f}s")
+    print_report(results, previous)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+Bounded executor for CPU-bound work done while serving requests
+
+Request threads mostly wait on upstream I/O. CPU-heavy steps (OpenCV decoding
+and k-means) run on a small pool instead, so hundreds of in-flight requests never
+oversubscribe the CPU. The cores are split between the server's worker processes
+(WEB_CONCURRENCY), with at least one thread per worker.
+"""
+
+import os
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from profiler_utils import profiled
+_cpu_executor = None
+_lock = threading.Lock()
+
+
+def default_cpu_workers() -> int:
+    """This process's share of the cores, at least 1"""
+    processes = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+    return max(1, (os.cpu_count() or 1) // processes)
+
+
+def cpu_executor() -> ThreadPoolExecutor:
+    """The process-wide CPU pool, created on first use (after any fork)"""
+    global _cpu_executor
+    with _lock:
+        if _cpu_executor is None:
+            workers = int(os.getenv('CPU_WORKERS', str(default_cpu_workers())))
+            _cpu_executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='cpu')
+        return _cpu_executor
+
+
+def run_cpu_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `func` on the CPU pool and wait for its result"""
+    # Carry the caller's context along, so stage timings land on the right request
+    # and a profiled request samples the pool thread while it works for it
+    return cpu_executor().submit(contextvars.copy_context().run, profiled(func), *args, **kwargs).result()
@@ -0,0 +1,18 @@
+"""
+Process-wide configuration
+
+Environment variables (and a local .env file) are loaded exactly once, by the
+first module that calls `load_config()`.
+"""
+
+_loaded = False
+
+
+def load_config():
+    """Load .env into the environment on first call; later calls are no-ops"""
+    global _loaded
+    if _loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _loaded = True
@@ -1,70 +1,477 @@
 import os
-import requests
-from dotenv import load_dotenv
-from typing import Dict, Any, List, Optional
+import math
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, Iterator, List, Optional, Tuple, TYPE_CHECKING
+from config import load_config
+from timing_utils import stage
+
+# requests is imported when the first session is created
+if TYPE_CHECKING:
+    import requests
 
 # Load environment variables
-load_dotenv()
+load_config()
+
+# Parsed GitHub response; `from_cache` is True when a 304 was answered from the conditional cache
+GitHubResponse = namedtuple('GitHubResponse', ['status_code', 'data', 'headers', 'from_cache'])
+
+# GitHub's maximum page size
+PER_PAGE = 100
+
+# Searches count against GitHub's 30 per minute limit, so they fetch one page unless asked for more
+SEARCH_DEFAULT_LIMIT = PER_PAGE
+
+def last_page_from_link(link_header: Optional[str]) -> int:
+    """Page count from a GitHub `Link` header (1 when there is no rel="last")"""
+    if not link_header:
+        return 1
+    from requests.utils import parse_header_links
+    for link in parse_header_links(link_header):
+        if link.get('rel') == 'last':
+            page = parse_qs(urlparse(link['url']).query).get('page', ['1'])[0]
+            return int(page)
+    return 1
+
+class GitHubRateLimitError(Exception):
+    """Raised when a request is shed because the GitHub rate limit is (nearly) exhausted"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimitScheduler:
+    """
+    Tracks X-RateLimit-* headers per GitHub resource and paces requests.
+
+    When the remaining budget falls to `reserve`, requests wait for the reset if it
+    is at most `max_wait` seconds away, otherwise they are shed with GitHubRateLimitError.
+    """
+
+    def __init__(self, reserve: int = 5, max_wait: float = 2.0):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.limits = {}  # resource -> {'limit', 'remaining', 'reset'}
+        self.shed_count = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def resource_for(url: str) -> str:
+        return 'search' if '/search/' in url else 'core'
+
+    def acquire(self, resource: str):
+        """Reserve one request against `resource`, waiting or shedding as needed"""
+        while True:
+            with self.lock:
+                state = self.limits.get(resource)
+                now = time.time()
+                if state is None or state['reset'] <= now:
+                    if state is not None:
+                        # The window has reset; allow requests until fresh headers arrive
+                        state['remaining'] = state['limit']
+                    return
+                if state['remaining'] > self.reserve:
+                    state['remaining'] -= 1
+                    return
+                wait_for = state['reset'] - now
+                if wait_for > self.max_wait:
+                    self.shed_count += 1
+                    raise GitHubRateLimitError(
+                        f"GitHub {resource} rate limit nearly exhausted; resets in {int(wait_for)}s",
+                        retry_after=wait_for
+                    )
+            time.sleep(wait_for)
+
+    def update(self, headers, resource: str):
+        """Record the rate-limit headers of a GitHub response"""
+        try:
+            remaining = int(headers['X-RateLimit-Remaining'])
+            limit = int(headers.get('X-RateLimit-Limit', remaining))
+            reset = float(headers.get('X-RateLimit-Reset', time.time() + 60))
+        except (KeyError, TypeError, ValueError):
+            return
+        resource = headers.get('X-RateLimit-Resource', resource)
+        with self.lock:
+            self.limits[resource] = {'limit': limit, 'remaining': remaining, 'reset': reset}
+
+    def status(self) -> Dict[str, Any]:
+        """Remaining budget per resource, for metrics"""
+        with self.lock:
+            return {
+                'resources': {
+                    resource: {
+                        'limit': state['limit'],
+                        'remaining': state['remaining'],
+                        'reset_in_seconds': max(0, int(state['reset'] - time.time()))
+                    }
+                    for resource, state in self.limits.items()
+                },
+                'shed_requests': self.shed_count
+            }
 
 class GitHubIntegration:
     def __init__(self):
-        self.base_url = "https://api.github.com"
+        self.base_url = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip('/')
         self.token = os.getenv("GITHUB_TOKEN")
         self.headers = {
             "Authorization": f"token {self.token}",
             "Accept": "application/vnd.github.v3+json"
         }
-    
+        # Explicit (connect, read) timeouts so a stalled GitHub never hangs a worker
+        self.timeout = (
+            float(os.getenv("GITHUB_CONNECT_TIMEOUT", "3.05")),
+            float(os.getenv("GITHUB_READ_TIMEOUT", "10"))
+        )
+
+        # Pooled keep-alive session reuses TLS connections across calls
+        self.pool_size = int(os.getenv("GITHUB_POOL_SIZE", "16"))
+        self._session = None
+
+        # ETag / Last-Modified validators so repeat calls become 304s (free against the rate limit)
+        self.conditional_cache = OrderedDict()
+        self.conditional_cache_size = int(os.getenv("GITHUB_CONDITIONAL_CACHE_SIZE", "512"))
+        self.cache_lock = threading.Lock()
+
+        # Cached token validation avoids a /user round trip on every request
+        self.token_cache_ttl = float(os.getenv("GITHUB_TOKEN_CACHE_SECONDS", "300"))
+        self._token_valid = None
+        self._token_checked_at = 0.0
+
+        self.page_concurrency = int(os.getenv("GITHUB_PAGE_CONCURRENCY", "8"))
+
+        # Optional local full-text index (see repo_index.py); searches younger than
+        # index_max_age are answered locally and older ones refresh in the background
+        self.repo_index = None
+        # Webhooks (see github_webhooks.py) keep the index current, so it may age much longer
+        default_max_age = "86400" if os.getenv("GITHUB_WEBHOOK_SECRET") else "600"
+        self.index_max_age = float(os.getenv("GITHUB_INDEX_MAX_AGE", default_max_age))
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+        self.rate_limiter = RateLimitScheduler(
+            reserve=int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "5")),
+            max_wait=float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "2"))
+        )
+
+    @property
+    def session(self) -> 'requests.Session':
+        """The pooled session, created on first use"""
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+
+    @session.setter
+    def session(self, session: 'requests.Session'):
+        self._session = session
+
+    def _create_session(self) -> 'requests.Session':
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def reset_session(self):
+        """Replace the connection pool, e.g. in a forked worker that must not share sockets"""
+        self._session = None
+
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> GitHubResponse:
+        """GET a GitHub API URL with conditional-request caching"""
+        cache_key = (url, tuple(sorted((params or {}).items())))
+        with self.cache_lock:
+            cached = self.conditional_cache.get(cache_key)
+
+        request_headers = {}
+        if cached:
+            if cached['etag']:
+                request_headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        resource = self.rate_limiter.resource_for(url)
+        with stage('github.rate_limit_wait'):
+            self.rate_limiter.acquire(resource)
+        with stage('github.request'):
+            response = self.session.get(url, params=params, headers=request_headers, timeout=self.timeout)
+        self.rate_limiter.update(response.headers, resource)
+
+        if response.status_code == 304 and cached:
+            with self.cache_lock:
+                if cache_key in self.conditional_cache:
+                    self.conditional_cache.move_to_end(cache_key)
+            return GitHubResponse(200, cached['data'], {**cached['headers'], **response.headers}, True)
+
+        if response.status_code != 200:
+            return GitHubResponse(response.status_code, None, response.headers, False)
+
+        data = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self.cache_lock:
+                self.conditional_cache[cache_key] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'data': data,
+                    'headers': dict(response.headers)
+                }
+                self.conditional_cache.move_to_end(cache_key)
+                while len(self.conditional_cache) > self.conditional_cache_size:
+                    self.conditional_cache.popitem(last=False)
+        return GitHubResponse(200, data, response.headers, False)
+
+    def invalidate_repository(self, full_name: str) -> int:
+        """Drop conditional-cache entries that can contain a repository; returns the count"""
+        owner = full_name.split('/')[0]
+        repo_url = f"{self.base_url}/repos/{full_name}".lower()
+        listing_urls = {
+            url.lower() for url in (
+                f"{self.base_url}/users/{owner}/repos",
+                f"{self.base_url}/orgs/{owner}/repos",
+                f"{self.base_url}/user/repos",
+                f"{self.base_url}/search/repositories"
+            )
+        }
+        with self.cache_lock:
+            stale = [key for key in self.conditional_cache
+                     if key[0].lower() == repo_url or key[0].lower().startswith(repo_url + '/')
+                     or key[0].lower() in listing_urls]
+            for key in stale:
+                del self.conditional_cache[key]
+        return len(stale)
+
     def check_token_validity(self) -> bool:
         """Check if the GitHub token is valid"""
         if not self.token or self.token == "your_github_personal_access_token_here":
             return False
-            
+
+        if self._token_valid is not None and time.monotonic() - self._token_checked_at < self.token_cache_ttl:
+            return self._token_valid
+
         try:
-            response = requests.get(f"{self.base_url}/user", headers=self.headers)
-            return response.status_code == 200
+            response = self._get(f"{self.base_url}/user")
+        except GitHubRateLimitError:
+            raise
         except Exception:
+            # Network errors are not cached; the next request checks again
             return False
-    
-    def get_repositories(self, username: Optional[str] = None) -> List[Dict[str, Any]]:
+
+        if response.status_code in (200, 401):
+            self._token_valid = response.status_code == 200
+            self._token_checked_at = time.monotonic()
+        return response.status_code == 200
+
+    def _iter_paginated(self, url: str, params: Optional[Dict[str, Any]] = None,
+                        items_key: Optional[str] = None,
+                        limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield items from every page of a GitHub listing, in order.
+
+        The first page reveals the page count through its `Link` header; the
+        remaining pages are then fetched concurrently.
+        """
+        def fetch(page: int):
+            response = self._get(url, params={**(params or {}), 'per_page': PER_PAGE, 'page': page})
+            if response.status_code != 200:
+                raise Exception(f"GitHub returned {response.status_code} for page {page}")
+            items = response.data.get(items_key, []) if items_key else response.data
+            return items, response.headers
+
+        if limit is not None and limit <= 0:
+            return
+
+        items, headers = fetch(1)
+        last_page = last_page_from_link(headers.get('Link'))
+        if limit is not None:
+            last_page = min(last_page, math.ceil(limit / PER_PAGE))
+
+        yielded = 0
+        for item in items:
+            if limit is not None and yielded >= limit:
+                return
+            yield item
+            yielded += 1
+
+        if last_page <= 1:
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.page_concurrency, last_page - 1)),
+                                thread_name_prefix="github-page") as executor:
+            futures = [executor.submit(fetch, page) for page in range(2, last_page + 1)]
+            try:
+                for future in futures:
+                    for item in future.result()[0]:
+                        if limit is not None and yielded >= limit:
+                            return
+                        yield item
+                        yielded += 1
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def iter_repositories(self, username: Optional[str] = None,
+                          limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream every repository of the authenticated user or a specific user"""
+        if username:
+            url = f"{self.base_url}/users/{username}/repos"
+        else:
+            url = f"{self.base_url}/user/repos"
+        repos = self._iter_paginated(url, limit=limit)
+        return repos if self.repo_index is None else self._index_while_streaming(repos)
+
+    def _index_while_streaming(self, repos: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        batch = []
+        for repo in repos:
+            batch.append(repo)
+            if len(batch) >= PER_PAGE:
+                self.repo_index.upsert(batch)
+                batch = []
+            yield repo
+        self.repo_index.upsert(batch)
+
+    def _collect(self, items: Iterator[Dict[str, Any]], what: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Every item of a paginated listing, and whether it is complete.
+
+        When a later page fails, the items fetched so far are returned as incomplete;
+        a failure before any item arrives is raised.
+        """
+        collected = []
+        try:
+            for item in items:
+                collected.append(item)
+        except Exception as e:
+            if not collected:
+                raise
+            print(f"Error fetching {what}, returning the {len(collected)} fetched so far: {str(e)}")
+            return collected, False
+        return collected, True
+
+    def get_repositories(self, username: Optional[str] = None,
+                         limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get repositories for the authenticated user or a specific user"""
         try:
-            if username:
-                url = f"{self.base_url}/users/{username}/repos"
-            else:
-                url = f"{self.base_url}/user/repos"
-                
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return []
+            return self._collect(self.iter_repositories(username, limit), 'repositories')[0]
+        except GitHubRateLimitError:
+            raise
         except Exception as e:
             print(f"Error fetching repositories: {str(e)}")
             return []
-    
+
     def get_repository_details(self, owner: str, repo: str) -> Dict[str, Any]:
         """Get details for a specific repository"""
         try:
             url = f"{self.base_url}/repos/{owner}/{repo}"
-            response = requests.get(url, headers=self.headers)
+            response = self._get(url)
             if response.status_code == 200:
-                return response.json()
+                return response.data
             else:
                 return {}
+        except GitHubRateLimitError:
+            raise
         except Exception as e:
             print(f"Error fetching repository details: {str(e)}")
             return {}
-    
-    def search_repositories(self, query: str) -> List[Dict[str, Any]]:
+
+    def get_tree(self, owner: str, repo: str, ref: str = "HEAD") -> List[Dict[str, Any]]:
+        """List every entry of a repository tree in one recursive call"""
+        url = f"{self.base_url}/repos/{owner}/{repo}/git/trees/{ref}"
+        response = self._get(url, params={"recursive": 1})
+        if response.status_code != 200:
+            raise Exception(f"GitHub returned {response.status_code} for tree {owner}/{repo}@{ref}")
+        if response.data.get('truncated'):
+            print(f"Tree for {owner}/{repo}@{ref} was truncated by GitHub")
+        return response.data.get('tree', [])
+
+    def download_blob(self, owner: str, repo: str, sha: str,
+                      max_bytes: Optional[int] = None) -> bytes:
+        """Download a blob's raw bytes, streamed so oversized files are abandoned early"""
+        url = f"{self.base_url}/repos/{owner}/{repo}/git/blobs/{sha}"
+        resource = self.rate_limiter.resource_for(url)
+        with stage('github.rate_limit_wait'):
+            self.rate_limiter.acquire(resource)
+        with stage('github.download'), \
+                self.session.get(url, headers={"Accept": "application/vnd.github.raw"},
+                                 timeout=self.timeout, stream=True) as response:
+            self.rate_limiter.update(response.headers, resource)
+            if response.status_code != 200:
+                raise Exception(f"GitHub returned {response.status_code} for blob {sha}")
+            data = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                data.extend(chunk)
+                if max_bytes is not None and len(data) > max_bytes:
+                    raise Exception(f"Blob {sha} exceeds {max_bytes} bytes")
+            return bytes(data)
+
+    def iter_search_repositories(self, query: str,
+                                 limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream repositories matching a search query, one page unless `limit` asks for more"""
+        url = f"{self.base_url}/search/repositories"
+        return self._iter_paginated(url, params={"q": query}, items_key="items",
+                                    limit=SEARCH_DEFAULT_LIMIT if limit is None else limit)
+
+    def search_repositories(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Search for repositories based on a query"""
+        if self.repo_index is not None:
+            return self._indexed_search(query, limit)
         try:
-            url = f"{self.base_url}/search/repositories?q={query}"
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                return response.json().get("items", [])
-            else:
-                return []
+            return self._collect(self.iter_search_repositories(query, limit), 'search results')[0]
+        except GitHubRateLimitError:
+            raise
+        except Exception as e:
+            print(f"Error searching repositories: {str(e)}")
+            return []
+
+    def _refresh_search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run a search against GitHub and record the results in the local index"""
+        repos, complete = self._collect(self.iter_search_repositories(query, limit), 'search results')
+        self.repo_index.upsert(repos)
+        if complete:
+            # Incomplete results are served but not recorded, so the next search asks GitHub again
+            self.repo_index.mark_refreshed(query, repos)
+        return repos
+
+    def _refresh_search_in_background(self, query: str, limit: Optional[int] = None):
+        with self._refresh_lock:
+            if query in self._refreshing:
+                return
+            self._refreshing.add(query)
+
+        def refresh():
+            try:
+                self._refresh_search(query, limit)
+            except Exception as e:
+                print(f"Background search refresh failed: {str(e)}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(query)
+
+        threading.Thread(target=refresh, name="github-index-refresh", daemon=True).start()
+
+    def _indexed_search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Answer from the local index when fresh enough, otherwise from GitHub"""
+        age = self.repo_index.query_age(query)
+        if age is not None:
+            local = self.repo_index.search(query, limit)
+            if local is not None:
+                if age > self.index_max_age:
+                    self._refresh_search_in_background(query, limit)
+                return local
+
+        try:
+            return self._refresh_search(query, limit)
         except Exception as e:
+            # GitHub is rate limiting us or unavailable: serve whatever the index knows
+            local = self.repo_index.search(query, limit)
+            if local:
+                return local
+            if isinstance(e, GitHubRateLimitError):
+                raise
             print(f"Error searching repositories: {str(e)}")
-            return []
\ No newline at end of file
+            return []
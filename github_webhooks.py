@@ -0,0 +1,79 @@
+import hmac
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+# Repository actions that change which repositories a search can return
+MEMBERSHIP_ACTIONS = {'created', 'deleted', 'transferred', 'publicized', 'privatized'}
+
+# Push payloads send these as Unix seconds; the REST API and the index use ISO 8601
+TIMESTAMP_FIELDS = ('created_at', 'pushed_at', 'updated_at')
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """X-Hub-Signature-256 value for a webhook body"""
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: Optional[str], body: bytes, signature: Optional[str]) -> bool:
+    """Constant-time check of GitHub's X-Hub-Signature-256 header"""
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+def _rest_shape(repository: Dict[str, Any], existing: Dict[str, Any]) -> Dict[str, Any]:
+    """Bring a webhook repository object to the shape the REST API returns"""
+    shaped = dict(repository)
+    for field in TIMESTAMP_FIELDS:
+        value = shaped.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            shaped[field] = datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    # Push payloads describe the owner as {name, email, ...}; keep the indexed REST owner
+    if 'owner' in existing:
+        shaped['owner'] = existing['owner']
+    return shaped
+
+
+def handle_event(github_integration, event: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Invalidate or update exactly the cached GitHub entries affected by a webhook event"""
+    if event == 'ping':
+        return {'status': 'pong'}
+
+    repository = payload.get('repository') or {}
+    full_name = repository.get('full_name')
+    if event not in ('repository', 'push') or not full_name:
+        return {'status': 'ignored', 'event': event}
+
+    action = payload.get('action', 'pushed')
+    renamed_from = None
+    if action == 'renamed':
+        old_name = payload.get('changes', {}).get('repository', {}).get('name', {}).get('from')
+        if old_name:
+            renamed_from = f"{full_name.split('/')[0]}/{old_name}"
+
+    invalidated = github_integration.invalidate_repository(full_name)
+    if renamed_from:
+        invalidated += github_integration.invalidate_repository(renamed_from)
+
+    index = github_integration.repo_index
+    if index is not None:
+        if action == 'deleted':
+            index.remove(full_name)
+        else:
+            # Push payloads carry a partial repository object; keep indexed fields it lacks
+            existing = index.get(renamed_from or full_name) or {}
+            index.upsert([{**existing, **_rest_shape(repository, existing)}])
+        if action in MEMBERSHIP_ACTIONS or renamed_from:
+            # Only the searches this repository can appear in, or could newly appear in
+            index.invalidate_queries(full_name)
+            if renamed_from:
+                index.invalidate_queries(renamed_from)
+
+    return {
+        'status': 'processed',
+        'event': event,
+        'action': action,
+        'repository': full_name,
+        'invalidated_entries': invalidated
+    }
@@ -0,0 +1,47 @@
+"""
+Gunicorn settings for serving HoloBrand in production
+
+Every setting can be overridden from the environment, e.g.
+    WEB_CONCURRENCY=8 gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import multiprocessing
+
+bind = os.getenv('HOLOBRAND_BIND', '0.0.0.0:8000')
+
+# Worker processes; one per core, since threads (below) absorb requests waiting on I/O
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+
+# Threaded workers: a request waiting on GitHub, OpenAI or the viewer subprocess
+# holds one of `threads` slots instead of a whole process, so a handful of
+# workers can keep hundreds of slow upstream calls in flight
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '64'))
+
+# Import app.py (LayoutGenerator, AIProcessor, OpenAI and GitHub clients) in the
+# master before forking, so workers share those pages copy-on-write
+preload_app = True
+
+# Workers get this long to finish in-flight requests on SIGTERM / HUP before being killed
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', '30'))
+timeout = int(os.getenv('WORKER_TIMEOUT', '60'))
+keepalive = int(os.getenv('KEEPALIVE_SECONDS', '5'))
+
+# Recycle workers periodically to bound memory growth; 0 disables
+max_requests = int(os.getenv('MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', '0'))
+
+accesslog = os.getenv('ACCESS_LOG', '-') or None  # empty disables access logging
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Workers size their CPU pools from this (see concurrency_utils.py), so that all
+    # workers together run about one CPU-bound task per core. Read it from the final
+    # config, which includes a `--workers` given on the command line
+    os.environ['WEB_CONCURRENCY'] = str(server.cfg.workers)
+
+    # Connection pools and SQLite handles were opened in the master; reopen them per worker
+    from app import reset_after_fork
+    reset_after_fork()
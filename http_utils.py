@@ -0,0 +1,220 @@
+"""
+Conditional GET and content-encoding negotiation for generated payloads
+
+Generated JSON is hashed in a canonical form (sorted keys, volatile fields such
+as `generated_timestamp` left out), so equivalent results always get the same
+ETag. The bytes may differ in those fields, so it is a weak ETag. Clients that
+send it back in `If-None-Match` get a bodyless 304. Otherwise the body is
+compressed with brotli or gzip, as negotiated from `Accept-Encoding`. The
+compressed bytes are cached by a hash of the exact body, so each body is
+compressed once.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from flask import Response, current_app, request
+
+# Brotli is optional; without it responses are negotiated between gzip and identity
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Fields that change on every generation without changing the result
+VOLATILE_KEYS = frozenset({'generated_timestamp'})
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_BYTES = 1024
+
+
+def _strip_keys(value: Any, exclude: Iterable[str]) -> Any:
+    """`value` without `exclude` keys; subtrees without them are shared, not copied"""
+    if isinstance(value, dict):
+        stripped = None
+        for index, (key, item) in enumerate(value.items()):
+            new_item = _strip_keys(item, exclude)
+            if stripped is None and (key in exclude or new_item is not item):
+                stripped = dict(itertools.islice(value.items(), index))
+            if stripped is not None and key not in exclude:
+                stripped[key] = new_item
+        return value if stripped is None else stripped
+    if isinstance(value, (list, tuple)):
+        stripped = None
+        for index, item in enumerate(value):
+            new_item = _strip_keys(item, exclude)
+            if stripped is None and new_item is not item:
+                stripped = list(value[:index])
+            if stripped is not None:
+                stripped.append(new_item)
+        return value if stripped is None else stripped
+    return value
+
+
+def canonical_json(payload: Any, exclude: Iterable[str] = VOLATILE_KEYS) -> bytes:
+    """Deterministic serialization of a payload for hashing"""
+    return json.dumps(_strip_keys(payload, frozenset(exclude)), sort_keys=True,
+                      separators=(',', ':'), default=str).encode()
+
+
+def content_etag(data: bytes) -> str:
+    """Strong ETag for the exact bytes of a representation"""
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def weak_etag(data: bytes) -> str:
+    """Weak ETag for canonical content, shared by semantically equivalent bodies"""
+    return 'W/' + content_etag(data)
+
+
+def etag_for_encoding(etag: str, encoding: str) -> str:
+    # Each encoded representation gets its own validator (RFC 9110 8.8.3)
+    return etag if encoding == 'identity' else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header matches `etag` in any of its encodings"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    base = (etag[2:] if etag.startswith('W/') else etag).strip('"')
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == base or candidate.split('-', 1)[0] == base:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """Pick 'br', 'gzip' or 'identity' from an Accept-Encoding header"""
+    offered = ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name] = quality
+
+    best, best_quality = 'identity', 0.0
+    for encoding in offered:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+class CompressedPayloadCache:
+    """LRU of compressed representations keyed by a hash of the body and the encoding"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (body digest, encoding) -> bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == 'identity':
+            return body
+        key = (hashlib.sha256(body).digest(), encoding)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        data = compress(body, encoding)
+        with self.lock:
+            self.entries[key] = data
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': sum(len(data) for data in self.entries.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Process-wide cache shared by every endpoint that serves generated payloads
+payload_cache = CompressedPayloadCache(int(os.getenv('PAYLOAD_CACHE_SIZE', '256')))
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status=304)
+    response.headers['ETag'] = etag
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def conditional_response(body: bytes, etag: str, mimetype: str, status: int = 200,
+                         revalidate: bool = True) -> Response:
+    """
+    Serve `body` with its ETag, answering a matching If-None-Match with 304 when
+    `revalidate`. Only safe methods (GET, HEAD) are ever answered with 304.
+    """
+    if revalidate and request.method in ('GET', 'HEAD') and status == 200 \
+            and etag_matches(request.headers.get('If-None-Match'), etag):
+        return not_modified(etag)
+
+    encoding = 'identity'
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+
+    response = Response(payload_cache.get_or_compress(encoding, body), status=status, mimetype=mimetype)
+    response.headers['ETag'] = etag_for_encoding(etag, encoding)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def json_response(payload: Any, status: int = 200, revalidate: bool = False) -> Response:
+    """
+    JSON response with a weak content ETag and negotiated compression.
+
+    GET routes pass `revalidate=True` to answer a matching If-None-Match with 304.
+    The ETag still lets clients of other methods detect an unchanged result.
+    """
+    body = current_app.json.dumps(payload).encode()
+    return conditional_response(body, weak_etag(canonical_json(payload)), 'application/json', status,
+                                revalidate)
@@ -1,8 +1,11 @@
+import copy
 import random
 from typing import Dict, Any, List, Optional
 import json
 import colorsys
 from datetime import datetime
+from resilience_utils import LatencyBudget
+from timing_utils import timed
 
 # Try to import AI personalizer
 try:
@@ -112,6 +115,7 @@ class LayoutGenerator:
         # Use classical randomization
         return random.choice(options)
     
+    @timed('layout.generate')
     def generate_layout(self, brand_color: str, font: str, style_prompt: str) -> Dict[str, Any]:
         """Generate a complete layout based on brand color, font and style prompt"""
         try:
@@ -158,8 +162,10 @@ class LayoutGenerator:
         except Exception as e:
             raise Exception(f"Layout generation failed: {str(e)}")
 
-    def generate_3d_preview_data(self, layout: Dict[str, Any], image_features: Optional[Dict[str, Any]] = None, brand_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Generate 3D preview data for Unreal Engine with AI personalization"""
+    @timed('scene.build')
+    def generate_3d_preview_data(self, layout: Dict[str, Any], image_features: Optional[Dict[str, Any]] = None, brand_analysis: Optional[Dict[str, Any]] = None,
+                                 budget: Optional[LatencyBudget] = None) -> Dict[str, Any]:
+        """Generate 3D preview data for Unreal Engine with AI personalization within an optional latency budget"""
         # Create default 3D elements based on layout sections
         elements = []
         sections = layout.get('layout', {}).get('sections', [])
@@ -507,11 +513,22 @@ class LayoutGenerator:
             try:
                 # Process image analysis if provided
                 if image_features:
+                    # Keep the non-AI scene to fall back to if the latency budget runs out
+                    # The layout under ui_elements is never modified, so share it rather than copy it
+                    base_preview_data = copy.deepcopy(preview_data, memo={id(layout): layout})
+                    base_preview_data['metadata']['ai_enhanced'] = False
+                    if budget is not None and budget.expired():
+                        return base_preview_data
+                    
                     image_analysis = self.ai_personalizer.analyze_product_image(image_features)
                     preview_data['metadata']['image_analysis'] = image_analysis
                     
                     # Enhance 3D layout with AI personalization
-                    preview_data = self.ai_personalizer.enhance_3d_layout(preview_data, image_analysis)
+                    preview_data = self.ai_personalizer.enhance_3d_layout(preview_data, image_analysis, budget=budget)
+                    # The OpenAI step failed; a description served from the style library is not a failure
+                    if budget is not None and preview_data['metadata'].get('ai_enhanced') is False \
+                            and 'style_source' not in preview_data['metadata']:
+                        return base_preview_data
                     
                     # Generate additional interactive elements
                     ai_interactive_elements = self.ai_personalizer.generate_interactive_elements(layout)
@@ -521,8 +538,8 @@ class LayoutGenerator:
                     suggestions = self.ai_personalizer.suggest_layout_improvements(layout)
                     preview_data['ai_suggestions'] = suggestions
                     
-                    # Mark as AI enhanced
-                    preview_data['metadata']['ai_enhanced'] = True
+                    # Mark as AI enhanced unless the OpenAI step reported a failure
+                    preview_data['metadata'].setdefault('ai_enhanced', True)
             except Exception as e:
                 print(f"AI personalization failed: {str(e)}")
                 # Continue with standard preview data if AI enhancement fails
@@ -0,0 +1,172 @@
+"""
+Server-side store of generated layouts
+
+Layouts are keyed by short IDs derived from their canonical content, so the same
+layout always gets the same ID. They are kept in an in-memory LRU in front of a
+SQLite table, so `/preview/<id>` links survive restarts and are shared by all
+workers. A layout's JSON may be at most `max_layout_bytes`. Layouts not stored
+again for `ttl_seconds` expire, and the table keeps only the most recent ones,
+at most `max_rows` of them and `max_bytes` in total. HTML rendered for a layout
+is cached in memory by content hash.
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from http_utils import canonical_json
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'layouts.db')
+
+# 72 bits of SHA-256, 12 URL-safe characters
+ID_BYTES = 9
+
+# Expired and surplus rows are deleted at most this often
+PRUNE_INTERVAL = 60.0
+
+
+def layout_id(layout: Dict[str, Any]) -> str:
+    """Short content-derived ID; ignores volatile fields such as generated_timestamp"""
+    digest = hashlib.sha256(canonical_json(layout)).digest()
+    return base64.urlsafe_b64encode(digest[:ID_BYTES]).decode()
+
+
+class LayoutTooLargeError(ValueError):
+    """Raised when a layout's JSON exceeds the per-layout size limit"""
+
+
+class LayoutStore:
+    """In-memory LRU of layouts backed by SQLite, plus a rendered-HTML cache"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, max_entries: int = 512,
+                 max_rendered: int = 256, ttl_seconds: Optional[float] = None,
+                 max_rows: Optional[int] = None, max_layout_bytes: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_rendered = max_rendered
+        self.ttl_seconds = ttl_seconds or float(os.getenv('LAYOUT_STORE_TTL_SECONDS', '604800'))
+        self.max_rows = max(1, max_rows or int(os.getenv('LAYOUT_STORE_MAX_ROWS', '100000')))
+        self.max_layout_bytes = max_layout_bytes or int(os.getenv('LAYOUT_MAX_BYTES', str(256 * 1024)))
+        self.max_bytes = max_bytes or int(os.getenv('LAYOUT_STORE_MAX_BYTES', str(1024 * 1024 * 1024)))
+        self.last_pruned = 0.0
+        self.memory = OrderedDict()  # layout ID -> (layout, stored at)
+        self.rendered = OrderedDict()  # (layout ID, template version) -> HTML bytes
+        self.lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS layouts (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(layouts)')]
+            if 'size' not in columns:
+                # Stores created before the byte bound; their rows count as empty until renewed
+                self.conn.execute('ALTER TABLE layouts ADD COLUMN size INTEGER NOT NULL DEFAULT 0')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS layouts_created ON layouts (created_at)')
+
+    def reopen(self):
+        """Open a fresh connection, e.g. in a forked worker that must not share the parent's"""
+        if self.path == ':memory:':
+            return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def _remember(self, key: str, layout: Dict[str, Any], stored_at: float):
+        self.memory[key] = (layout, stored_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _recall(self, key: str, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        entry = self.memory.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl_seconds:
+            del self.memory[key]
+            return None
+        self.memory.move_to_end(key)
+        return entry
+
+    def put(self, layout: Dict[str, Any], now: Optional[float] = None) -> str:
+        """Persist a layout and return its ID; storing the same layout again renews it"""
+        now = time.time() if now is None else now
+        key = layout_id(layout)
+        with self.lock:
+            entry = self._recall(key, now)
+            # Renewed in SQLite at most every half TTL, so repeated puts stay reads
+            if entry is not None and now - entry[1] < self.ttl_seconds / 2:
+                return key
+            data = json.dumps(layout, default=str)
+            if len(data) > self.max_layout_bytes:
+                raise LayoutTooLargeError(f'Layout is {len(data)} bytes, the limit is {self.max_layout_bytes}')
+            with self.conn:
+                self.conn.execute('INSERT INTO layouts (id, data, created_at, size) VALUES (?, ?, ?, ?) '
+                                  'ON CONFLICT (id) DO UPDATE SET created_at = excluded.created_at',
+                                  (key, data, now, len(data)))
+                self._prune(now)
+            self._remember(key, layout, now)
+        return key
+
+    def _prune(self, now: float):
+        """Delete expired rows and rows beyond `max_rows` or `max_bytes`, at most once per PRUNE_INTERVAL"""
+        if now - self.last_pruned < PRUNE_INTERVAL:
+            return
+        self.last_pruned = now
+        self.conn.execute('DELETE FROM layouts WHERE created_at < ?', (now - self.ttl_seconds,))
+        self.conn.execute('''
+            DELETE FROM layouts WHERE id IN (
+                SELECT id FROM layouts ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_rows,))
+        self.conn.execute('''
+            DELETE FROM layouts WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, SUM(size) OVER (ORDER BY created_at DESC, id) AS total FROM layouts
+                ) WHERE total > ?
+            )
+        ''', (self.max_bytes,))
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self._recall(key, now)
+            if entry is not None:
+                return entry[0]
+            row = self.conn.execute('SELECT data, created_at FROM layouts WHERE id = ? AND created_at >= ?',
+                                    (key, now - self.ttl_seconds)).fetchone()
+            if row is None:
+                return None
+            layout = json.loads(row[0])
+            self._remember(key, layout, row[1])
+            return layout
+
+    def get_rendered(self, key: str, version: Any) -> Optional[bytes]:
+        with self.lock:
+            html = self.rendered.get((key, version))
+            if html is not None:
+                self.rendered.move_to_end((key, version))
+            return html
+
+    def put_rendered(self, key: str, version: Any, html: bytes):
+        with self.lock:
+            self.rendered[(key, version)] = html
+            self.rendered.move_to_end((key, version))
+            while len(self.rendered) > self.max_rendered:
+                self.rendered.popitem(last=False)
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM layouts').fetchone()[0]
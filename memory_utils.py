@@ -0,0 +1,125 @@
+"""
+Per-request peak memory accounting with tracemalloc
+
+With MEMORY_TRACKING=1, tracemalloc runs for the life of the process. Each
+request's peak heap growth (peak traced memory minus what was allocated when the
+request started) is recorded in a histogram, which is exposed on `/metrics`.
+tracemalloc's peak is process-wide, so a request is only recorded when no other
+request was in flight at any point while it ran; the rest are counted as
+untracked.
+NumPy and OpenCV arrays are traced. Pillow's and OpenCV's internal C buffers are
+not.
+
+tracemalloc slows allocation-heavy code noticeably, so tracking is off by default.
+Enable it on a canary worker or while investigating memory growth.
+"""
+
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional
+
+from flask import Flask, g, request
+
+from timing_utils import Histogram
+
+MIB = 1024 * 1024
+
+MEMORY_BUCKETS = (64 * 1024, 256 * 1024, MIB, 4 * MIB, 16 * MIB, 32 * MIB, 64 * MIB, 128 * MIB, 256 * MIB)
+
+request_peak_bytes = Histogram('holobrand_request_peak_memory_bytes',
+                               'Peak Python heap growth while handling a request.', ('endpoint',),
+                               buckets=MEMORY_BUCKETS)
+
+
+class PeakTracker:
+    """Attributes tracemalloc's process-wide peak to a request that ran alone"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.active = False
+        self.overlapped = False
+        self.baseline = 0
+        self.untracked = 0
+
+    def begin(self) -> bool:
+        """Enter a request; start measuring it if no other request is in flight"""
+        with self.lock:
+            self.in_flight += 1
+            if self.in_flight > 1 or not tracemalloc.is_tracing():
+                if self.active:
+                    # The running measurement now includes this request's allocations
+                    self.overlapped = True
+                self.untracked += 1
+                return False
+            self.active = True
+            self.overlapped = False
+            tracemalloc.reset_peak()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+            return True
+
+    def end(self, measured: bool) -> Optional[int]:
+        """Leave a request; peak bytes above its starting point if it ran alone"""
+        with self.lock:
+            self.in_flight -= 1
+            if not measured:
+                return None
+            _, peak = tracemalloc.get_traced_memory()
+            self.active = False
+            if self.overlapped:
+                self.untracked += 1
+                return None
+            return max(0, peak - self.baseline)
+
+
+peak_tracker = PeakTracker()
+
+
+class PeakMeasurement:
+    peak_bytes = 0
+
+
+@contextmanager
+def measure_peak():
+    """Measure the peak heap growth of the enclosed block, starting tracemalloc if needed"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    measurement = PeakMeasurement()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        yield measurement
+    finally:
+        measurement.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+        if started:
+            tracemalloc.stop()
+
+
+def init_app(flask_app: Flask):
+    """Record each request's peak memory when MEMORY_TRACKING=1"""
+    if os.getenv('MEMORY_TRACKING', '0') != '1':
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    @flask_app.before_request
+    def start_memory_tracking():
+        g.memory_tracked = peak_tracker.begin()
+
+    @flask_app.after_request
+    def record_peak_memory(response):
+        if 'memory_tracked' in g:
+            peak = peak_tracker.end(g.pop('memory_tracked'))
+            if peak is not None:
+                endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                request_peak_bytes.observe((endpoint,), peak)
+        return response
+
+    @flask_app.teardown_request
+    def release_memory_tracking(_exc):
+        # The request failed before after_request ran
+        if 'memory_tracked' in g:
+            peak_tracker.end(g.pop('memory_tracked'))
@@ -0,0 +1,240 @@
+"""
+Local OpenAI-compatible stand-in server
+
+Speaks the chat-completions wire format used by OpenAIPersonalizer so the
+personalization path can be exercised and load-tested without the real API.
+
+Usage:
+    python openai_stub_server.py [--port 8765] [--latency lognormal:200,0.5]
+                                 [--error-rate 0.05] [--seed 42]
+
+Point the app at it with:
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1
+    OPENAI_API_KEY=stub
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+DEFAULT_SUGGESTIONS = {
+    "suggestions": {
+        "layout": ["Lead with a full-width hero image", "Use a three-column product grid"],
+        "colors": ["Reserve the accent color for call-to-action buttons"],
+        "typography": ["Pair a serif heading font with a sans-serif body font"],
+        "spacing": ["Increase vertical spacing between sections"]
+    }
+}
+
+DEFAULT_DESCRIPTION = (
+    "A refined eCommerce style with generous whitespace and a restrained palette. "
+    "Product imagery is the focal point, framed by clean typography. "
+    "Subtle motion guides the shopper toward the call to action."
+)
+
+
+class LatencyModel:
+    """Samples response latencies (in seconds) from a configured distribution"""
+
+    def __init__(self, spec: str = "fixed:0", seed: Optional[int] = None):
+        self.spec = spec
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        kind, _, params = spec.partition(':')
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(',') if p.strip()] or [0.0]
+        if self.kind not in ('fixed', 'uniform', 'normal', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+
+    def sample(self) -> float:
+        """Return a latency in seconds; parameters are given in milliseconds"""
+        with self.lock:
+            if self.kind == 'fixed':
+                value = self.params[0]
+            elif self.kind == 'uniform':
+                low, high = self.params[0], self.params[-1]
+                value = self.random.uniform(low, high)
+            elif self.kind == 'normal':
+                mean, stddev = self.params[0], self.params[1] if len(self.params) > 1 else 0.0
+                value = self.random.gauss(mean, stddev)
+            else:
+                median, sigma = self.params[0], self.params[1] if len(self.params) > 1 else 0.5
+                value = median * self.random.lognormvariate(0, sigma)
+        return max(0.0, value) / 1000.0
+
+
+class OpenAIStubServer:
+    """Threaded HTTP server answering /v1/chat/completions with canned responses"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'fixed:0',
+                 error_rate: float = 0.0, seed: Optional[int] = None,
+                 responses: Optional[Dict[str, Any]] = None):
+        self.latency = LatencyModel(latency, seed)
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.responses = responses or {}
+        self.request_count = 0
+        self.error_count = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'OpenAIStubServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self) -> 'OpenAIStubServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def completion_text(self, messages: List[Dict[str, str]]) -> str:
+        """Pick the canned reply for a conversation"""
+        prompt = messages[-1].get('content', '') if messages else ''
+        if 'suggestions' in prompt:
+            return self.responses.get('suggestions') or json.dumps(DEFAULT_SUGGESTIONS)
+        return self.responses.get('description') or DEFAULT_DESCRIPTION
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            self.request_count += 1
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        return failed
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except json.JSONDecodeError:
+                    return self._send_json(400, {'error': {'message': 'Invalid JSON body',
+                                                           'type': 'invalid_request_error'}})
+
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    return self._send_json(404, {'error': {'message': f'Unknown path {self.path}',
+                                                           'type': 'invalid_request_error'}})
+
+                time.sleep(stub.latency.sample())
+
+                if stub.should_fail():
+                    return self._send_json(500, {'error': {'message': 'Injected stub failure',
+                                                           'type': 'server_error'}})
+
+                model = request.get('model', 'gpt-3.5-turbo')
+                text = stub.completion_text(request.get('messages', []))
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+                if request.get('stream'):
+                    return self._stream(completion_id, model, text)
+
+                self._send_json(200, {
+                    'id': completion_id,
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': text},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {
+                        'prompt_tokens': 0,
+                        'completion_tokens': len(text.split()),
+                        'total_tokens': len(text.split())
+                    }
+                })
+
+            def _stream(self, completion_id: str, model: str, text: str):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                words = text.split(' ')
+                deltas = [{'role': 'assistant', 'content': ''}]
+                deltas += [{'content': word if i == 0 else f' {word}'} for i, word in enumerate(words)]
+                for i, delta in enumerate(deltas + [{}]):
+                    chunk = {
+                        'id': completion_id,
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': model,
+                        'choices': [{
+                            'index': 0,
+                            'delta': delta,
+                            'finish_reason': 'stop' if i == len(deltas) else None
+                        }]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0',
+                        help='fixed:MS | uniform:LOW,HIGH | normal:MEAN,STD | lognormal:MEDIAN,SIGMA')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--responses', help='JSON file with "suggestions" and/or "description" replies')
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+
+    server = OpenAIStubServer(args.host, args.port, args.latency, args.error_rate, args.seed, responses)
+    print(f"OpenAI stand-in listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,118 @@
 import os
-import openai
-from typing import Dict, Any, List
-from dotenv import load_dotenv
+import json
+from typing import Dict, Any, List, Optional
+from config import load_config
+from prompt_cache import SemanticPromptCache
+from resilience_utils import (AIUnavailableError, CircuitBreaker, DeadlineExceededError, LatencyBudget,
+                              call_with_hedging)
+from timing_utils import stage
 
 # Load environment variables
-load_dotenv()
+load_config()
 
-# Configure OpenAI API
-openai.api_key = os.getenv("OPENAI_API_KEY")
+def _openai():
+    """
+    The openai package, imported on first use to keep app startup fast.
+
+    On import it reads OPENAI_API_KEY, and OPENAI_API_BASE (to point at a local
+    stand-in, see openai_stub_server.py), from the environment loaded above.
+    """
+    import openai
+    return openai
+
+# Process-wide cache so equivalent free-form prompts share one LLM response
+prompt_cache = SemanticPromptCache(
+    threshold=float(os.getenv("PROMPT_CACHE_SIMILARITY", "0.75")),
+    max_entries=int(os.getenv("PROMPT_CACHE_SIZE", "1024"))
+)
 
 class OpenAIPersonalizer:
     def __init__(self):
         self.model = "gpt-3.5-turbo"
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("OPENAI_BREAKER_THRESHOLD", "3")),
+            reset_timeout=float(os.getenv("OPENAI_BREAKER_RESET_SECONDS", "30"))
+        )
+        # Hedged retries are off unless OPENAI_HEDGE_AFTER_MS is configured
+        hedge_after_ms = float(os.getenv("OPENAI_HEDGE_AFTER_MS", "0"))
+        self.hedge_after = hedge_after_ms / 1000 if hedge_after_ms > 0 else None
+        self.prompt_cache = prompt_cache
+    
+    def _chat_completion(self, messages: List[Dict[str, str]], max_tokens: int,
+                         budget: Optional[LatencyBudget] = None) -> str:
+        """
+        Call the chat completions API within the latency budget and circuit breaker
+        """
+        if budget is not None and budget.expired():
+            raise AIUnavailableError("Latency budget exhausted before OpenAI call")
+        if not self.circuit_breaker.allow():
+            raise AIUnavailableError("OpenAI circuit breaker is open")
+        
+        timeout = budget.remaining() if budget is not None else None
+        request_args = {
+            'model': self.model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': 0.7
+        }
+        if timeout is not None:
+            request_args['request_timeout'] = timeout
+        
+        try:
+            with stage('openai.chat'):
+                response = call_with_hedging(lambda: _openai().ChatCompletion.create(**request_args),
+                                             timeout=timeout, hedge_after=self.hedge_after)
+        except DeadlineExceededError:
+            # The request's own budget ran out, which says nothing about OpenAI's health
+            self.circuit_breaker.record_abandoned()
+            raise
+        except Exception:
+            if budget is not None and budget.expired():
+                # OpenAI's request_timeout was cut to the remaining budget
+                self.circuit_breaker.record_abandoned()
+            else:
+                self.circuit_breaker.record_failure()
+            raise
+        
+        self.circuit_breaker.record_success()
+        return response.choices[0].message.content
     
     def enhance_layout_with_ai(self, layout_data: Dict[str, Any], style_prompt: str, 
-                              image_features: Dict[str, Any] = None) -> Dict[str, Any]:
+                              image_features: Dict[str, Any] = None,
+                              budget: Optional[LatencyBudget] = None,
+                              raise_errors: bool = False) -> Dict[str, Any]:
         """
         Enhance layout with AI personalization using OpenAI
+
+        On failure the original layout is returned, or the error raised with `raise_errors`.
         """
         try:
-            # Prepare prompt with layout data and style prompt
-            prompt = self._prepare_prompt(layout_data, style_prompt, image_features)
+            # Equivalent style prompts for the same layout share one cached response
+            cache_context = json.dumps([layout_data, image_features], sort_keys=True, default=str)
+            ai_suggestions = self.prompt_cache.get(style_prompt, cache_context)
             
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a UI/UX expert specializing in eCommerce layouts."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
+            if ai_suggestions is None:
+                # Prepare prompt with layout data and style prompt
+                prompt = self._prepare_prompt(layout_data, style_prompt, image_features)
+                
+                # Call OpenAI API
+                ai_suggestions = self._chat_completion(
+                    messages=[
+                        {"role": "system", "content": "You are a UI/UX expert specializing in eCommerce layouts."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=500,
+                    budget=budget
+                )
+                self.prompt_cache.put(style_prompt, ai_suggestions, cache_context)
             
-            # Extract and parse AI suggestions
-            ai_suggestions = response.choices[0].message.content
+            # Parse AI suggestions
             enhanced_layout = self._parse_ai_suggestions(layout_data, ai_suggestions)
             
             return enhanced_layout
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error in OpenAI personalization: {str(e)}")
             # Return original layout if AI enhancement fails
             return layout_data
@@ -104,22 +178,31 @@ class OpenAIPersonalizer:
         
         return enhanced_layout
     
-    def generate_style_description(self, style_prompt: str) -> str:
+    def request_style_description(self, style_prompt: str,
+                                  budget: Optional[LatencyBudget] = None) -> str:
         """
-        Generate a detailed style description based on a brief prompt
+        Request a style description from OpenAI, raising if the call fails or is skipped
         """
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
+        description = self.prompt_cache.get(style_prompt, 'style_description')
+        if description is None:
+            description = self._chat_completion(
                 messages=[
                     {"role": "system", "content": "You are a UI/UX design expert."},
                     {"role": "user", "content": f"Describe a {style_prompt} style for an eCommerce website in 3-4 sentences."}
                 ],
                 max_tokens=150,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
+                budget=budget
+            ).strip()
+            self.prompt_cache.put(style_prompt, description, 'style_description')
+        return description
+    
+    def generate_style_description(self, style_prompt: str,
+                                   budget: Optional[LatencyBudget] = None) -> str:
+        """
+        Generate a detailed style description based on a brief prompt
+        """
+        try:
+            return self.request_style_description(style_prompt, budget)
         except Exception as e:
             print(f"Error generating style description: {str(e)}")
             return f"A {style_prompt} style for eCommerce."
\ No newline at end of file
@@ -0,0 +1,259 @@
+"""
+On-demand sampling profiler
+
+A background thread reads every thread's Python stack via `sys._current_frames()`
+at a fixed interval and counts identical stacks. Nothing runs unless a profile
+was asked for. Results are rendered as collapsed stacks (one `a;b;c count` line
+per stack, for flamegraph.pl or speedscope) or as speedscope JSON.
+
+Two ways to profile, both admin-only (ADMIN_TOKEN):
+  - whole process: `GET /admin/profile?seconds=10` samples all threads
+  - one request: send `X-Profile: 1`; the handling thread is sampled and the
+    response carries `X-Profile-Id`, retrievable from `/admin/profiles/<id>`
+
+Work a profiled request hands to a thread pool is sampled too: `profiled(func)`
+adds the pool thread to the request's sampled threads while it runs `func`.
+`run_cpu_bound` and `call_with_hedging` wrap their work this way.
+"""
+
+import os
+import sys
+import hmac
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+DEFAULT_INTERVAL = 0.005
+MAX_DEPTH = 128
+
+# Leaf frames of threads that are parked, not working; left out unless asked for
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socketserver.py', 'serve_forever'),
+    ('thread.py', '_worker'),
+}
+
+# (function, file, first line)
+Frame = Tuple[str, str, int]
+
+
+def stack_key(frame, max_depth: int = MAX_DEPTH) -> Tuple[Frame, ...]:
+    """The stack ending in `frame`, outermost call first"""
+    frames = []
+    while frame is not None and len(frames) < max_depth:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def is_idle(stack: Tuple[Frame, ...]) -> bool:
+    if not stack:
+        return True
+    name, filename, _ = stack[-1]
+    return (os.path.basename(filename), name) in IDLE_LEAVES
+
+
+def frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+class StackSampler:
+    """Counts the stacks of some or all threads until stopped"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_ids: Optional[Set[int]] = None,
+                 include_idle: bool = False):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.include_idle = include_idle
+        self.counts = Counter()  # stack -> samples
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'StackSampler':
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self.counts
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                stack = stack_key(frame)
+                if self.include_idle or not is_idle(stack):
+                    self.counts[stack] += 1
+            self.samples += 1
+
+
+def profile(seconds: float, interval: float = DEFAULT_INTERVAL, include_idle: bool = False) -> StackSampler:
+    """Sample every thread for `seconds` and return the stopped sampler"""
+    sampler = StackSampler(interval, include_idle=include_idle).start()
+    time.sleep(seconds)
+    sampler.stop()
+    return sampler
+
+
+def to_collapsed(counts: Counter) -> str:
+    """Brendan Gregg's collapsed-stack format, heaviest stacks first"""
+    lines = [';'.join(frame_label(frame) for frame in stack) + f' {count}'
+             for stack, count in counts.most_common()]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def to_speedscope(sampler: StackSampler, name: str = 'holobrand') -> Dict[str, Any]:
+    """speedscope's sampled-profile JSON, weighted in seconds"""
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, count in sampler.counts.most_common():
+        indices = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+            indices.append(index[frame])
+        samples.append(indices)
+        weights.append(count * sampler.interval)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'holobrand-profiler',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights
+        }]
+    }
+
+
+# Threads sampled for the current profiled request; None when it is not profiled
+_request_threads = contextvars.ContextVar('profile_threads', default=None)
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """`func`, sampled on whichever thread runs it if the calling request is being profiled"""
+    threads = _request_threads.get()
+    if threads is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        threads.add(ident)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            threads.discard(ident)
+    return run
+
+
+def is_admin(req) -> bool:
+    """True if the request carries ADMIN_TOKEN; always False when no token is configured"""
+    token = os.getenv('ADMIN_TOKEN')
+    if not token:
+        return False
+    auth = req.headers.get('Authorization', '')
+    supplied = auth[7:] if auth.startswith('Bearer ') else req.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+class RequestProfiles:
+    """The most recent per-request profiles, by ID"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # profile ID -> (label, sampler)
+        self.lock = threading.Lock()
+
+    def add(self, label: str, sampler: StackSampler) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        with self.lock:
+            self.entries[profile_id] = (label, sampler)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Tuple[str, StackSampler]]:
+        with self.lock:
+            return self.entries.get(profile_id)
+
+    def ids(self) -> Iterable[str]:
+        with self.lock:
+            return list(self.entries)
+
+
+request_profiles = RequestProfiles()
+
+# Only one whole-process profile runs at a time
+process_profile_lock = threading.Lock()
+
+
+def init_app(flask_app: 'Flask'):
+    """Profile individual requests sent with an `X-Profile` header by an admin"""
+    from flask import g, jsonify, request
+
+    @flask_app.before_request
+    def start_request_profile():
+        # The only cost when not profiling is this header lookup
+        if 'X-Profile' not in request.headers or not is_admin(request):
+            return None
+        interval = 1.0
+        if 'X-Profile-Interval-Ms' in request.headers:
+            interval = request.headers.get('X-Profile-Interval-Ms', type=float)
+            if interval is None or not interval > 0:
+                return jsonify({'error': 'X-Profile-Interval-Ms must be a positive number'}), 400
+        threads = {threading.get_ident()}
+        g.profile_token = _request_threads.set(threads)
+        g.profile_sampler = StackSampler(interval / 1000, thread_ids=threads, include_idle=True).start()
+        return None
+
+    @flask_app.after_request
+    def finish_request_profile(response):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is not None:
+            sampler.stop()
+            response.headers['X-Profile-Id'] = request_profiles.add(f'{request.method} {request.path}', sampler)
+        return response
+
+    @flask_app.teardown_request
+    def abandon_request_profile(_exc):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is not None:
+            sampler.stop()
+        token = g.pop('profile_token', None)
+        if token is not None:
+            try:
+                _request_threads.reset(token)
+            except ValueError:
+                # Torn down in a different context than the one it was set in
+                _request_threads.set(None)
@@ -0,0 +1,164 @@
+import re
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+# Filler words that do not change the meaning of a style prompt
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'with', 'for', 'of', 'in', 'on', 'to', 'very', 'really',
+    'look', 'looking', 'style', 'styled', 'feel', 'vibe', 'design', 'aesthetic', 'theme'
+}
+
+# Suffixes stripped by the light stemmer, longest first
+SUFFIXES = ('iously', 'ously', 'ically', 'ation', 'ness', 'ment', 'ious', 'ical', 'ful',
+            'ous', 'ist', 'ism', 'ies', 'ing', 'ity', 'ly', 'ed', 'es', 'al', 'y', 's')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def stem(token: str) -> str:
+    """Strip common English suffixes so 'luxury' and 'luxurious' share a stem"""
+    # Two passes so stacked suffixes ('minimal-ist') reduce to the same stem
+    for _ in range(2):
+        for suffix in SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                break
+    return token
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonicalize a free-form style prompt: casing, punctuation, stemming and token order"""
+    tokens = re.findall(r'[a-z0-9]+', (prompt or '').lower())
+    stems = {stem(token) for token in tokens if token not in STOPWORDS}
+    return ' '.join(sorted(stems))
+
+
+def shingles(canonical: str) -> Set[str]:
+    """Character trigrams of each canonical token, so near-spellings overlap"""
+    result = set()
+    for token in canonical.split():
+        padded = f'^{token}$'
+        result.update(padded[i:i + 3] for i in range(max(1, len(padded) - 2)))
+    return result
+
+
+class MinHasher:
+    """MinHash signatures over shingle sets"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                             for _ in range(num_perm)]
+
+    def signature(self, items: Set[str]) -> Tuple[int, ...]:
+        hashes = [int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), 'big')
+                  for item in items] or [0]
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.permutations)
+
+
+class SemanticPromptCache:
+    """
+    Cache of LLM responses keyed by normalized prompts.
+
+    Exact canonical matches are served directly; near-duplicates are found with
+    MinHash/LSH and accepted when their shingle Jaccard similarity reaches `threshold`.
+    """
+
+    def __init__(self, threshold: float = 0.75, max_entries: int = 1024,
+                 num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.entries = OrderedDict()  # (context, canonical) -> (value, shingles, band keys)
+        self.buckets = {}  # band key -> set of entry keys
+        self.lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_similar = 0
+        self.misses = 0
+
+    def _band_keys(self, context: str, items: Set[str]) -> List[Tuple[str, int, Tuple[int, ...]]]:
+        signature = self.hasher.signature(items)
+        return [(context, band, signature[band * self.rows:(band + 1) * self.rows])
+                for band in range(self.bands)]
+
+    def get(self, prompt: str, context: str = '') -> Optional[Any]:
+        """Return a cached response for an equivalent prompt, or None"""
+        canonical = normalize_prompt(prompt)
+        key = (context, canonical)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits_exact += 1
+                return self.entries[key][0]
+
+            if self.threshold < 1.0 and canonical:
+                items = shingles(canonical)
+                candidates = set()
+                for band_key in self._band_keys(context, items):
+                    candidates.update(self.buckets.get(band_key, ()))
+
+                best_key, best_score = None, 0.0
+                for candidate in candidates:
+                    other = self.entries[candidate][1]
+                    score = len(items & other) / len(items | other)
+                    if score > best_score:
+                        best_key, best_score = candidate, score
+
+                if best_key is not None and best_score >= self.threshold:
+                    self.entries.move_to_end(best_key)
+                    self.hits_similar += 1
+                    return self.entries[best_key][0]
+
+            self.misses += 1
+            return None
+
+    def put(self, prompt: str, value: Any, context: str = ''):
+        """Store a response under the prompt's canonical form"""
+        canonical = normalize_prompt(prompt)
+        key = (context, canonical)
+        items = shingles(canonical)
+        band_keys = self._band_keys(context, items)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, items, band_keys)
+            for band_key in band_keys:
+                self.buckets.setdefault(band_key, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        _, _, band_keys = self.entries.pop(key)
+        for band_key in band_keys:
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.buckets.clear()
+            self.hits_exact = self.hits_similar = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for tuning the similarity threshold"""
+        with self.lock:
+            lookups = self.hits_exact + self.hits_similar + self.misses
+            return {
+                'entries': len(self.entries),
+                'threshold': self.threshold,
+                'hits_exact': self.hits_exact,
+                'hits_similar': self.hits_similar,
+                'misses': self.misses,
+                'hit_rate': (self.hits_exact + self.hits_similar) / lookups if lookups else 0.0
+            }
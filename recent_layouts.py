@@ -0,0 +1,90 @@
+"""
+Per-client registry of recently generated layouts
+
+Replaces the process-global "latest layout". Each client (identified by an
+`X-Client-Id` header or the `holobrand_client` cookie) keeps its last few layout
+IDs for a limited time. The registry lives in SQLite next to the layout store, so
+a follow-up `/api/3d-preview` can be served by any worker without the client
+re-sending the layout.
+"""
+
+import os
+import re
+import time
+import secrets
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from layout_store import DEFAULT_STORE_PATH
+
+CLIENT_COOKIE = 'holobrand_client'
+CLIENT_HEADER = 'X-Client-Id'
+
+# Client IDs are opaque tokens; anything else is ignored and replaced
+CLIENT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def client_id_for(request) -> Tuple[str, bool]:
+    """The requesting client's ID, and whether it was newly issued"""
+    for candidate in (request.headers.get(CLIENT_HEADER), request.cookies.get(CLIENT_COOKIE)):
+        if candidate and CLIENT_ID_PATTERN.match(candidate):
+            return candidate, False
+    return secrets.token_urlsafe(16), True
+
+
+class RecentLayouts:
+    """Bounded, expiring list of layout IDs per client, shared through SQLite"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, max_per_client: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_per_client = max(1, max_per_client or int(os.getenv('RECENT_LAYOUTS_PER_CLIENT', '8')))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('RECENT_LAYOUT_TTL_SECONDS', '3600'))
+        self.lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS recent_layouts (
+                    client_id TEXT NOT NULL,
+                    layout_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (client_id, layout_id)
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS recent_layouts_created ON recent_layouts (created_at)')
+
+    def reopen(self):
+        """Open a fresh connection, e.g. in a forked worker that must not share the parent's"""
+        if self.path == ':memory:':
+            return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def record(self, client_id: str, layout_id: str, now: Optional[float] = None):
+        """Make `layout_id` the client's most recent layout, dropping old and expired entries"""
+        now = time.time() if now is None else now
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO recent_layouts (client_id, layout_id, created_at) '
+                              'VALUES (?, ?, ?)', (client_id, layout_id, now))
+            self.conn.execute('''
+                DELETE FROM recent_layouts WHERE client_id = ? AND layout_id NOT IN (
+                    SELECT layout_id FROM recent_layouts WHERE client_id = ?
+                    ORDER BY created_at DESC LIMIT ?
+                )
+            ''', (client_id, client_id, self.max_per_client))
+            self.conn.execute('DELETE FROM recent_layouts WHERE created_at < ?', (now - self.ttl_seconds,))
+
+    def recent(self, client_id: str, now: Optional[float] = None) -> List[str]:
+        """The client's unexpired layout IDs, newest first"""
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = self.conn.execute('SELECT layout_id FROM recent_layouts WHERE client_id = ? AND created_at >= ? '
+                                     'ORDER BY created_at DESC', (client_id, now - self.ttl_seconds)).fetchall()
+        return [row[0] for row in rows]
+
+    def latest(self, client_id: str, now: Optional[float] = None) -> Optional[str]:
+        ids = self.recent(client_id, now)
+        return ids[0] if ids else None
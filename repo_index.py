@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'github_index.db')
+
+# GitHub search qualifiers that map onto indexed columns
+COLUMN_QUALIFIERS = {'language': 'language', 'topic': 'topics'}
+
+
+def normalize_query(query: str) -> str:
+    return ' '.join((query or '').lower().split())
+
+
+def build_fts_query(query: str) -> Optional[str]:
+    """
+    Translate a GitHub search query into an FTS5 MATCH expression.
+
+    Returns None when the query uses qualifiers the local index cannot answer
+    (e.g. `stars:>100` or `org:name`), so the caller goes to GitHub instead.
+    """
+    terms = []
+    for token in normalize_query(query).split():
+        if ':' in token:
+            qualifier, _, value = token.partition(':')
+            column = COLUMN_QUALIFIERS.get(qualifier)
+            words = re.findall(r'\w+', value)
+            if column is None or not words:
+                return None
+            terms.append(f'{column} : (' + ' '.join(f'"{word}"' for word in words) + ')')
+        else:
+            terms.extend(f'"{word}"*' for word in re.findall(r'\w+', token))
+    return ' AND '.join(terms) if terms else None
+
+
+class RepoIndex:
+    """Local SQLite FTS5 index over fetched GitHub repository metadata"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS repos (
+                    id INTEGER PRIMARY KEY,
+                    full_name TEXT UNIQUE,
+                    data TEXT NOT NULL,
+                    indexed_at REAL NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS repos_fts USING fts5(
+                    name, full_name, description, topics, language
+                );
+                CREATE TABLE IF NOT EXISTS queries (
+                    query TEXT PRIMARY KEY,
+                    refreshed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS query_results (
+                    query TEXT NOT NULL,
+                    full_name TEXT NOT NULL,
+                    position INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (query, full_name)
+                );
+                CREATE INDEX IF NOT EXISTS query_results_full_name ON query_results (full_name);
+            ''')
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(query_results)')]
+            if 'position' not in columns:
+                self.conn.execute('ALTER TABLE query_results ADD COLUMN position INTEGER NOT NULL DEFAULT 0')
+
+    def reopen(self):
+        """Open a fresh connection, e.g. in a forked worker that must not share the parent's"""
+        if self.path == ':memory:':
+            return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def upsert(self, repos: List[Dict[str, Any]]):
+        """Insert or replace repositories in the index"""
+        now = time.time()
+        rows = [repo for repo in repos if isinstance(repo, dict) and repo.get('id') is not None]
+        with self.lock, self.conn:
+            for repo in rows:
+                self.conn.execute('DELETE FROM repos_fts WHERE rowid = ?', (repo['id'],))
+                self.conn.execute('DELETE FROM repos WHERE full_name = ? AND id != ?',
+                                  (repo.get('full_name'), repo['id']))
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO repos (id, full_name, data, indexed_at) VALUES (?, ?, ?, ?)',
+                    (repo['id'], repo.get('full_name'), json.dumps(repo), now)
+                )
+                self.conn.execute(
+                    'INSERT INTO repos_fts (rowid, name, full_name, description, topics, language) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (repo['id'], repo.get('name') or '', repo.get('full_name') or '',
+                     repo.get('description') or '', ' '.join(repo.get('topics') or []),
+                     repo.get('language') or '')
+                )
+
+    def remove(self, full_name: str) -> bool:
+        """Drop a repository from the index; returns True if it was present"""
+        with self.lock, self.conn:
+            row = self.conn.execute('SELECT id FROM repos WHERE full_name = ?', (full_name,)).fetchone()
+            if row is None:
+                return False
+            self.conn.execute('DELETE FROM repos_fts WHERE rowid = ?', (row[0],))
+            self.conn.execute('DELETE FROM repos WHERE id = ?', (row[0],))
+            return True
+
+    def get(self, full_name: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM repos WHERE full_name = ?', (full_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(self, query: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Local search; None if the query cannot be answered from the index.
+
+        A query refreshed from GitHub returns the repositories GitHub returned for it,
+        in GitHub's order, with their current indexed data. Any other query is a ranked
+        full-text match over everything indexed.
+        """
+        recorded = self._recorded_results(query, limit)
+        if recorded is not None:
+            return recorded
+        match = build_fts_query(query)
+        if match is None:
+            return None
+        sql = ('SELECT repos.data FROM repos_fts JOIN repos ON repos.id = repos_fts.rowid '
+               'WHERE repos_fts MATCH ? ORDER BY bm25(repos_fts) LIMIT ?')
+        with self.lock:
+            try:
+                rows = self.conn.execute(sql, (match, limit if limit is not None else -1)).fetchall()
+            except sqlite3.OperationalError as e:
+                print(f"Local repository search failed: {str(e)}")
+                return None
+        return [json.loads(row[0]) for row in rows]
+
+    def _recorded_results(self, query: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        query = normalize_query(query)
+        with self.lock:
+            if self.conn.execute('SELECT 1 FROM queries WHERE query = ?', (query,)).fetchone() is None:
+                return None
+            rows = self.conn.execute(
+                'SELECT repos.data FROM query_results JOIN repos ON repos.full_name = query_results.full_name '
+                'WHERE query_results.query = ? ORDER BY query_results.position LIMIT ?',
+                (query, limit if limit is not None else -1)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query_age(self, query: str) -> Optional[float]:
+        """Seconds since a query was last refreshed from GitHub, or None if never"""
+        with self.lock:
+            row = self.conn.execute('SELECT refreshed_at FROM queries WHERE query = ?',
+                                    (normalize_query(query),)).fetchone()
+        return time.time() - row[0] if row else None
+
+    def mark_refreshed(self, query: str, repos: Optional[List[Dict[str, Any]]] = None):
+        """Record that `query` was just fetched from GitHub and which repositories it returned"""
+        query = normalize_query(query)
+        names = list(dict.fromkeys(repo.get('full_name') for repo in repos or []
+                                   if isinstance(repo, dict) and repo.get('full_name')))
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO queries (query, refreshed_at) VALUES (?, ?)',
+                              (query, time.time()))
+            self.conn.execute('DELETE FROM query_results WHERE query = ?', (query,))
+            self.conn.executemany('INSERT INTO query_results (query, full_name, position) VALUES (?, ?, ?)',
+                                  [(query, name, position) for position, name in enumerate(names)])
+
+    def invalidate_queries(self, full_name: str) -> int:
+        """
+        Force the cached queries a repository affects to be refreshed from GitHub.
+
+        These are the queries whose last results contained it, the queries naming its
+        owner (e.g. `user:acme`), and the queries it matches in the index now. Returns
+        the number of queries invalidated.
+        """
+        owner = full_name.split('/')[0].lower()
+        with self.lock, self.conn:
+            affected = {row[0] for row in self.conn.execute(
+                'SELECT query FROM query_results WHERE full_name = ?', (full_name,))}
+            row = self.conn.execute('SELECT id FROM repos WHERE full_name = ?', (full_name,)).fetchone()
+            for (query,) in self.conn.execute('SELECT query FROM queries').fetchall():
+                if query in affected:
+                    continue
+                if any(token.partition(':')[2] == owner for token in query.split()):
+                    affected.add(query)
+                    continue
+                match = build_fts_query(query)
+                if row is None or match is None:
+                    continue
+                try:
+                    if self.conn.execute('SELECT 1 FROM repos_fts WHERE rowid = ? AND repos_fts MATCH ?',
+                                         (row[0], match)).fetchone():
+                        affected.add(query)
+                except sqlite3.OperationalError:
+                    affected.add(query)
+            for query in affected:
+                self.conn.execute('DELETE FROM queries WHERE query = ?', (query,))
+                self.conn.execute('DELETE FROM query_results WHERE query = ?', (query,))
+        return len(affected)
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM repos').fetchone()[0]
@@ -0,0 +1,141 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Optional
+
+from profiler_utils import profiled
+
+
+class AIUnavailableError(Exception):
+    """Raised when an AI call is skipped because of the latency budget or an open circuit"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """The caller's deadline passed; says nothing about the health of the dependency"""
+
+
+class LatencyBudget:
+    """Per-request deadline passed down through the preview pipeline"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+
+    @classmethod
+    def from_ms(cls, milliseconds: Optional[float]) -> Optional['LatencyBudget']:
+        """Create a budget from milliseconds; returns None for an unlimited budget"""
+        if milliseconds is None or float(milliseconds) <= 0:
+            return None
+        return cls(float(milliseconds) / 1000.0)
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    """Skips calls to a failing dependency after consecutive failures or timeouts"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now"""
+        with self.lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.half_open_trial:
+                # Let a single trial call through to probe the dependency
+                self.half_open_trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.half_open_trial = False
+
+    def record_abandoned(self):
+        """The call was given up by the caller; neither a success nor a failure"""
+        with self.lock:
+            self.half_open_trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.half_open_trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.half_open_trial = False
+
+
+# Shared pool for budgeted and hedged calls; threads are reused across requests
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("AI_CALL_THREADS", "16")),
+                               thread_name_prefix="ai-call")
+
+
+def call_with_hedging(func: Callable[[], Any], timeout: Optional[float] = None,
+                      hedge_after: Optional[float] = None, max_attempts: int = 2) -> Any:
+    """
+    Call `func`, giving up after `timeout` seconds.
+
+    If `hedge_after` is set and no attempt has finished by then, a duplicate
+    attempt is started (up to `max_attempts`) and the first success wins.
+    """
+    if timeout is None and not hedge_after:
+        return func()
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    # Pool threads are sampled along with the request when it is being profiled
+    func = profiled(func)
+    pending = {_executor.submit(func)}
+    attempts = 1
+    last_error = None
+
+    while pending:
+        wait_for = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if hedge_after and attempts < max_attempts:
+            wait_for = hedge_after if wait_for is None else min(wait_for, hedge_after)
+
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            last_error = future.exception()
+
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if hedge_after and attempts < max_attempts and (not done or not pending):
+            # Hedge a slow attempt, or retry a failed one while budget remains
+            pending.add(_executor.submit(func))
+            attempts += 1
+
+    if last_error is not None and not pending:
+        raise last_error
+    raise DeadlineExceededError(f"AI call did not complete within {timeout:.3f}s")
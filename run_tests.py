@@ -15,6 +15,9 @@ Options:
     --ai            Run only AI utils tests
     --github        Run only GitHub integration tests
     --openai        Run only OpenAI integration tests
+    --startup       Print the app import-time report and run the startup budget test
+    --bench         Run the hot-path benchmarks and fail on regressions against the baseline
+                    (extra arguments after --bench go to benchmarks/hot_paths.py)
     --verbose       Run tests with verbose output
 """
 
@@ -22,6 +25,9 @@ import sys
 import os
 import pytest
 
+# This runner's own options; anything else after --bench is passed to the benchmarks
+RUNNER_FLAGS = {'--all', '--api', '--layout', '--ai', '--github', '--openai', '--startup', '--bench', '--verbose'}
+
 def main():
     # Ensure the test uploads directory exists
     os.makedirs('tests/test_uploads', exist_ok=True)
@@ -41,6 +47,16 @@ def main():
             pytest_args = ['tests/test_github_utils.py']
         elif '--openai' in sys.argv:
             pytest_args = ['tests/test_openai_utils.py']
+        elif '--bench' in sys.argv:
+            from benchmarks.hot_paths import main as run_benchmarks
+            print("\n=== Running HoloBrand Hot-Path Benchmarks ===\n")
+            bench_args = [arg for arg in sys.argv[sys.argv.index('--bench') + 1:] if arg not in RUNNER_FLAGS]
+            return run_benchmarks(bench_args)
+        elif '--startup' in sys.argv:
+            from benchmarks.import_time import main as import_time_report
+            import_time_report(['--top', '10'])
+            os.environ['STARTUP_BUDGET_TEST'] = '1'
+            pytest_args = ['tests/test_startup.py']
     
     # Add verbose flag if requested
     if '--verbose' in sys.argv:
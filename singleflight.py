@@ -0,0 +1,250 @@
+"""
+Coalescing of concurrent identical computations ("singleflight")
+
+When many clients send the same request at once, e.g. when a campaign goes live,
+only the first caller for a key runs the computation. Callers that arrive while
+it is running wait for it and get the same result, or the same exception.
+
+Within a process this uses a dict of in-flight calls. Across worker processes it
+uses a lock file per key (`fcntl.flock`, so POSIX only) in `lock_dir`. A worker
+that has to wait for another worker's lock leaves a marker file. The worker
+holding the lock writes its result as JSON next to the lock file only if it finds
+that marker, so requests nobody waits for cost no serialization. Results must
+therefore be JSON-serializable (layouts, scenes, image features). Each run writes
+a fresh token into the lock file and tags its result with it, so the waiting
+worker only takes the result of the run it waited for, and computes the result
+itself if there is none (e.g. the other worker failed). Result files are kept for
+`result_ttl` seconds, just long enough to hand over to waiting workers. This is
+not a cache.
+
+Waiting is bounded by the caller's `timeout` and by `max_wait`. A caller that
+gives up computes the result itself, so a hung computation cannot hold every
+request for its key.
+
+Shared results are the same object for every caller in a process, so treat them
+as read-only.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from http_utils import canonical_json
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within each process only
+    fcntl = None
+
+DEFAULT_LOCK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'singleflight')
+
+# Lock files of keys not used for this long are removed
+LOCK_FILE_MAX_IDLE = 3600.0
+
+_MISSING = object()
+
+
+def request_key(*parts: Any) -> str:
+    """Hash of JSON-serializable request parts, ignoring key order and volatile keys"""
+    return hashlib.sha256(canonical_json(list(parts))).hexdigest()
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers share its outcome"""
+
+    def __init__(self, name: str, lock_dir: Optional[str] = None, result_ttl: float = 30.0,
+                 max_wait: float = 60.0):
+        self.name = name
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.result_ttl = result_ttl
+        self.max_wait = max_wait
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self.reset()
+
+    def reset(self):
+        """Forget in-flight calls inherited from a parent process"""
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> _Call
+        self.leaders = 0
+        self.shared = 0
+        self.shared_across_processes = 0
+        self.wait_timeouts = 0
+        self.last_pruned = 0.0
+
+    def do(self, key: str, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        `func()`, or the outcome of the identical call already running.
+
+        Waits for a running call at most `timeout` seconds (and `max_wait`), then
+        runs `func()` itself.
+        """
+        wait_for = self.max_wait if timeout is None else min(timeout, self.max_wait)
+        deadline = time.monotonic() + wait_for
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            if not call.done.wait(wait_for):
+                self._count_timeout()
+                return func()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_across_processes(key, func, deadline)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def _count_timeout(self):
+        with self.lock:
+            self.wait_timeouts += 1
+
+    def _run_across_processes(self, key: str, func: Callable[[], Any], deadline: float) -> Any:
+        if not self.lock_dir:
+            return func()
+        path = os.path.join(self.lock_dir, f'{self.name}-{key}')
+        with open(path + '.lock', 'a+b') as lock_file:
+            if not _try_lock(lock_file):
+                # Another worker is computing this; ask for its result and wait for it
+                try:
+                    open(path + '.waiting', 'ab').close()
+                except OSError:
+                    pass
+                if not _lock_until(lock_file, deadline):
+                    self._count_timeout()
+                    return func()
+                # The token of the run that held the lock last; older results are ignored
+                lock_file.seek(0)
+                token = lock_file.read().decode(errors='replace')
+                result = self._read_result(path + '.result', token)
+                if result is not _MISSING:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    with self.lock:
+                        self.shared_across_processes += 1
+                    return result
+            try:
+                token = uuid.uuid4().hex
+                lock_file.truncate(0)
+                lock_file.write(token.encode())
+                lock_file.flush()
+                result = func()
+                # Hand the result over only if another worker is waiting for it
+                if os.path.exists(path + '.waiting'):
+                    self._write_result(path + '.result', token, result)
+                    try:
+                        os.remove(path + '.waiting')
+                    except OSError:
+                        pass
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._prune()
+
+    def _read_result(self, path: str, token: str) -> Any:
+        try:
+            if time.time() - os.path.getmtime(path) > self.result_ttl:
+                return _MISSING
+            with open(path, 'rb') as f:
+                handover = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        if not token or not isinstance(handover, dict) or handover.get('token') != token:
+            return _MISSING
+        return handover.get('result')
+
+    def _write_result(self, path: str, token: str, result: Any):
+        # Written whole and renamed into place, so a waiting worker never reads half a result
+        try:
+            body = json.dumps({'token': token, 'result': result}, default=str).encode()
+            fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f'singleflight {self.name}: could not hand over result: {e}')
+
+    def _prune(self):
+        """Remove expired result files and long-unused lock files, at most once per `result_ttl`"""
+        now = time.time()
+        with self.lock:
+            if now - self.last_pruned < self.result_ttl:
+                return
+            self.last_pruned = now
+        prefix = self.name + '-'
+        try:
+            with os.scandir(self.lock_dir) as entries:
+                for entry in entries:
+                    if not entry.name.startswith(prefix):
+                        continue
+                    max_age = LOCK_FILE_MAX_IDLE if entry.name.endswith('.lock') else self.result_ttl
+                    try:
+                        if now - entry.stat().st_mtime > max_age:
+                            os.remove(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'in_flight': len(self.calls),
+                'leaders': self.leaders,
+                'shared': self.shared,
+                'shared_across_processes': self.shared_across_processes,
+                'wait_timeouts': self.wait_timeouts
+            }
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _lock_until(lock_file, deadline: float) -> bool:
+    """Take the lock, polling until `deadline`; flock itself cannot time out"""
+    delay = 0.005
+    while not _try_lock(lock_file):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.1)
+    return True
@@ -0,0 +1,123 @@
+"""
+Precomputed style-description library
+
+`AIPersonalizationEngine` only asks for style descriptions for a small, enumerable
+set of (template, category) combinations. This module serves them from a versioned
+data file loaded at startup, so the runtime makes no network calls for them.
+
+Rebuild the data file with the live model (or the local stand-in) using:
+    python style_library.py build [--output data/style_descriptions.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+STYLE_LIBRARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'style_descriptions.json')
+
+TEMPLATES = ['elegant', 'modern', 'minimal']
+CATEGORIES = ['fashion', 'electronics', 'home', 'beauty', 'food', 'fitness',
+              'automotive', 'jewelry', 'furniture', 'art', 'luxury', 'general']
+
+
+def style_prompt_for(template: str, category: str) -> str:
+    """Prompt used by AIPersonalizationEngine for a (template, category) combination"""
+    return f"{template} style 3D layout for {category} e-commerce"
+
+
+def combination_key(template: str, category: str) -> str:
+    return f"{template}/{category}"
+
+
+def combinations(templates: Optional[List[str]] = None,
+                 categories: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    return [(template, category) for template in (templates or TEMPLATES)
+            for category in (categories or CATEGORIES)]
+
+
+class StyleLibrary:
+    """In-memory style descriptions keyed by (template, category)"""
+
+    def __init__(self, descriptions: Optional[Dict[str, str]] = None, version: int = 0,
+                 model: Optional[str] = None):
+        self.descriptions = descriptions or {}
+        self.version = version
+        self.model = model
+
+    @classmethod
+    def load(cls, path: str = STYLE_LIBRARY_PATH) -> 'StyleLibrary':
+        """Load the library from disk; a missing or unreadable file yields an empty library"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(data.get('descriptions', {}), data.get('version', 0), data.get('model'))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Style library not loaded from {path}: {str(e)}")
+            return cls()
+
+    def get(self, template: str, category: str) -> Optional[str]:
+        return self.descriptions.get(combination_key(template, category))
+
+    def __len__(self) -> int:
+        return len(self.descriptions)
+
+
+_default_library = None
+
+
+def default_library() -> StyleLibrary:
+    """The process-wide library, loaded once from STYLE_LIBRARY_PATH"""
+    global _default_library
+    if _default_library is None:
+        _default_library = StyleLibrary.load(os.getenv('STYLE_LIBRARY_PATH', STYLE_LIBRARY_PATH))
+    return _default_library
+
+
+def build_library(personalizer, output_path: str = STYLE_LIBRARY_PATH,
+                  templates: Optional[List[str]] = None,
+                  categories: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Pregenerate descriptions for every combination and write a new library version"""
+    previous = StyleLibrary.load(output_path) if os.path.exists(output_path) else StyleLibrary()
+    descriptions = {}
+    for template, category in combinations(templates, categories):
+        key = combination_key(template, category)
+        try:
+            descriptions[key] = personalizer.request_style_description(style_prompt_for(template, category))
+        except Exception as e:
+            # Keep the previous description rather than shipping a gap
+            print(f"Failed to generate {key}: {str(e)}")
+            if previous.get(template, category):
+                descriptions[key] = previous.get(template, category)
+
+    data = {
+        'version': previous.version + 1,
+        'model': personalizer.model,
+        'generated_at': datetime.now().isoformat(),
+        'descriptions': descriptions
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return data
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Precomputed style-description library')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='Pregenerate every (template, category) description')
+    build_parser.add_argument('--output', default=STYLE_LIBRARY_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from openai_utils import OpenAIPersonalizer
+        data = build_library(OpenAIPersonalizer(), args.output)
+        print(f"Wrote {len(data['descriptions'])} descriptions (version {data['version']}) to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
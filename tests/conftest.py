@@ -7,11 +7,27 @@ from unittest.mock import MagicMock
 # Add the parent directory to sys.path to import app modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Keep the app's SQLite stores in memory and its singleflight lock files out of instance/
+os.environ.setdefault('GITHUB_INDEX_PATH', ':memory:')
+os.environ.setdefault('LAYOUT_STORE_PATH', ':memory:')
+os.environ.setdefault('SINGLEFLIGHT_DIR', '')
+
+# 3D previews go to the Python stand-in viewer instead of the Windows executable
+from tests.helpers import STUB_VIEWER
+os.environ.setdefault('HOLOBRAND_VIEWER_CMD', f'"{sys.executable}" "{STUB_VIEWER}" --ipc')
+
 from app import app as flask_app
 from layout_generator import LayoutGenerator
 from ai_utils import AIProcessor
 from openai_utils import OpenAIPersonalizer
 from github_utils import GitHubIntegration
+from openai_utils import prompt_cache
+
+@pytest.fixture(autouse=True)
+def clear_prompt_cache():
+    """Start every test with an empty shared prompt cache"""
+    prompt_cache.clear()
+    yield
 
 @pytest.fixture
 def app():
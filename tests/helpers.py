@@ -0,0 +1,4 @@
+import os
+
+# The Python stand-in for the Windows viewer executable (see viewer_stub.py)
+STUB_VIEWER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'viewer_stub.py'))
@@ -235,4 +235,53 @@ def test_github_search_no_query(mock_github, client):
     
     # Check response
     assert response.status_code == 400
-    assert 'error' in response.json
\ No newline at end of file
+    assert 'error' in response.json
+
+@patch('app.github_integration')
+def test_github_repos_rate_limited(mock_github, client):
+    """Test shed GitHub requests return 429 with Retry-After"""
+    from github_utils import GitHubRateLimitError
+    mock_github.check_token_validity.return_value = True
+    mock_github.get_repositories.side_effect = GitHubRateLimitError("rate limited", retry_after=30)
+    
+    response = client.get('/api/github/repos')
+    
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '31'
+
+def test_github_rate_limit_status(client):
+    """Test the GitHub rate-limit metric endpoint"""
+    response = client.get('/api/github/rate-limit')
+    assert response.status_code == 200
+    assert 'resources' in response.json
+
+@patch('app.github_integration')
+def test_github_repos_stream(mock_github, client):
+    """Test repositories stream as NDJSON with an optional cap"""
+    mock_github.check_token_validity.return_value = True
+    mock_github.iter_repositories.return_value = iter([
+        {'name': 'repo1'}, {'name': 'repo2'}
+    ])
+    
+    response = client.get('/api/github/repos?username=big-org&stream=1&limit=2')
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [repo['name'] for repo in lines] == ['repo1', 'repo2']
+    mock_github.iter_repositories.assert_called_once_with('big-org', 2)
+
+@patch('app.github_integration')
+def test_github_repos_stream_marks_failure(mock_github, client):
+    """Test a stream that fails after some repositories ends with an error line"""
+    def repos():
+        yield {'name': 'repo1'}
+        raise Exception('GitHub returned 502 for page 2')
+    
+    mock_github.check_token_validity.return_value = True
+    mock_github.iter_repositories.return_value = repos()
+    
+    response = client.get('/api/github/repos?stream=1')
+    
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines == [{'name': 'repo1'}, {'error': 'GitHub returned 502 for page 2'}]
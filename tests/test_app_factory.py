@@ -0,0 +1,61 @@
+import os
+import runpy
+from unittest.mock import patch, MagicMock
+import app as app_module
+from app import create_app, reset_after_fork
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def test_create_app_applies_config():
+    """Test the factory builds independent apps with overridable config"""
+    first = create_app({'TESTING': True, 'AI_LATENCY_BUDGET_MS': 100.0})
+    second = create_app()
+    
+    assert first is not second
+    assert first.config['AI_LATENCY_BUDGET_MS'] == 100.0
+    assert first.config['MAX_CONTENT_LENGTH'] == 16 * 1024 * 1024
+    assert first.test_client().get('/health').get_json() == {'status': 'healthy'}
+    assert second.test_client().get('/missing-route.json').status_code == 404
+
+def test_apps_share_preloaded_services():
+    """Test every app serves from the same module-level services"""
+    with patch('app.layout_generator.generate_layout', return_value={'template': 'modern'}) as generate:
+        response = create_app().test_client().post('/api/generate-layout', json={'brand_color': '#000000'})
+    
+    assert response.get_json()['template'] == 'modern'
+    generate.assert_called_once()
+
+def test_wsgi_entry_point():
+    """Test the production entry point exposes a Flask app"""
+    import wsgi
+    assert wsgi.app.test_client().get('/health').status_code == 200
+
+def test_reset_after_fork_reopens_connections():
+    """Test forked workers get their own GitHub session"""
+    session = app_module.github_integration.session
+    reset_after_fork()
+    assert app_module.github_integration.session is not session
+
+def test_gunicorn_config_from_environment():
+    """Test worker count and graceful shutdown are configurable"""
+    with patch.dict(os.environ, {'WEB_CONCURRENCY': '3', 'GRACEFUL_TIMEOUT': '12', 'ACCESS_LOG': '',
+                                 'GUNICORN_THREADS': '128'}):
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    
+    assert config['workers'] == 3
+    assert config['graceful_timeout'] == 12
+    assert config['preload_app'] is True
+    assert config['accesslog'] is None
+    assert config['worker_class'] == 'gthread'
+    assert config['threads'] == 128
+
+def test_gunicorn_post_fork_uses_final_worker_count():
+    """Test CPU pools are sized from the running worker count, not the config default"""
+    with patch.dict(os.environ, {'WEB_CONCURRENCY': '3'}):
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+        server = MagicMock()
+        server.cfg.workers = 8  # e.g. `gunicorn -c gunicorn.conf.py --workers 8`
+        with patch('app.reset_after_fork') as reset:
+            config['post_fork'](server, MagicMock())
+        assert os.environ['WEB_CONCURRENCY'] == '8'
+    reset.assert_called_once()
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import threading
+import cv2
+import numpy as np
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from ai_utils import AIProcessor
+from github_utils import GitHubIntegration
+from asset_ingestion import AssetIngestor, is_image_path
+
+def encode_image(color, ext='.png'):
+    image = np.full((64, 64, 3), color, dtype=np.uint8)
+    return cv2.imencode(ext, image)[1].tobytes()
+
+BLOBS = {
+    'sha-logo': encode_image((0, 0, 255)),
+    'sha-hero': encode_image((255, 0, 0), '.jpg'),
+    'sha-banner': encode_image((0, 255, 0)),
+    'sha-broken': b'not really a png',
+    'sha-readme': b'# Brand kit'
+}
+
+TREE = [
+    {'path': 'assets', 'type': 'tree', 'sha': 'sha-dir'},
+    {'path': 'assets/logo.png', 'type': 'blob', 'sha': 'sha-logo', 'size': len(BLOBS['sha-logo'])},
+    {'path': 'assets/hero.JPG', 'type': 'blob', 'sha': 'sha-hero', 'size': len(BLOBS['sha-hero'])},
+    {'path': 'assets/banner.png', 'type': 'blob', 'sha': 'sha-banner', 'size': len(BLOBS['sha-banner'])},
+    {'path': 'assets/broken.png', 'type': 'blob', 'sha': 'sha-broken', 'size': len(BLOBS['sha-broken'])},
+    {'path': 'assets/huge.png', 'type': 'blob', 'sha': 'sha-huge', 'size': 64 * 1024 * 1024},
+    {'path': 'README.md', 'type': 'blob', 'sha': 'sha-readme', 'size': len(BLOBS['sha-readme'])}
+]
+
+class StandInGitHub(BaseHTTPRequestHandler):
+    """Serves the tree and blob endpoints of a single repository"""
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/repos/acme/brand-kit/git/trees/HEAD':
+            self._send(200, json.dumps({'sha': 'root', 'tree': TREE, 'truncated': False}).encode())
+        elif path.startswith('/repos/acme/brand-kit/git/blobs/'):
+            with StandInGitHub.lock:
+                StandInGitHub.active += 1
+                StandInGitHub.max_active = max(StandInGitHub.max_active, StandInGitHub.active)
+            time.sleep(0.05)
+            with StandInGitHub.lock:
+                StandInGitHub.active -= 1
+            blob = BLOBS.get(path.rsplit('/', 1)[1])
+            self._send(200, blob) if blob is not None else self._send(404, b'{}')
+        else:
+            self._send(404, b'{"message": "Not Found"}')
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('X-RateLimit-Remaining', '4999')
+        self.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def github_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInGitHub)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    StandInGitHub.max_active = 0
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def ingestor(github_server):
+    with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token', 'GITHUB_API_URL': github_server}):
+        integration = GitHubIntegration()
+    processor = AIProcessor()
+    processor.image_size = (32, 32)  # keep k-means cheap; decoding and transport are what is under test
+    return AssetIngestor(integration, processor, concurrency=2)
+
+def test_is_image_path():
+    """Test image detection by extension"""
+    assert is_image_path('assets/logo.PNG')
+    assert not is_image_path('assets/logo.svg')
+    assert not is_image_path('assets/spinner.gif')  # OpenCV cannot decode GIFs
+    assert not is_image_path('README.md')
+
+def test_list_image_files(ingestor):
+    """Test only decodable image blobs within the size limit are listed"""
+    paths = [entry['path'] for entry in ingestor.list_image_files('acme', 'brand-kit')]
+    assert paths == ['assets/logo.png', 'assets/hero.JPG', 'assets/banner.png', 'assets/broken.png']
+
+def test_ingest_analyzes_each_image(ingestor):
+    """Test every image is downloaded and analyzed, and failures are reported per file"""
+    report = ingestor.ingest('acme', 'brand-kit')
+    assets = {asset['path']: asset for asset in report['assets']}
+
+    assert report['processed'] == 3
+    assert report['failed'] == 1
+    assert assets['assets/logo.png']['features']['dominant_colors'][0] == '#ff0000'
+    assert assets['assets/banner.png']['features']['dimensions'] == (32, 32, 3)
+    assert 'Error processing image' in assets['assets/broken.png']['error']
+
+def test_oversized_image_is_not_decoded():
+    """Test an image above the pixel cap is rejected from its header alone"""
+    processor = AIProcessor()
+    processor.max_pixels = 64 * 63
+    with patch('cv2.imdecode') as imdecode:
+        with pytest.raises(Exception, match='64x64 pixels'):
+            processor.process_image_bytes(BLOBS['sha-logo'])
+    imdecode.assert_not_called()
+
+def test_ingest_bounded_parallelism(ingestor):
+    """Test downloads overlap but never exceed the configured concurrency"""
+    start = time.perf_counter()
+    results = list(ingestor.iter_ingest('acme', 'brand-kit'))
+    elapsed = time.perf_counter() - start
+
+    assert len(results) == 4
+    assert StandInGitHub.max_active == 2
+    assert elapsed < 4 * 0.05 + 1.0
+
+def test_ingest_limit(ingestor):
+    """Test the limit caps the number of files ingested"""
+    assert len(list(ingestor.iter_ingest('acme', 'brand-kit', limit=1))) == 1
+
+def test_ingest_assets_endpoint(client, ingestor):
+    """Test the ingestion endpoint against the stand-in server"""
+    with patch('app.asset_ingestor', ingestor), \
+         patch('app.github_integration.check_token_validity', return_value=True):
+        response = client.post('/api/github/ingest-assets', json={'repository': 'acme/brand-kit', 'stream': True})
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        bad = client.post('/api/github/ingest-assets', json={'repository': 'brand-kit'})
+        limited = client.post('/api/github/ingest-assets', json={'repository': 'acme/brand-kit', 'limit': '1'})
+        bad_limits = [client.post('/api/github/ingest-assets', json={'repository': 'acme/brand-kit', 'limit': limit})
+                      for limit in ('five', 0, 2.5, True)]
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(lines) == 4
+    assert bad.status_code == 400
+    assert limited.status_code == 200 and len(limited.json['assets']) == 1
+    assert [response.status_code for response in bad_limits] == [400] * 4
@@ -0,0 +1,73 @@
+import gzip
+import pytest
+from unittest.mock import patch
+from urllib.parse import unquote
+from asset_manifest import AssetManifest, IMMUTABLE_CACHE_CONTROL
+
+@pytest.fixture
+def manifest(tmp_path):
+    """A small frontend with HTML -> CSS -> image and JS -> JS references"""
+    frontend = tmp_path / 'frontend'
+    static = tmp_path / 'static'
+    (frontend / 'img').mkdir(parents=True)
+    static.mkdir()
+    (frontend / 'index.html').write_text(
+        '<link rel="stylesheet" href="style (2).css"><script type="module" src="app.js"></script>'
+        '<img src="https://cdn.example.com/logo.png">'
+    )
+    (frontend / 'style (2).css').write_text('body { background: url(img/bg.png); }\n' + 'p { margin: 0; }\n' * 40)
+    (frontend / 'img' / 'bg.png').write_bytes(b'\x89PNG fake image bytes')
+    (frontend / 'app.js').write_text("import config from './config.js';\nconsole.log(config);\n")
+    (frontend / 'config.js').write_text("export default { apiUrl: '' };\n")
+    (static / 'app.js').write_text('// shadowed by the frontend copy\n')
+    (static / 'robots.txt').write_text('User-agent: *\n')
+    return AssetManifest.build([str(frontend), str(static)])
+
+def test_hashed_urls_follow_content(manifest):
+    """Test each asset gets a content-hashed path and earlier roots win"""
+    config = manifest.assets['config.js']
+    assert config.hashed_path.startswith('config.') and config.hashed_path.endswith('.js')
+    assert manifest.get(config.hashed_path) is config
+    assert b'shadowed' not in manifest.assets['app.js'].content
+    assert manifest.get('robots.txt') is not None
+
+def test_references_rewritten_to_hashed_urls(manifest):
+    """Test HTML, CSS and JS references point at the hashed URLs of their targets"""
+    html = manifest.assets['index.html'].content.decode()
+    css = manifest.assets['style (2).css'].content.decode()
+    js = manifest.assets['app.js'].content.decode()
+
+    assert manifest.assets['style (2).css'].url in html
+    assert manifest.assets['app.js'].url in html
+    assert 'https://cdn.example.com/logo.png' in html
+    assert f"url({manifest.assets['img/bg.png'].url})" in css
+    assert f"'{manifest.assets['config.js'].url}'" in js
+    assert unquote(manifest.url_for('style (2).css')) == '/' + manifest.assets['style (2).css'].hashed_path
+
+def test_precompressed_variants(manifest):
+    """Test text assets carry smaller gzip variants and binary ones do not"""
+    css = manifest.assets['style (2).css']
+    assert gzip.decompress(css.variants['gzip']) == css.content
+    assert len(css.variants['gzip']) < len(css.content)
+    assert set(manifest.assets['img/bg.png'].variants) == {'identity'}
+
+def test_served_from_memory_with_cache_headers(client):
+    """Test hashed URLs are immutable, plain paths revalidate, and no files are stat'ed"""
+    import app as app_module
+    asset = app_module.asset_manifest.assets['style (2).css']
+    with patch('os.path.exists') as exists, patch('os.stat') as stat:
+        hashed = client.get(asset.url, headers={'Accept-Encoding': 'gzip'})
+        plain = client.get('/style (2).css')
+        revalidated = client.get('/style (2).css', headers={'If-None-Match': plain.headers['ETag']})
+        index = client.get('/')
+        missing = client.get('/does-not-exist.js')
+    exists.assert_not_called()
+    stat.assert_not_called()
+
+    assert hashed.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert hashed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(hashed.data) == asset.content
+    assert plain.headers['Cache-Control'] == 'no-cache'
+    assert revalidated.status_code == 304
+    assert asset.url.encode() in index.data
+    assert missing.status_code == 404
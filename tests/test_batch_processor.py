@@ -0,0 +1,97 @@
+import json
+import pytest
+import openai
+from unittest.mock import patch, MagicMock
+from batch_processor import BatchProcessor, create_job, merge_results, read_jsonl, results_path_for
+from openai_stub_server import OpenAIStubServer
+
+@pytest.fixture
+def stored_layouts():
+    """Create a small catalog of stored layouts"""
+    return {
+        f'layout-{i}': {
+            'template': 'modern',
+            'colors': {'primary': f'#00000{i}'},
+            'layout': {'sections': ['hero', 'products']}
+        }
+        for i in range(6)
+    }
+
+@pytest.fixture
+def stub_server():
+    """Start a local OpenAI stand-in and point the openai client at it"""
+    with OpenAIStubServer(latency='fixed:5', seed=1) as server:
+        with patch.object(openai, 'api_base', server.url), patch.object(openai, 'api_key', 'stub'):
+            yield server
+
+def test_create_job(tmp_path, stored_layouts):
+    """Test one JSONL request is written per stored layout"""
+    job_path = str(tmp_path / 'job.jsonl')
+    assert create_job(stored_layouts, job_path) == 6
+    
+    items = read_jsonl(job_path)
+    assert [item['id'] for item in items] == list(stored_layouts)
+    assert items[0]['style_prompt'] == 'modern'
+
+def test_run_against_stub(tmp_path, stored_layouts, stub_server):
+    """Test a job runs end to end against the local stand-in"""
+    job_path = str(tmp_path / 'job.jsonl')
+    create_job(stored_layouts, job_path)
+    
+    report = BatchProcessor(concurrency=3).run(job_path)
+    
+    assert report['processed'] == 6
+    assert report['failed'] == 0
+    assert report['throughput_per_second'] > 0
+    assert report['latency_ms']['p95'] >= report['latency_ms']['p50'] > 0
+    results = read_jsonl(results_path_for(job_path))
+    assert len(results) == 6
+    assert all('ai_suggestions' in result for result in results)
+
+def test_resume_from_checkpoint(tmp_path, stored_layouts, stub_server):
+    """Test an interrupted job only processes the remaining items"""
+    job_path = str(tmp_path / 'job.jsonl')
+    create_job(stored_layouts, job_path)
+    
+    first = BatchProcessor(concurrency=2).run(job_path, limit=2)
+    assert first['processed'] == 2
+    
+    second = BatchProcessor(concurrency=2).run(job_path)
+    assert second['skipped'] == 2
+    assert second['processed'] == 4
+    assert stub_server.request_count == 6
+
+def test_failed_items_are_retried(tmp_path, stored_layouts):
+    """Test failed items are not checkpointed"""
+    job_path = str(tmp_path / 'job.jsonl')
+    create_job(stored_layouts, job_path)
+    
+    personalizer = MagicMock()
+    personalizer.enhance_layout_with_ai.side_effect = Exception("API error")
+    report = BatchProcessor(personalizer, concurrency=2).run(job_path)
+    
+    assert report['failed'] == 6
+    assert read_jsonl(results_path_for(job_path)) == []
+
+def test_failed_item_with_stored_suggestions_is_not_done(tmp_path, stored_layouts):
+    """Test a failed call is detected even when the stored layout already has suggestions"""
+    for layout in stored_layouts.values():
+        layout['ai_suggestions'] = {'colors': ['stale']}
+    job_path = str(tmp_path / 'job.jsonl')
+    create_job(stored_layouts, job_path)
+    
+    with patch('openai.ChatCompletion.create', side_effect=Exception("API error")):
+        report = BatchProcessor(concurrency=2).run(job_path)
+    
+    assert report['failed'] == 6
+    assert read_jsonl(results_path_for(job_path)) == []
+
+def test_merge_results(tmp_path, stored_layouts, stub_server):
+    """Test results merge back into the stored layouts"""
+    job_path = str(tmp_path / 'job.jsonl')
+    create_job(stored_layouts, job_path)
+    BatchProcessor(concurrency=3).run(job_path)
+    
+    merged = merge_results(stored_layouts, results_path_for(job_path))
+    assert merged == 6
+    assert all('ai_suggestions' in layout for layout in stored_layouts.values())
@@ -0,0 +1,50 @@
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import concurrency_utils
+from concurrency_utils import cpu_executor, run_cpu_bound
+
+@pytest.fixture
+def fresh_pool():
+    """Give each test its own CPU pool"""
+    with patch.object(concurrency_utils, '_cpu_executor', None):
+        yield
+        concurrency_utils._cpu_executor.shutdown(wait=True)
+
+def test_run_cpu_bound_returns_result(fresh_pool):
+    """Test results and exceptions come back to the calling thread"""
+    assert run_cpu_bound(sum, [1, 2, 3]) == 6
+    with pytest.raises(ValueError):
+        run_cpu_bound(int, 'not a number')
+
+def test_cpu_pool_is_bounded(fresh_pool, monkeypatch):
+    """Test many request threads share at most CPU_WORKERS concurrent CPU tasks"""
+    monkeypatch.setenv('CPU_WORKERS', '2')
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    with ThreadPoolExecutor(max_workers=16) as request_threads:
+        list(request_threads.map(lambda _: run_cpu_bound(work), range(16)))
+
+    assert peak[0] == 2
+    assert cpu_executor()._max_workers == 2
+
+def test_cpu_pool_shares_cores_between_workers(monkeypatch):
+    """Test worker processes split the cores instead of each taking all of them"""
+    monkeypatch.setattr(concurrency_utils.os, 'cpu_count', lambda: 8)
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    assert concurrency_utils.default_cpu_workers() == 2
+    monkeypatch.setenv('WEB_CONCURRENCY', '17')
+    assert concurrency_utils.default_cpu_workers() == 1
+    monkeypatch.delenv('WEB_CONCURRENCY')
+    assert concurrency_utils.default_cpu_workers() == 8
@@ -1,8 +1,10 @@
 import os
+import time
 import pytest
 import requests
+import requests_mock
 from unittest.mock import patch, MagicMock
-from github_utils import GitHubIntegration
+from github_utils import GitHubIntegration, GitHubRateLimitError, RateLimitScheduler, last_page_from_link
 
 @pytest.fixture
 def github_integration():
@@ -19,12 +21,14 @@ def test_init():
         assert integration.token == "test_token"
         assert integration.headers["Authorization"] == "token test_token"
         assert integration.headers["Accept"] == "application/vnd.github.v3+json"
+        assert integration.session.headers["Authorization"] == "token test_token"
 
 def test_check_token_validity_valid(github_integration):
     """Test token validity check with valid token"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock response
         mock_response = MagicMock()
+        mock_response.headers = {}
         mock_response.status_code = 200
         mock_get.return_value = mock_response
         
@@ -34,15 +38,16 @@ def test_check_token_validity_valid(github_integration):
         # Verify results
         assert result is True
         mock_get.assert_called_once_with(
-            "https://api.github.com/user", 
-            headers=github_integration.headers
+            "https://api.github.com/user",
+            params=None, headers={}, timeout=github_integration.timeout
         )
 
 def test_check_token_validity_invalid(github_integration):
     """Test token validity check with invalid token"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock response
         mock_response = MagicMock()
+        mock_response.headers = {}
         mock_response.status_code = 401  # Unauthorized
         mock_get.return_value = mock_response
         
@@ -54,7 +59,7 @@ def test_check_token_validity_invalid(github_integration):
 
 def test_check_token_validity_exception(github_integration):
     """Test token validity check with exception"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock to raise exception
         mock_get.side_effect = Exception("Connection error")
         
@@ -80,9 +85,10 @@ def test_check_token_validity_default_token():
 
 def test_get_repositories_authenticated(github_integration):
     """Test getting repositories for authenticated user"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock response
         mock_response = MagicMock()
+        mock_response.headers = {}
         mock_response.status_code = 200
         mock_response.json.return_value = [
             {"name": "repo1", "full_name": "user/repo1"},
@@ -98,15 +104,16 @@ def test_get_repositories_authenticated(github_integration):
         assert repos[0]["name"] == "repo1"
         assert repos[1]["name"] == "repo2"
         mock_get.assert_called_once_with(
-            "https://api.github.com/user/repos", 
-            headers=github_integration.headers
+            "https://api.github.com/user/repos",
+            params={"per_page": 100, "page": 1}, headers={}, timeout=github_integration.timeout
         )
 
 def test_get_repositories_specific_user(github_integration):
     """Test getting repositories for a specific user"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock response
         mock_response = MagicMock()
+        mock_response.headers = {}
         mock_response.status_code = 200
         mock_response.json.return_value = [
             {"name": "repo1", "full_name": "testuser/repo1"}
@@ -120,15 +127,16 @@ def test_get_repositories_specific_user(github_integration):
         assert len(repos) == 1
         assert repos[0]["name"] == "repo1"
         mock_get.assert_called_once_with(
-            "https://api.github.com/users/testuser/repos", 
-            headers=github_integration.headers
+            "https://api.github.com/users/testuser/repos",
+            params={"per_page": 100, "page": 1}, headers={}, timeout=github_integration.timeout
         )
 
 def test_get_repositories_error(github_integration):
     """Test getting repositories with error response"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock response
         mock_response = MagicMock()
+        mock_response.headers = {}
         mock_response.status_code = 404  # Not found
         mock_get.return_value = mock_response
         
@@ -140,7 +148,7 @@ def test_get_repositories_error(github_integration):
 
 def test_get_repositories_exception(github_integration):
     """Test getting repositories with exception"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock to raise exception
         mock_get.side_effect = Exception("Connection error")
         
@@ -152,9 +160,10 @@ def test_get_repositories_exception(github_integration):
 
 def test_search_repositories(github_integration):
     """Test searching repositories"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock response
         mock_response = MagicMock()
+        mock_response.headers = {}
         mock_response.status_code = 200
         mock_response.json.return_value = {
             "items": [
@@ -172,15 +181,16 @@ def test_search_repositories(github_integration):
         assert repos[0]["name"] == "search-repo1"
         assert repos[1]["name"] == "search-repo2"
         mock_get.assert_called_once_with(
-            "https://api.github.com/search/repositories?q=test-query", 
-            headers=github_integration.headers
+            "https://api.github.com/search/repositories",
+            params={"q": "test-query", "per_page": 100, "page": 1}, headers={}, timeout=github_integration.timeout
         )
 
 def test_search_repositories_error(github_integration):
     """Test searching repositories with error response"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock response
         mock_response = MagicMock()
+        mock_response.headers = {}
         mock_response.status_code = 422  # Unprocessable entity
         mock_get.return_value = mock_response
         
@@ -192,7 +202,7 @@ def test_search_repositories_error(github_integration):
 
 def test_search_repositories_exception(github_integration):
     """Test searching repositories with exception"""
-    with patch('requests.get') as mock_get:
+    with patch.object(github_integration.session, 'get') as mock_get:
         # Configure mock to raise exception
         mock_get.side_effect = Exception("Connection error")
         
@@ -200,4 +210,168 @@ def test_search_repositories_exception(github_integration):
         repos = github_integration.search_repositories("test-query")
         
         # Verify results
-        assert repos == []
\ No newline at end of file
+        assert repos == []
+
+def test_conditional_request_uses_etag(github_integration):
+    """Test repeat calls send If-None-Match and serve 304s from the cache"""
+    repos = [{"name": "repo1", "full_name": "user/repo1"}]
+    with requests_mock.Mocker() as mocker:
+        mocker.get("https://api.github.com/user/repos?per_page=100&page=1", [
+            {"json": repos, "headers": {"ETag": '"abc"'}},
+            {"status_code": 304, "headers": {"ETag": '"abc"'}}
+        ])
+        
+        assert github_integration.get_repositories() == repos
+        assert github_integration.get_repositories() == repos
+        
+        assert mocker.call_count == 2
+        assert "If-None-Match" not in mocker.request_history[0].headers
+        assert mocker.request_history[1].headers["If-None-Match"] == '"abc"'
+
+def test_conditional_request_uses_last_modified(github_integration):
+    """Test Last-Modified validators are sent back as If-Modified-Since"""
+    details = {"name": "repo1"}
+    last_modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+    with requests_mock.Mocker() as mocker:
+        mocker.get("https://api.github.com/repos/user/repo1", [
+            {"json": details, "headers": {"Last-Modified": last_modified}},
+            {"status_code": 304}
+        ])
+        
+        github_integration.get_repository_details("user", "repo1")
+        assert github_integration.get_repository_details("user", "repo1") == details
+        assert mocker.request_history[1].headers["If-Modified-Since"] == last_modified
+
+def test_requests_use_pooled_session_and_timeouts(github_integration):
+    """Test every call goes through the shared session with explicit timeouts"""
+    with requests_mock.Mocker() as mocker:
+        mocker.get("https://api.github.com/user", status_code=200, json={})
+        github_integration.check_token_validity()
+        assert mocker.request_history[0].timeout == github_integration.timeout
+        assert mocker.request_history[0].headers["Authorization"] == "token test_token"
+
+def test_token_validity_is_cached(github_integration):
+    """Test the /user check is made once within the TTL"""
+    with requests_mock.Mocker() as mocker:
+        mocker.get("https://api.github.com/user", status_code=200, json={})
+        assert github_integration.check_token_validity() is True
+        assert github_integration.check_token_validity() is True
+        assert mocker.call_count == 1
+        
+        # Expired entries are checked again
+        github_integration.token_cache_ttl = 0
+        assert github_integration.check_token_validity() is True
+        assert mocker.call_count == 2
+
+def test_token_validity_network_error_not_cached(github_integration):
+    """Test transient errors do not poison the validity cache"""
+    with requests_mock.Mocker() as mocker:
+        mocker.get("https://api.github.com/user", [
+            {"exc": requests.exceptions.ConnectTimeout},
+            {"status_code": 200, "json": {}}
+        ])
+        assert github_integration.check_token_validity() is False
+        assert github_integration.check_token_validity() is True
+
+def test_rate_limit_headers_are_tracked(github_integration):
+    """Test X-RateLimit headers feed the scheduler status"""
+    with requests_mock.Mocker() as mocker:
+        mocker.get("https://api.github.com/user/repos", json=[], headers={
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "4999",
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+            "X-RateLimit-Resource": "core"
+        })
+        github_integration.get_repositories()
+    
+    status = github_integration.rate_limiter.status()
+    assert status['resources']['core']['remaining'] == 4999
+    assert status['resources']['core']['limit'] == 5000
+
+def test_rate_limit_sheds_requests(github_integration):
+    """Test requests are shed before GitHub starts rejecting them"""
+    github_integration.rate_limiter.update({
+        "X-RateLimit-Limit": "30",
+        "X-RateLimit-Remaining": "1",
+        "X-RateLimit-Reset": str(int(time.time()) + 600)
+    }, "search")
+    
+    with requests_mock.Mocker() as mocker:
+        with pytest.raises(GitHubRateLimitError) as excinfo:
+            github_integration.search_repositories("test")
+        assert mocker.call_count == 0
+    assert excinfo.value.retry_after > 500
+    assert github_integration.rate_limiter.status()['shed_requests'] == 1
+
+def test_rate_limit_queues_until_reset():
+    """Test requests wait for an imminent reset instead of being shed"""
+    scheduler = RateLimitScheduler(reserve=0, max_wait=1.0)
+    scheduler.update({
+        "X-RateLimit-Limit": "10",
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(time.time() + 0.1)
+    }, "core")
+    
+    start = time.monotonic()
+    scheduler.acquire("core")
+    assert 0.05 < time.monotonic() - start < 1.0
+
+
+def _repo_pages(mocker, url, total, items_key=None):
+    """Register paginated responses with Link headers for `total` repositories"""
+    pages = max(1, -(-total // 100))
+    for page in range(1, pages + 1):
+        repos = [{"id": i, "name": f"repo{i}"} for i in range((page - 1) * 100, min(total, page * 100))]
+        headers = {}
+        if pages > 1:
+            headers["Link"] = (f'<{url}?per_page=100&page={min(page + 1, pages)}>; rel="next", '
+                               f'<{url}?per_page=100&page={pages}>; rel="last"')
+        mocker.get(f"{url}?page={page}", json={items_key: repos} if items_key else repos,
+                   headers=headers, complete_qs=False)
+
+def test_last_page_from_link():
+    """Test the page count is read from the Link header"""
+    link = ('<https://api.github.com/user/repos?per_page=100&page=2>; rel="next", '
+            '<https://api.github.com/user/repos?per_page=100&page=20>; rel="last"')
+    assert last_page_from_link(link) == 20
+    assert last_page_from_link(None) == 1
+
+def test_get_repositories_paginates(github_integration):
+    """Test every page of a large organization is fetched"""
+    with requests_mock.Mocker() as mocker:
+        _repo_pages(mocker, "https://api.github.com/users/big-org/repos", 2000)
+        repos = github_integration.get_repositories("big-org")
+    
+    assert len(repos) == 2000
+    assert [repo["id"] for repo in repos] == list(range(2000))
+    assert mocker.call_count == 20
+
+def test_get_repositories_limit(github_integration):
+    """Test an optional cap only fetches the pages it needs"""
+    with requests_mock.Mocker() as mocker:
+        _repo_pages(mocker, "https://api.github.com/users/big-org/repos", 2000)
+        repos = github_integration.get_repositories("big-org", limit=150)
+    
+    assert len(repos) == 150
+    assert mocker.call_count == 2
+
+def test_search_repositories_paginates(github_integration):
+    """Test a search fetches one page by default and more pages when a limit asks for them"""
+    with requests_mock.Mocker() as mocker:
+        _repo_pages(mocker, "https://api.github.com/search/repositories", 250, items_key="items")
+        assert len(github_integration.search_repositories("brand")) == 100
+        assert mocker.call_count == 1
+        repos = github_integration.search_repositories("brand", limit=250)
+    
+    assert len(repos) == 250
+    assert mocker.request_history[0].qs["q"] == ["brand"]
+
+def test_failed_page_returns_pages_already_fetched(github_integration):
+    """Test a failing later page keeps the repositories fetched before it"""
+    url = "https://api.github.com/users/big-org/repos"
+    with requests_mock.Mocker() as mocker:
+        _repo_pages(mocker, url, 300)
+        mocker.get(f"{url}?page=3", status_code=502, complete_qs=False)
+        repos = github_integration.get_repositories("big-org")
+    
+    assert [repo["id"] for repo in repos] == list(range(200))
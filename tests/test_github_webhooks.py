@@ -0,0 +1,126 @@
+import os
+import glob
+import pytest
+from unittest.mock import patch
+from github_webhooks import sign_payload, verify_signature, handle_event
+from github_utils import GitHubIntegration
+from repo_index import RepoIndex
+from webhook_replay import build_request, load_delivery, replay
+
+WEBHOOK_DIR = os.path.join(os.path.dirname(__file__), 'webhooks')
+SECRET = 'test_webhook_secret'
+
+REPOS = [
+    {'id': 1, 'name': 'brand-kit', 'full_name': 'acme/brand-kit',
+     'description': 'Logos and brand guidelines', 'topics': ['branding'], 'language': 'CSS'},
+    {'id': 2, 'name': 'storefront', 'full_name': 'acme/storefront',
+     'description': 'eCommerce storefront in Python', 'language': 'Python'},
+    {'id': 3, 'name': 'holo-viewer', 'full_name': 'acme/holo-viewer', 'description': '3D product viewer'}
+]
+
+@pytest.fixture
+def github_integration():
+    """Create a GitHubIntegration with a populated index and conditional cache"""
+    with patch.dict(os.environ, {"GITHUB_TOKEN": "test_token"}):
+        integration = GitHubIntegration()
+    integration.repo_index = RepoIndex(':memory:')
+    integration.repo_index.upsert(REPOS)
+    for url in ("https://api.github.com/repos/acme/brand-kit",
+                "https://api.github.com/users/acme/repos",
+                "https://api.github.com/repos/other/project"):
+        integration.conditional_cache[(url, ())] = {'etag': '"x"', 'last_modified': None,
+                                                    'data': {}, 'headers': {}}
+    return integration
+
+def recording(name):
+    return load_delivery(os.path.join(WEBHOOK_DIR, name))
+
+def test_verify_signature():
+    """Test HMAC-SHA256 signature verification"""
+    body = b'{"zen": "Keep it logically awesome."}'
+    assert verify_signature(SECRET, body, sign_payload(SECRET, body))
+    assert not verify_signature(SECRET, body, sign_payload('wrong', body))
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature(None, body, sign_payload(SECRET, body))
+
+def test_repository_edited_updates_index(github_integration):
+    """Test an edited repository is updated in place and its cache entries dropped"""
+    result = handle_event(github_integration, 'repository', recording('repository_edited.json')['payload'])
+    
+    assert result['invalidated_entries'] == 2
+    assert ('https://api.github.com/repos/other/project', ()) in github_integration.conditional_cache
+    assert [r['id'] for r in github_integration.repo_index.search('typography')] == [1]
+    assert github_integration.repo_index.search('guidelines') == []
+
+def test_repository_deleted_removes_entry(github_integration):
+    """Test a deleted repository leaves the index"""
+    handle_event(github_integration, 'repository', recording('repository_deleted.json')['payload'])
+    assert github_integration.repo_index.get('acme/holo-viewer') is None
+    assert github_integration.repo_index.count() == 2
+
+def test_deleted_repository_invalidates_only_affected_queries(github_integration):
+    """Test only searches that returned the repository, named its owner or match it are refreshed"""
+    index = github_integration.repo_index
+    index.mark_refreshed('viewer', [REPOS[2]])
+    index.mark_refreshed('user:acme', REPOS)
+    index.mark_refreshed('storefront', [REPOS[1]])
+    index.mark_refreshed('user:other', [])
+    
+    handle_event(github_integration, 'repository', recording('repository_deleted.json')['payload'])
+    
+    assert index.query_age('viewer') is None
+    assert index.query_age('user:acme') is None
+    assert index.query_age('storefront') is not None
+    assert index.query_age('user:other') is not None
+
+def test_created_repository_invalidates_queries_it_matches(github_integration):
+    """Test a new repository refreshes the searches it would now appear in"""
+    index = github_integration.repo_index
+    index.mark_refreshed('palette', [])
+    index.mark_refreshed('python', [REPOS[1]])
+    repository = {'id': 4, 'name': 'palette', 'full_name': 'other/palette', 'description': 'Color tools'}
+    
+    handle_event(github_integration, 'repository', {'action': 'created', 'repository': repository})
+    
+    assert index.query_age('palette') is None
+    assert index.query_age('python') is not None
+
+def test_push_keeps_indexed_fields(github_integration):
+    """Test a push merges its partial repository object with the indexed one"""
+    handle_event(github_integration, 'push', recording('push.json')['payload'])
+    repo = github_integration.repo_index.get('acme/storefront')
+    assert repo['pushed_at'] == '2025-10-09T08:53:20Z'
+    assert repo['language'] == 'Python'
+
+def test_push_keeps_indexed_owner(github_integration):
+    """Test the push payload's owner object does not replace the REST one"""
+    index = github_integration.repo_index
+    owner = {'login': 'acme', 'id': 7, 'type': 'Organization'}
+    index.upsert([{**REPOS[1], 'owner': owner}])
+    handle_event(github_integration, 'push', recording('push.json')['payload'])
+    assert index.get('acme/storefront')['owner'] == owner
+
+def test_unrelated_event_ignored(github_integration):
+    """Test other events leave caches alone"""
+    assert handle_event(github_integration, 'issues', {'action': 'opened'})['status'] == 'ignored'
+    assert handle_event(github_integration, 'ping', {})['status'] == 'pong'
+
+@patch.dict(os.environ, {"GITHUB_WEBHOOK_SECRET": SECRET})
+def test_webhook_endpoint_replay(client, github_integration):
+    """Test recorded deliveries replay through the endpoint without network access"""
+    def post(url, data, headers, timeout):
+        return client.post(url, data=data, headers=headers)
+    
+    with patch('app.github_integration', github_integration):
+        failures = replay(sorted(glob.glob(os.path.join(WEBHOOK_DIR, '*.json'))),
+                          '/api/github/webhook', SECRET, post=post)
+    
+    assert failures == 0
+    assert github_integration.repo_index.get('acme/holo-viewer') is None
+
+@patch.dict(os.environ, {"GITHUB_WEBHOOK_SECRET": SECRET})
+def test_webhook_endpoint_rejects_bad_signature(client):
+    """Test unsigned or mis-signed deliveries are rejected"""
+    headers, body = build_request(recording('push.json'), 'wrong_secret')
+    response = client.post('/api/github/webhook', data=body, headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,69 @@
+import random
+import pytest
+import numpy as np
+from benchmarks.hot_paths import compare, seeded, summarize_samples, synthetic_image, load_baseline
+
+def test_synthetic_corpus_is_deterministic():
+    """Test the same seed always yields the same image"""
+    first = synthetic_image(64, 48, seed=1)
+    assert first.shape == (48, 64, 3)
+    assert first.dtype == np.uint8
+    assert np.array_equal(first, synthetic_image(64, 48, seed=1))
+    assert not np.array_equal(first, synthetic_image(64, 48, seed=2))
+
+def test_seeded_calls_repeat_random_choices():
+    """Test each benchmarked call sees the same random sequence"""
+    call = seeded(lambda: random.random())
+    assert call() == call()
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Test only slowdowns over both the threshold and the noise floor fail"""
+    baseline = {'slow': {'median_ms': 10.0}, 'fine': {'median_ms': 10.0}, 'tiny': {'median_ms': 0.01}}
+    results = {'slow': {'median_ms': 13.0}, 'fine': {'median_ms': 11.0}, 'tiny': {'median_ms': 0.02},
+               'new': {'median_ms': 1.0}}
+    rows = {row['name']: row for row in compare(results, baseline, threshold=0.25)}
+    assert rows['slow']['regressed']
+    assert not rows['fine']['regressed']
+    assert not rows['tiny']['regressed']  # doubled, but within timer noise
+    assert rows['new']['baseline_ms'] is None and not rows['new']['regressed']
+
+def test_compare_widens_threshold_for_noisy_cases():
+    """Test a case with a wide spread needs a larger slowdown to fail"""
+    baseline = {'kmeans': {'median_ms': 100.0, 'spread': 0.2}, 'steady': {'median_ms': 100.0, 'spread': 0.02}}
+    results = {'kmeans': {'median_ms': 135.0, 'spread': 0.1}, 'steady': {'median_ms': 135.0, 'spread': 0.02}}
+    rows = {row['name']: row for row in compare(results, baseline, threshold=0.25, noise_factor=2.0)}
+    assert rows['kmeans']['allowed'] == pytest.approx(0.4)
+    assert not rows['kmeans']['regressed']
+    assert rows['steady']['allowed'] == 0.25
+    assert rows['steady']['regressed']
+
+def test_noisy_current_run_does_not_widen_threshold():
+    """Test a slowdown that also adds variance is judged against the baseline spread"""
+    baseline = {'kmeans': {'median_ms': 100.0, 'spread': 0.02}}
+    results = {'kmeans': {'median_ms': 150.0, 'spread': 0.5}}
+    row = compare(results, baseline, threshold=0.25, noise_factor=2.0)[0]
+    assert row['allowed'] == 0.25
+    assert row['regressed']
+
+def test_summarize_samples_reports_spread():
+    """Test the spread is the interquartile range relative to the median"""
+    stats = summarize_samples([0.010, 0.010, 0.010, 0.010, 0.020])
+    assert stats['median_ms'] == pytest.approx(10.0)
+    assert stats['spread'] == pytest.approx(0.5)
+    assert summarize_samples([0.010])['spread'] == 0.0
+
+def test_compare_scales_for_machine_speed():
+    """Test a uniformly slower machine is not reported as a regression"""
+    rows = compare({'case': {'median_ms': 20.0}}, {'case': {'median_ms': 10.0}}, threshold=0.25, speed_factor=0.5)
+    assert rows[0]['change'] == 0.0
+    assert not rows[0]['regressed']
+
+def test_committed_baseline_covers_hot_paths():
+    """Test the stored baseline has a calibration time and the main cases"""
+    baseline = load_baseline()
+    assert baseline['calibration_ms'] > 0
+    assert all('spread' in stats for stats in baseline['results'].values())
+    names = set(baseline['results'])
+    assert {'layout.generate_layout', 'layout.generate_3d_preview_data',
+            'personalizer.generate_interactive_elements', 'http.generate_layout'} <= names
+    assert any(name.startswith('image.process_image[') for name in names)
@@ -0,0 +1,117 @@
+import gzip
+import json
+import pytest
+from unittest.mock import patch
+import http_utils
+from http_utils import canonical_json, content_etag, etag_matches, negotiate_encoding, payload_cache
+from layout_generator import LayoutGenerator
+
+@pytest.fixture(autouse=True)
+def clear_payload_cache():
+    payload_cache.clear()
+    yield
+
+@pytest.fixture
+def scene():
+    """A generated 3D scene, the largest payload the API serves"""
+    generator = LayoutGenerator()
+    return generator.generate_3d_preview_data(generator.generate_layout('#3366ff', 'Arial', 'modern'))
+
+def test_canonical_json_ignores_order_and_timestamps():
+    """Test equal results hash identically regardless of key order and generation time"""
+    first = {'b': 1, 'a': {'generated_timestamp': '2024-01-01T00:00:00', 'x': [1, 2]}}
+    second = {'a': {'x': [1, 2], 'generated_timestamp': '2025-06-30T12:00:00'}, 'b': 1}
+    assert canonical_json(first) == canonical_json(second)
+    assert content_etag(canonical_json(first)) != content_etag(canonical_json({'b': 2}))
+
+def test_negotiate_encoding():
+    """Test Accept-Encoding negotiation honours q-values"""
+    assert negotiate_encoding(None) == 'identity'
+    assert negotiate_encoding('gzip, deflate') == 'gzip'
+    assert negotiate_encoding('gzip;q=0, identity') == 'identity'
+    with patch.object(http_utils, 'BROTLI_AVAILABLE', True):
+        assert negotiate_encoding('gzip, deflate, br') == 'br'
+        assert negotiate_encoding('br;q=0.5, gzip') == 'gzip'
+    with patch.object(http_utils, 'BROTLI_AVAILABLE', False):
+        assert negotiate_encoding('br') == 'identity'
+
+def test_etag_matches():
+    """Test If-None-Match matching across lists, weak validators and encoded variants"""
+    etag = '"abc123"'
+    assert etag_matches('"abc123"', etag)
+    assert etag_matches('W/"abc123"', etag)
+    assert etag_matches('"other", "abc123-gzip"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert etag_matches('W/"abc123-gzip"', 'W/"abc123"')
+
+@patch('app.layout_generator')
+def test_payload_cache_keyed_on_exact_body(mock_generator, client, scene):
+    """Test bodies sharing a weak ETag are not served each other's compressed bytes"""
+    mock_generator.generate_layout.return_value = scene
+    first = client.post('/api/generate-layout', json={}, headers={'Accept-Encoding': 'gzip'})
+    scene['metadata']['generated_timestamp'] = '2030-01-01T00:00:00'
+    second = client.post('/api/generate-layout', json={}, headers={'Accept-Encoding': 'gzip'})
+
+    assert first.headers['ETag'].startswith('W/"')
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert json.loads(gzip.decompress(second.data))['metadata']['generated_timestamp'] == '2030-01-01T00:00:00'
+
+def test_3d_preview_never_answers_304(client):
+    """Test the side-effecting preview request is not short-circuited by If-None-Match"""
+    body = {'layout': {'template': 'modern'}}
+    first = client.post('/api/3d-preview', json=body)
+    with patch('app.viewer_manager.show') as show:
+        second = client.post('/api/3d-preview', json=body, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    show.assert_called_once()
+
+@patch('app.layout_generator')
+def test_post_never_answers_304(mock_generator, client, scene):
+    """Test a POST with a matching If-None-Match still gets the full result"""
+    mock_generator.generate_layout.return_value = scene
+    first = client.post('/api/generate-layout', json={'brand_color': '#3366ff'})
+    etag = first.headers['ETag']
+
+    scene['metadata']['generated_timestamp'] = '2030-01-01T00:00:00'
+    second = client.post('/api/generate-layout', json={'brand_color': '#3366ff'},
+                         headers={'If-None-Match': etag})
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.headers['ETag'] == etag
+    assert second.json['metadata']['template'] == scene['metadata']['template']
+
+@patch('app.layout_generator')
+def test_scene_compressed_several_fold(mock_generator, client, scene):
+    """Test large 3D scenes shrink on the wire and compressed bytes are cached"""
+    mock_generator.generate_layout.return_value = scene
+    plain = client.post('/api/generate-layout', json={})
+    compressed = client.post('/api/generate-layout', json={}, headers={'Accept-Encoding': 'gzip'})
+    client.post('/api/generate-layout', json={}, headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(compressed.data)) == plain.json
+    assert len(plain.data) / len(compressed.data) >= 3
+    assert payload_cache.stats()['hits'] == 1
+
+@patch('app.layout_generator')
+def test_brotli_encoding(mock_generator, client, scene):
+    """Test brotli is preferred when installed"""
+    brotli = pytest.importorskip('brotli')
+    mock_generator.generate_layout.return_value = scene
+    response = client.post('/api/generate-layout', json={}, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data))['metadata']['template'] == scene['metadata']['template']
+
+def test_preview_revalidated_before_rendering(client):
+    """Test /preview answers a matching If-None-Match without rendering the template"""
+    first = client.get('/preview')
+    with patch('app.render_template') as render:
+        second = client.get('/preview', headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    render.assert_not_called()
@@ -0,0 +1,105 @@
+import json
+import pytest
+from unittest.mock import patch
+from layout_store import LayoutStore, LayoutTooLargeError, layout_id
+
+LAYOUT = {
+    'template': 'elegant',
+    'colors': {'primary': '#3366ff', 'secondary': '#ff6633', 'accent': '#33ff66', 'background': '#ffffff'},
+    'typography': {'primary_font': 'Playfair Display', 'body_font': 'Arial', 'heading_font': 'Playfair Display'},
+    'generated_timestamp': '2024-01-01T00:00:00'
+}
+
+@pytest.fixture
+def store(tmp_path):
+    return LayoutStore(str(tmp_path / 'layouts.db'), max_entries=2)
+
+def test_layout_id_is_short_and_content_derived():
+    """Test equal layouts share an ID regardless of key order and timestamp"""
+    reordered = {key: LAYOUT[key] for key in reversed(list(LAYOUT))}
+    reordered['generated_timestamp'] = '2025-01-01T00:00:00'
+    assert len(layout_id(LAYOUT)) == 12
+    assert layout_id(reordered) == layout_id(LAYOUT)
+    assert layout_id({**LAYOUT, 'template': 'modern'}) != layout_id(LAYOUT)
+
+def test_put_and_get(store):
+    """Test layouts round-trip and storing twice is idempotent"""
+    key = store.put(LAYOUT)
+    assert store.put(dict(LAYOUT)) == key
+    assert store.get(key) == LAYOUT
+    assert store.get('missing') is None
+    assert store.count() == 1
+
+def test_evicted_layouts_reload_from_sqlite(store, tmp_path):
+    """Test layouts outlive the memory LRU and the process"""
+    keys = [store.put({**LAYOUT, 'template': template}) for template in ('elegant', 'modern', 'minimal')]
+    assert keys[0] not in store.memory
+    assert store.get(keys[0])['template'] == 'elegant'
+    assert LayoutStore(str(tmp_path / 'layouts.db')).get(keys[2])['template'] == 'minimal'
+
+def test_expired_layouts_are_pruned(tmp_path):
+    """Test layouts not stored again within the TTL expire and are deleted from SQLite"""
+    store = LayoutStore(str(tmp_path / 'layouts.db'), ttl_seconds=3600)
+    old = store.put(LAYOUT, now=1000.0)
+    assert store.get(old, now=1000.0 + 3599) == LAYOUT
+    assert store.get(old, now=1000.0 + 3601) is None
+    
+    renewed = store.put({**LAYOUT, 'template': 'modern'}, now=1000.0)
+    store.put({**LAYOUT, 'template': 'modern'}, now=1000.0 + 3000)
+    store.put({**LAYOUT, 'template': 'minimal'}, now=1000.0 + 3700)
+    assert store.count() == 2
+    assert store.get(renewed, now=1000.0 + 3700)['template'] == 'modern'
+
+def test_rows_are_bounded(tmp_path):
+    """Test only the newest max_rows layouts are kept in SQLite"""
+    store = LayoutStore(str(tmp_path / 'layouts.db'), max_entries=1, max_rows=2)
+    keys = [store.put({**LAYOUT, 'template': f'template-{i}'}, now=1000.0 + i * 100) for i in range(4)]
+    assert store.count() == 2
+    assert store.get(keys[0], now=1400.0) is None
+    assert store.get(keys[3], now=1400.0)['template'] == 'template-3'
+
+def test_layouts_are_bounded_in_size(tmp_path):
+    """Test oversized layouts are rejected and stored bytes stay under max_bytes"""
+    size = len(json.dumps(LAYOUT))
+    store = LayoutStore(str(tmp_path / 'layouts.db'), max_entries=1, max_layout_bytes=size + 100,
+                        max_bytes=3 * size)
+    with pytest.raises(LayoutTooLargeError):
+        store.put({**LAYOUT, 'notes': 'x' * 200})
+    keys = [store.put({**LAYOUT, 'template': f'template-{i}'}, now=1000.0 + i * 100) for i in range(4)]
+    assert store.count() == 2
+    assert store.get(keys[1], now=1400.0) is None
+    assert store.get(keys[3], now=1400.0)['template'] == 'template-3'
+
+def test_preview_by_id(client):
+    """Test generated layouts are previewable by short ID and rendered once"""
+    response = client.post('/api/generate-layout', json={'brand_color': '#3366ff', 'style_prompt': 'elegant'})
+    preview_url = response.json['preview_url']
+    assert preview_url == f"/preview/{response.json['layout_id']}"
+
+    with patch('app.render_template', wraps=__import__('app').render_template) as render:
+        first = client.get(preview_url)
+        second = client.get(preview_url)
+        revalidated = client.get(preview_url, headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert first.data == second.data
+    assert render.call_count == 1
+    assert revalidated.status_code == 304
+    assert client.get('/preview/unknown').status_code == 404
+
+def test_store_layout_endpoint(client):
+    """Test arbitrary layouts can be stored for previewing"""
+    response = client.post('/api/layouts', json=LAYOUT)
+    assert response.status_code == 201
+    assert response.json['layout_id'] == layout_id(LAYOUT)
+    assert client.get(response.json['preview_url']).status_code == 200
+    assert client.post('/api/layouts', json=[1, 2]).status_code == 400
+
+def test_store_layout_endpoint_rejects_large_layouts(client):
+    """Test layouts over the size limit get a 413 and are not stored"""
+    app = __import__('app')
+    large = {**LAYOUT, 'notes': 'x' * 2048}
+    with patch.object(app.layout_store, 'max_layout_bytes', 1024):
+        response = client.post('/api/layouts', json=large)
+    assert response.status_code == 413
+    assert app.layout_store.get(layout_id(large)) is None
@@ -0,0 +1,46 @@
+import threading
+import pytest
+from werkzeug.serving import make_server
+
+from app import create_app
+from benchmarks.load_flows import BRAND_FLOW, FlowRunner, Recorder, closed_loop, load_collection, substitute
+
+@pytest.fixture
+def live_server(tmp_path):
+    server = make_server('127.0.0.1', 0, create_app({'TESTING': True, 'UPLOAD_FOLDER': str(tmp_path)}),
+                         threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+def test_collection_has_flow_requests():
+    """Test every flow step except the generated preview link comes from the collection"""
+    collection = load_collection()
+    for name in BRAND_FLOW[:-1]:
+        assert name in collection
+    assert substitute(collection['Generate Layout']['url']['raw'], {'base_url': 'http://host'}) == \
+        'http://host/api/generate-layout'
+
+def test_recorder_reports_error_rates():
+    """Test per-endpoint latency percentiles and error rates"""
+    recorder = Recorder()
+    for latency in (0.01, 0.02, 0.03):
+        recorder.record('Preview', latency)
+    recorder.record('Preview', 0.5, '500')
+    stats = recorder.report(elapsed=2.0)['Preview']
+    assert stats['count'] == 4
+    assert stats['throughput_rps'] == 2.0
+    assert stats['error_rate'] == 0.25
+    assert stats['error_kinds'] == {'500': 1}
+    assert stats['p50_ms'] == pytest.approx(20.0)
+
+def test_flow_runs_against_live_server(live_server):
+    """Test a virtual user completes upload, layout, 3D preview and preview"""
+    recorder = Recorder()
+    runner = FlowRunner(live_server, recorder)
+    closed_loop(runner, concurrency=1, duration=0.01, recorder=recorder)
+    report = recorder.report(elapsed=1.0)
+    for endpoint in BRAND_FLOW + ['flow']:
+        assert report[endpoint]['count'] >= 1, endpoint
+        assert report[endpoint]['errors'] == 0, (endpoint, report[endpoint]['error_kinds'])
@@ -0,0 +1,166 @@
+import io
+import json
+import tracemalloc
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from werkzeug.test import EnvironBuilder
+
+import app
+import memory_utils
+from http_utils import _strip_keys
+from memory_utils import MIB, measure_peak, request_peak_bytes
+
+# 16MB of incompressible pixel data, as the largest accepted upload
+IMAGE_SIDE = 2300
+DECODED_BYTES = IMAGE_SIDE * IMAGE_SIDE * 3
+
+# Peak memory allowed for storing and rendering a layout, in multiples of its JSON size
+STORE_BUDGET = 10
+PREVIEW_BUDGET = 5
+# A layout posted to /api/3d-preview is parsed, checked and sent to the viewer; measured at 16.6
+INLINE_PREVIEW_BUDGET = 18
+
+
+@pytest.fixture(scope='module')
+def large_png():
+    import numpy as np
+    import cv2
+    rng = np.random.RandomState(0)
+    encoded = cv2.imencode('.png', rng.randint(0, 256, (IMAGE_SIDE, IMAGE_SIDE, 3), dtype=np.uint8))[1]
+    return encoded.tobytes()
+
+
+@pytest.fixture
+def memory_client(tmp_path):
+    flask_app = app.create_app({'TESTING': True, 'UPLOAD_FOLDER': str(tmp_path)})
+    # Keep k-means cheap; the full-size decode is what is being measured
+    with patch.object(app.ai_processor, 'image_size', (32, 32)):
+        yield flask_app.test_client()
+
+
+def request_peak(client, **kwargs):
+    """Status and peak heap growth of one request, excluding building the request body"""
+    environ = EnvironBuilder(**kwargs).get_environ()
+    with measure_peak() as measurement:
+        response = client.open(environ)
+    return response.status_code, measurement.peak_bytes
+
+
+def test_measure_peak_captures_allocations():
+    """Test a temporary allocation counts towards the peak after it is freed"""
+    with measure_peak() as measurement:
+        data = bytearray(8 * MIB)
+        del data
+    assert 8 * MIB <= measurement.peak_bytes < 9 * MIB
+
+
+@pytest.fixture
+def stop_tracing():
+    # init_app leaves tracemalloc running, which would slow down the rest of the suite
+    yield
+    tracemalloc.stop()
+
+
+def test_init_app_records_request_peaks(monkeypatch, stop_tracing):
+    """Test MEMORY_TRACKING=1 records each request's peak by route"""
+    monkeypatch.setenv('MEMORY_TRACKING', '1')
+    flask_app = Flask(__name__)
+    memory_utils.init_app(flask_app)
+
+    @flask_app.route('/allocate/<int:size>')
+    def allocate(size):
+        return str(len(bytearray(size)))
+
+    before = request_peak_bytes.count(('/allocate/<int:size>',))
+    assert flask_app.test_client().get(f'/allocate/{4 * MIB}').status_code == 200
+    assert request_peak_bytes.count(('/allocate/<int:size>',)) == before + 1
+    lines = request_peak_bytes.exposition()
+    assert 'holobrand_request_peak_memory_bytes_bucket{endpoint="/allocate/<int:size>",le="1048576"} 0' in lines
+    assert 'holobrand_request_peak_memory_bytes_bucket{endpoint="/allocate/<int:size>",le="16777216"} 1' in lines
+
+
+def test_peak_tracker_skips_overlapping_requests(stop_tracing):
+    """Test a measurement that another request overlapped is discarded"""
+    tracemalloc.start()
+    tracker = memory_utils.PeakTracker()
+    assert tracker.begin()
+    assert not tracker.begin()
+    assert tracker.end(False) is None
+    assert tracker.end(True) is None
+    assert tracker.untracked == 2
+    
+    assert tracker.begin()
+    assert tracker.end(True) is not None
+    assert tracker.in_flight == 0
+
+
+def test_strip_keys_shares_untouched_subtrees():
+    """Test only the branches holding volatile keys are copied"""
+    catalog = [{'sku': str(index)} for index in range(3)]
+    value = {'catalog': catalog, 'meta': {'generated_timestamp': 'now', 'version': 1}}
+    stripped = _strip_keys(value, {'generated_timestamp'})
+    assert stripped == {'catalog': catalog, 'meta': {'version': 1}}
+    assert stripped['catalog'] is catalog
+    assert 'generated_timestamp' in value['meta']
+    assert _strip_keys(catalog, {'generated_timestamp'}) is catalog
+
+
+def test_upload_peak_memory(memory_client, large_png):
+    """Test a 16MB upload is checked and saved without a copy in memory"""
+    status, peak = request_peak(memory_client, path='/api/upload', method='POST',
+                                data={'file': (io.BytesIO(large_png), 'large.png')})
+    assert status == 200
+    assert peak < 4 * MIB
+
+
+def test_generate_layout_form_peak_memory(memory_client, large_png):
+    """Test a 16MB image sent with the layout form is streamed to disk and analyzed at one decoded copy"""
+    with patch.object(app.ai_processor, 'process_image', wraps=app.ai_processor.process_image) as process:
+        status, peak = request_peak(memory_client, path='/api/generate-layout', method='POST',
+                                    data={'image': (io.BytesIO(large_png), 'large.png'), 'brand_color': '#112233'})
+    assert status == 200
+    process.assert_called_once()
+    assert peak < DECODED_BYTES + 4 * MIB
+
+
+def test_3d_preview_image_peak_memory(memory_client, large_png, tmp_path):
+    """Test a 16MB image costs one decoded copy, not a second full-size color conversion"""
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'images' / 'large.png').write_bytes(large_png)
+    with patch.object(app.ai_processor, 'process_image', wraps=app.ai_processor.process_image) as process:
+        status, peak = request_peak(memory_client, path='/api/3d-preview', method='POST',
+                                    json={'layout': {'template': 'modern'}, 'image_filename': 'large.png'})
+    assert status == 200
+    process.assert_called_once()
+    assert DECODED_BYTES <= peak < DECODED_BYTES + 4 * MIB
+
+
+def large_layout():
+    layout = app.layout_generator.generate_layout('#112233', 'Arial', 'modern')
+    layout['catalog'] = [{'sku': f'sku-{index}', 'name': 'x' * 40, 'tags': ['a', 'b']} for index in range(60000)]
+    return layout
+
+
+def test_3d_preview_large_layout_peak_memory(memory_client):
+    """Test a large layout is not copied for every serialization step"""
+    layout = large_layout()
+    body_size = len(json.dumps({'layout': layout}))
+    status, peak = request_peak(memory_client, path='/api/3d-preview', method='POST', json={'layout': layout})
+    assert status == 200
+    assert peak < INLINE_PREVIEW_BUDGET * body_size
+
+
+def test_stored_preview_peak_memory(memory_client):
+    """Test storing and rendering a large layout stays within a few copies of it"""
+    layout = large_layout()
+    body_size = len(json.dumps(layout))
+    with patch.object(app.layout_store, 'max_layout_bytes', 16 * MIB):
+        status, peak = request_peak(memory_client, path='/api/layouts', method='POST', json=layout)
+        preview_url = memory_client.post('/api/layouts', json=layout).get_json()['preview_url']
+    assert status == 201
+    assert peak < STORE_BUDGET * body_size
+
+    status, peak = request_peak(memory_client, path=preview_url, method='GET')
+    assert status == 200
+    assert peak < PREVIEW_BUDGET * body_size
@@ -0,0 +1,72 @@
+import json
+import pytest
+import openai
+from unittest.mock import patch
+from openai_stub_server import OpenAIStubServer, LatencyModel
+from openai_utils import OpenAIPersonalizer
+
+@pytest.fixture
+def stub_server():
+    """Start a local OpenAI stand-in and point the openai client at it"""
+    with OpenAIStubServer(seed=1) as server:
+        with patch.object(openai, 'api_base', server.url), patch.object(openai, 'api_key', 'stub'):
+            yield server
+
+def test_latency_model_fixed():
+    """Test fixed latency distribution (milliseconds in, seconds out)"""
+    model = LatencyModel('fixed:250')
+    assert model.sample() == 0.25
+
+def test_latency_model_is_reproducible():
+    """Test seeded latency distributions produce the same samples"""
+    first = LatencyModel('lognormal:100,0.5', seed=7)
+    second = LatencyModel('lognormal:100,0.5', seed=7)
+    assert [first.sample() for _ in range(5)] == [second.sample() for _ in range(5)]
+
+def test_latency_model_invalid():
+    """Test unknown latency distributions are rejected"""
+    with pytest.raises(ValueError):
+        LatencyModel('pareto:1,2')
+
+def test_enhance_layout_with_ai_against_stub(stub_server):
+    """Test the personalizer parses canned JSON suggestions from the stand-in"""
+    layout_data = {'layout': {'sections': ['hero', 'products']}}
+    enhanced = OpenAIPersonalizer().enhance_layout_with_ai(layout_data, 'modern')
+
+    assert 'layout' in enhanced['ai_suggestions']
+    assert 'colors' in enhanced['ai_suggestions']
+    assert stub_server.request_count == 1
+
+def test_generate_style_description_against_stub(stub_server):
+    """Test the style description round trip through the stand-in"""
+    description = OpenAIPersonalizer().generate_style_description('elegant')
+    assert description.startswith('A refined eCommerce style')
+
+def test_streaming_response(stub_server):
+    """Test streamed chat completions reassemble into the canned reply"""
+    chunks = openai.ChatCompletion.create(
+        model='gpt-3.5-turbo',
+        messages=[{'role': 'user', 'content': 'Describe a modern style'}],
+        stream=True
+    )
+    text = ''.join(chunk.choices[0].delta.get('content', '') for chunk in chunks)
+    assert text.startswith('A refined eCommerce style')
+
+def test_injected_errors():
+    """Test the configured error rate surfaces as API errors"""
+    with OpenAIStubServer(error_rate=1.0) as server:
+        with patch.object(openai, 'api_base', server.url), patch.object(openai, 'api_key', 'stub'):
+            with pytest.raises(openai.error.APIError):
+                openai.ChatCompletion.create(
+                    model='gpt-3.5-turbo',
+                    messages=[{'role': 'user', 'content': 'hello'}]
+                )
+        assert server.error_count == 1
+
+def test_custom_responses():
+    """Test canned responses can be overridden"""
+    suggestions = json.dumps({'suggestions': {'layout': ['custom']}})
+    with OpenAIStubServer(responses={'suggestions': suggestions}) as server:
+        with patch.object(openai, 'api_base', server.url), patch.object(openai, 'api_key', 'stub'):
+            enhanced = OpenAIPersonalizer().enhance_layout_with_ai({}, 'modern')
+    assert enhanced['ai_suggestions'] == {'layout': ['custom']}
@@ -0,0 +1,122 @@
+import time
+import threading
+import pytest
+from unittest.mock import patch
+from flask import Flask
+
+import profiler_utils
+from profiler_utils import StackSampler, profile, request_profiles, to_collapsed, to_speedscope, is_idle
+from concurrency_utils import run_cpu_bound
+from resilience_utils import call_with_hedging
+
+ADMIN = {'Authorization': 'Bearer secret-token'}
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name='busy')
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret-token')
+
+def test_profile_finds_busy_thread(busy_thread):
+    """Test whole-process sampling sees a thread burning CPU"""
+    sampler = profile(0.2, interval=0.002)
+    assert sampler.samples > 0
+    collapsed = to_collapsed(sampler.counts)
+    assert 'busy_loop (test_profiler_utils.py:' in collapsed
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed.splitlines())
+
+def test_sampler_can_target_threads(busy_thread):
+    """Test sampling restricted to one thread ignores the others"""
+    sampler = StackSampler(0.002, thread_ids={threading.get_ident()}, include_idle=True).start()
+    time.sleep(0.05)
+    sampler.stop()
+    assert not any('busy_loop' in frame[0] for stack in sampler.counts for frame in stack)
+
+def test_idle_threads_are_skipped():
+    """Test parked threads are recognized by their leaf frame"""
+    assert is_idle((('run', 'threading.py', 1), ('wait', '/usr/lib/python3/threading.py', 2)))
+    assert not is_idle((('busy_loop', 'work.py', 1),))
+
+def test_speedscope_format(busy_thread):
+    """Test speedscope output references shared frames with weights in seconds"""
+    sampler = profile(0.1, interval=0.002)
+    document = to_speedscope(sampler)
+    frames = document['shared']['frames']
+    [profile_data] = document['profiles']
+    assert profile_data['type'] == 'sampled'
+    assert len(profile_data['samples']) == len(profile_data['weights'])
+    assert all(0 <= index < len(frames) for stack in profile_data['samples'] for index in stack)
+    assert profile_data['endValue'] == pytest.approx(sum(sampler.counts.values()) * 0.002)
+
+def test_admin_endpoints_disabled_without_token(client, monkeypatch):
+    """Test profiling is unavailable unless ADMIN_TOKEN is set"""
+    monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    assert client.get('/admin/profile?seconds=0.1').status_code == 404
+    response = client.get('/health', headers={'X-Profile': '1'})
+    assert 'X-Profile-Id' not in response.headers
+
+def test_process_profile_endpoint(client, admin, busy_thread):
+    """Test the admin endpoint samples for the requested time"""
+    assert client.get('/admin/profile?seconds=0.1').status_code == 401
+    response = client.get('/admin/profile?seconds=0.2&interval_ms=2', headers=ADMIN)
+    assert response.status_code == 200
+    assert 'busy_loop' in response.get_data(as_text=True)
+    speedscope = client.get('/admin/profile?seconds=0.1&format=speedscope', headers={'X-Admin-Token': 'secret-token'})
+    assert speedscope.json['profiles'][0]['type'] == 'sampled'
+
+def test_request_profile(client, admin):
+    """Test a request sent with X-Profile is profiled and retrievable by ID"""
+    def slow_layout(*args):
+        time.sleep(0.05)
+        return {'template': 'modern'}
+
+    with patch('app.layout_generator.generate_layout', side_effect=slow_layout):
+        response = client.post('/api/generate-layout', json={'brand_color': '#3366ff'},
+                               headers={**ADMIN, 'X-Profile': '1'})
+    profile_id = response.headers['X-Profile-Id']
+
+    collapsed = client.get(f'/admin/profiles/{profile_id}', headers=ADMIN).get_data(as_text=True)
+    assert 'generate_layout (app.py:' in collapsed
+    assert client.get('/admin/profiles/unknown', headers=ADMIN).status_code == 404
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+    return 'done'
+
+def test_request_profile_samples_pool_threads(admin):
+    """Test work a profiled request hands to the CPU and AI pools shows up in its profile"""
+    flask_app = Flask(__name__)
+    profiler_utils.init_app(flask_app)
+
+    @flask_app.route('/pools')
+    def pools():
+        run_cpu_bound(spin, 0.1)
+        call_with_hedging(lambda: spin(0.1), timeout=5.0)
+        return 'ok'
+
+    response = flask_app.test_client().get('/pools', headers={**ADMIN, 'X-Profile': '1'})
+    _, sampler = request_profiles.get(response.headers['X-Profile-Id'])
+    assert any(stack[-1][0] == 'spin' and any(frame[0] == '_worker' for frame in stack)
+               for stack in sampler.counts)
+    assert any('<lambda>' in [frame[0] for frame in stack] and any(frame[0] == '_worker' for frame in stack)
+               for stack in sampler.counts)
+
+def test_request_profile_rejects_non_positive_interval(client, admin):
+    """Test a zero or negative sampling interval is refused instead of busy-looping"""
+    for interval in ('0', '-5', 'fast'):
+        response = client.get('/health', headers={**ADMIN, 'X-Profile': '1', 'X-Profile-Interval-Ms': interval})
+        assert response.status_code == 400
+        assert 'X-Profile-Id' not in response.headers
@@ -0,0 +1,82 @@
+from unittest.mock import patch, MagicMock
+from prompt_cache import SemanticPromptCache, normalize_prompt, stem
+from openai_utils import OpenAIPersonalizer
+
+def test_stem():
+    """Test related word forms share a stem"""
+    assert stem('luxury') == stem('luxurious')
+    assert stem('minimal') == stem('minimalist')
+    assert stem('tech') == 'tech'
+
+def test_normalize_prompt():
+    """Test casing, punctuation, filler words and token order are canonicalized"""
+    assert normalize_prompt('luxury elegant') == normalize_prompt('Elegant, luxury!')
+    assert normalize_prompt('luxury elegant') == normalize_prompt('elegant luxurious look')
+    assert normalize_prompt('modern') != normalize_prompt('minimal')
+    assert normalize_prompt('') == ''
+
+def test_exact_canonical_hit():
+    """Test equivalent prompts share one cache entry"""
+    cache = SemanticPromptCache()
+    cache.put('luxury elegant', 'response')
+    
+    assert cache.get('Elegant, luxury!') == 'response'
+    assert cache.get('elegant luxurious look') == 'response'
+    assert cache.stats()['hits_exact'] == 2
+
+def test_near_duplicate_hit():
+    """Test MinHash/LSH lookup finds near-duplicate prompts above the threshold"""
+    cache = SemanticPromptCache(threshold=0.7)
+    cache.put('elegant luxury', 'response')
+    
+    assert cache.get('elegant luxurios') == 'response'
+    assert cache.get('modern tech') is None
+    stats = cache.stats()
+    assert stats['hits_similar'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+def test_threshold_one_disables_similarity():
+    """Test a threshold of 1.0 only serves exact canonical matches"""
+    cache = SemanticPromptCache(threshold=1.0)
+    cache.put('elegant luxury', 'response')
+    assert cache.get('elegant luxurios') is None
+
+def test_context_isolation():
+    """Test the same prompt with a different context is a miss"""
+    cache = SemanticPromptCache()
+    cache.put('modern', 'first', context='layout-1')
+    assert cache.get('modern', context='layout-2') is None
+    assert cache.get('modern', context='layout-1') == 'first'
+
+def test_lru_eviction():
+    """Test the least recently used entry is evicted at capacity"""
+    cache = SemanticPromptCache(max_entries=2)
+    cache.put('modern', 1)
+    cache.put('elegant', 2)
+    cache.get('modern')
+    cache.put('minimal', 3)
+    
+    assert cache.stats()['entries'] == 2
+    assert cache.get('elegant') is None
+    assert cache.get('modern') == 1
+
+@patch('openai.ChatCompletion.create')
+def test_personalizer_shares_equivalent_prompts(mock_openai_create):
+    """Test equivalent style prompts result in a single OpenAI call"""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "An elegant description."
+    mock_openai_create.return_value = mock_response
+    
+    personalizer = OpenAIPersonalizer()
+    for prompt in ['luxury elegant', 'Elegant, luxury!', 'elegant luxurious look']:
+        assert personalizer.generate_style_description(prompt) == "An elegant description."
+    
+    assert mock_openai_create.call_count == 1
+
+def test_cache_stats_endpoint(client):
+    """Test the prompt cache metrics endpoint"""
+    response = client.get('/api/ai/cache-stats')
+    assert response.status_code == 200
+    assert 'hit_rate' in response.json
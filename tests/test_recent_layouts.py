@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import patch
+from recent_layouts import RecentLayouts, CLIENT_COOKIE
+
+CLIENT = 'client-aaaaaaaa'
+
+@pytest.fixture
+def registry(tmp_path):
+    return RecentLayouts(str(tmp_path / 'layouts.db'), max_per_client=2, ttl_seconds=60)
+
+def test_latest_is_per_client(registry):
+    """Test each client sees only its own most recent layout"""
+    registry.record(CLIENT, 'layout-a', now=100)
+    registry.record('client-bbbbbbbb', 'layout-b', now=101)
+    assert registry.latest(CLIENT, now=102) == 'layout-a'
+    assert registry.latest('client-bbbbbbbb', now=102) == 'layout-b'
+    assert registry.latest('client-cccccccc', now=102) is None
+
+def test_entries_are_bounded_per_client(registry):
+    """Test only the newest entries are kept, and re-recording refreshes one"""
+    for offset, stored_id in enumerate(['one', 'two', 'three']):
+        registry.record(CLIENT, stored_id, now=100 + offset)
+    assert registry.recent(CLIENT, now=103) == ['three', 'two']
+    registry.record(CLIENT, 'two', now=104)
+    assert registry.recent(CLIENT, now=105) == ['two', 'three']
+
+def test_entries_expire(registry):
+    """Test entries past the TTL are hidden and purged"""
+    registry.record(CLIENT, 'old', now=100)
+    assert registry.latest(CLIENT, now=161) is None
+    registry.record('client-bbbbbbbb', 'new', now=200)
+    assert registry.conn.execute('SELECT COUNT(*) FROM recent_layouts').fetchone()[0] == 1
+
+def test_registry_is_shared_between_instances(registry, tmp_path):
+    """Test a second worker's registry sees what the first recorded"""
+    registry.record(CLIENT, 'shared')
+    assert RecentLayouts(str(tmp_path / 'layouts.db')).latest(CLIENT) == 'shared'
+
+def test_3d_preview_uses_clients_latest_layout(client, tmp_path):
+    """Test /api/3d-preview falls back to the layout this client generated last"""
+    with patch('app.recent_layouts', RecentLayouts(str(tmp_path / 'layouts.db'))), \
+            patch('app.layout_generator.generate_3d_preview_data', return_value={'scene': {}}) as preview:
+        client.post('/api/generate-layout', json={'brand_color': '#112233', 'style_prompt': 'elegant'},
+                    headers={'X-Client-Id': CLIENT})
+        client.post('/api/generate-layout', json={'brand_color': '#445566', 'style_prompt': 'modern'},
+                    headers={'X-Client-Id': 'client-bbbbbbbb'})
+        client.post('/api/3d-preview', json={}, headers={'X-Client-Id': CLIENT})
+
+    layout = preview.call_args[0][0]
+    assert layout['template'] == 'elegant'
+    assert layout['colors']['primary'] == '#112233'
+
+def test_3d_preview_by_layout_id(client):
+    """Test a stored layout can be referenced explicitly, and unknown IDs are rejected"""
+    stored_id = client.post('/api/layouts', json={'template': 'minimal'}).json['layout_id']
+    with patch('app.layout_generator.generate_3d_preview_data', return_value={'scene': {}}) as preview:
+        client.post('/api/3d-preview', json={'layout_id': stored_id})
+        missing = client.post('/api/3d-preview', json={'layout_id': 'unknown'})
+    assert preview.call_args[0][0]['template'] == 'minimal'
+    assert missing.status_code == 404
+
+def test_generate_layout_issues_client_cookie(client):
+    """Test clients without an ID get a cookie that identifies them afterwards"""
+    response = client.post('/api/generate-layout', json={'brand_color': '#3366ff'})
+    assert CLIENT_COOKIE in response.headers['Set-Cookie']
+    recent = client.get('/api/layouts/recent').json['layouts']
+    assert recent[0]['layout_id'] == response.json['layout_id']
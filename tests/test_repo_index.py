@@ -0,0 +1,118 @@
+import os
+import time
+import pytest
+import requests_mock
+from unittest.mock import patch
+from repo_index import RepoIndex, build_fts_query
+from github_utils import GitHubIntegration, GitHubRateLimitError
+
+REPOS = [
+    {'id': 1, 'name': 'brand-kit', 'full_name': 'acme/brand-kit',
+     'description': 'Logos and brand guidelines', 'topics': ['branding', 'design'], 'language': 'CSS'},
+    {'id': 2, 'name': 'storefront', 'full_name': 'acme/storefront',
+     'description': 'eCommerce storefront in Python', 'topics': ['ecommerce'], 'language': 'Python'},
+    {'id': 3, 'name': 'holo-viewer', 'full_name': 'acme/holo-viewer',
+     'description': '3D product viewer', 'topics': ['3d', 'unreal'], 'language': 'C++'}
+]
+
+@pytest.fixture
+def repo_index():
+    """Create an in-memory repository index"""
+    index = RepoIndex(':memory:')
+    index.upsert(REPOS)
+    return index
+
+@pytest.fixture
+def github_integration(repo_index):
+    """Create a GitHubIntegration backed by the local index"""
+    with patch.dict(os.environ, {"GITHUB_TOKEN": "test_token"}):
+        integration = GitHubIntegration()
+    integration.repo_index = repo_index
+    return integration
+
+def test_build_fts_query():
+    """Test GitHub queries translate to FTS5 expressions"""
+    assert build_fts_query('brand kit') == '"brand"* AND "kit"*'
+    assert build_fts_query('viewer language:python') == '"viewer"* AND language : ("python")'
+    assert build_fts_query('stars:>100') is None
+    assert build_fts_query('') is None
+
+def test_search_name_description_topics(repo_index):
+    """Test name, description and topic matches"""
+    assert [r['id'] for r in repo_index.search('brand')] == [1]
+    assert [r['id'] for r in repo_index.search('ecommerce')] == [2]
+    assert [r['id'] for r in repo_index.search('unreal')] == [3]
+    assert [r['id'] for r in repo_index.search('language:python')] == [2]
+    assert repo_index.search('org:acme') is None
+
+def test_search_is_fast(repo_index):
+    """Test local searches over a few thousand repositories answer without going to disk"""
+    repo_index.upsert([{'id': 100 + i, 'name': f'repo{i}', 'full_name': f'acme/repo{i}',
+                        'description': 'generated repository'} for i in range(2000)])
+    start = time.perf_counter()
+    results = repo_index.search('generated', limit=50)
+    assert len(results) == 50
+    # Generous bound: a full scan of the JSON rows would still be far slower than this on CI
+    assert time.perf_counter() - start < 0.5
+
+def test_upsert_and_remove(repo_index):
+    """Test repositories can be updated and removed"""
+    repo_index.upsert([{**REPOS[0], 'description': 'Renamed palette assets'}])
+    assert repo_index.search('guidelines') == []
+    assert [r['id'] for r in repo_index.search('palette')] == [1]
+    
+    assert repo_index.remove('acme/brand-kit') is True
+    assert repo_index.get('acme/brand-kit') is None
+    assert repo_index.count() == 2
+
+def test_fresh_query_answered_locally(github_integration):
+    """Test a recently refreshed query does not go to GitHub"""
+    github_integration.repo_index.mark_refreshed('brand', [REPOS[0]])
+    with requests_mock.Mocker() as mocker:
+        results = github_integration.search_repositories('brand')
+        assert mocker.call_count == 0
+    assert [r['id'] for r in results] == [1]
+
+def test_refreshed_query_returns_its_own_results(repo_index):
+    """Test a refreshed query returns GitHub's results for it, not every full-text match"""
+    repo_index.mark_refreshed('viewer stars:>100', [REPOS[2], REPOS[0]])
+    repo_index.upsert([{'id': 4, 'name': 'viewer-demo', 'full_name': 'other/viewer-demo', 'description': 'viewer'}])
+    assert [r['id'] for r in repo_index.search('viewer stars:>100')] == [3, 1]
+    assert [r['id'] for r in repo_index.search('viewer  STARS:>100', limit=1)] == [3]
+    assert {r['id'] for r in repo_index.search('viewer')} == {3, 4}
+
+    repo_index.remove('acme/holo-viewer')
+    assert [r['id'] for r in repo_index.search('viewer stars:>100')] == [1]
+
+def test_unseen_query_goes_to_github_and_is_indexed(github_integration):
+    """Test novel queries are fetched from GitHub and stored"""
+    new_repo = {'id': 9, 'name': 'palette', 'full_name': 'acme/palette', 'description': 'Color tools'}
+    with requests_mock.Mocker() as mocker:
+        mocker.get('https://api.github.com/search/repositories', json={'items': [new_repo]})
+        assert github_integration.search_repositories('palette') == [new_repo]
+        # The second call is served from the index
+        assert github_integration.search_repositories('palette') == [new_repo]
+        assert mocker.call_count == 1
+
+def test_stale_query_refreshes_in_background(github_integration):
+    """Test stale results are served immediately while a refresh runs"""
+    github_integration.repo_index.mark_refreshed('brand', [REPOS[0]])
+    github_integration.index_max_age = 0
+    with requests_mock.Mocker() as mocker:
+        mocker.get('https://api.github.com/search/repositories', json={'items': [REPOS[0]]})
+        assert [r['id'] for r in github_integration.search_repositories('brand')] == [1]
+        for _ in range(100):
+            if mocker.call_count:
+                break
+            time.sleep(0.01)
+        assert mocker.call_count == 1
+
+def test_rate_limited_search_served_locally(github_integration):
+    """Test searches keep working from the index while GitHub rate limits us"""
+    github_integration.rate_limiter.update({
+        'X-RateLimit-Limit': '30', 'X-RateLimit-Remaining': '0',
+        'X-RateLimit-Reset': str(int(time.time()) + 600)
+    }, 'search')
+    assert [r['id'] for r in github_integration.search_repositories('viewer')] == [3]
+    with pytest.raises(GitHubRateLimitError):
+        github_integration.search_repositories('nothing-matches-this')
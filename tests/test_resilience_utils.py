@@ -0,0 +1,131 @@
+import os
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from resilience_utils import AIUnavailableError, CircuitBreaker, DeadlineExceededError, LatencyBudget, call_with_hedging
+from openai_utils import OpenAIPersonalizer
+from layout_generator import LayoutGenerator
+from style_library import StyleLibrary
+
+def test_latency_budget():
+    """Test budget creation and expiry"""
+    assert LatencyBudget.from_ms(0) is None
+    assert LatencyBudget.from_ms(None) is None
+    
+    budget = LatencyBudget.from_ms(1000)
+    assert 0 < budget.remaining() <= 1.0
+    assert not budget.expired()
+    
+    budget = LatencyBudget(0)
+    assert budget.expired()
+    assert budget.remaining() == 0
+
+def test_circuit_breaker_opens_after_failures():
+    """Test the breaker opens after consecutive failures"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_circuit_breaker_half_open_trial():
+    """Test a single trial call is allowed after the reset timeout"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_call_with_hedging_direct():
+    """Test calls without timeout or hedging run inline"""
+    assert call_with_hedging(lambda: 42) == 42
+
+def test_call_with_hedging_timeout():
+    """Test slow calls are abandoned at the deadline"""
+    with pytest.raises(TimeoutError):
+        call_with_hedging(lambda: time.sleep(0.5), timeout=0.05)
+
+def test_call_with_hedging_hedges_slow_attempt():
+    """Test a hedged attempt wins when the first one is slow"""
+    delays = iter([0.5, 0.0])
+    
+    def call():
+        delay = next(delays)
+        time.sleep(delay)
+        return delay
+    
+    start = time.monotonic()
+    assert call_with_hedging(call, timeout=1.0, hedge_after=0.05) == 0.0
+    assert time.monotonic() - start < 0.4
+
+def test_call_with_hedging_retries_failure():
+    """Test a failed attempt is retried when hedging is enabled"""
+    func = MagicMock(side_effect=[Exception("boom"), "ok"])
+    assert call_with_hedging(func, timeout=1.0, hedge_after=0.5) == "ok"
+
+@patch('openai.ChatCompletion.create')
+def test_personalizer_circuit_breaker(mock_openai_create):
+    """Test the personalizer stops calling OpenAI once the breaker opens"""
+    mock_openai_create.side_effect = Exception("API error")
+    personalizer = OpenAIPersonalizer()
+    personalizer.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    
+    for _ in range(4):
+        personalizer.generate_style_description("modern")
+    
+    assert mock_openai_create.call_count == 2
+    with pytest.raises(AIUnavailableError):
+        personalizer.request_style_description("modern")
+
+def test_call_with_hedging_does_not_retry_without_hedging():
+    """Test a failed attempt is not repeated when hedging is off"""
+    func = MagicMock(side_effect=[Exception("boom"), "ok"])
+    with pytest.raises(Exception, match="boom"):
+        call_with_hedging(func, timeout=1.0)
+    assert func.call_count == 1
+
+@patch('openai.ChatCompletion.create')
+def test_budget_timeouts_do_not_open_breaker(mock_openai_create):
+    """Test running out of a client's budget is not counted as an OpenAI failure"""
+    mock_openai_create.side_effect = lambda **kwargs: time.sleep(0.2)
+    personalizer = OpenAIPersonalizer()
+    personalizer.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    
+    for _ in range(3):
+        with pytest.raises(DeadlineExceededError):
+            personalizer.request_style_description("modern", budget=LatencyBudget(0.02))
+    
+    assert personalizer.circuit_breaker.state == CircuitBreaker.CLOSED
+    assert personalizer.circuit_breaker.failures == 0
+
+@patch('openai.ChatCompletion.create')
+def test_personalizer_expired_budget(mock_openai_create):
+    """Test an exhausted budget skips the OpenAI call"""
+    personalizer = OpenAIPersonalizer()
+    with pytest.raises(AIUnavailableError):
+        personalizer.request_style_description("modern", budget=LatencyBudget(0))
+    mock_openai_create.assert_not_called()
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"})
+@patch('openai.ChatCompletion.create')
+def test_3d_preview_falls_back_when_budget_runs_out(mock_openai_create):
+    """Test the non-AI scene is returned when OpenAI exceeds the budget"""
+    mock_openai_create.side_effect = lambda **kwargs: time.sleep(0.5)
+    generator = LayoutGenerator()
+    generator.ai_personalizer.style_library = StyleLibrary()  # Nothing precomputed, so OpenAI is called live
+    layout = generator.generate_layout('#ff0000', 'Arial', 'modern')
+    image_features = {'dominant_colors': ['#ff0000'], 'brightness': 120, 'contrast': 40}
+    
+    start = time.monotonic()
+    preview = generator.generate_3d_preview_data(layout, image_features, budget=LatencyBudget(0.1))
+    
+    assert time.monotonic() - start < 0.4
+    assert preview['metadata']['ai_enhanced'] is False
+    assert 'ai_suggestions' not in preview
+    assert 'style_description' not in preview['metadata']
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import app
+import singleflight
+from singleflight import SingleFlight, file_digest, request_key
+
+
+def run_concurrently(count, func):
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(func) for _ in range(count)]
+        return [future.result() for future in futures]
+
+
+def wait_for_waiters(flight, count, timeout=5.0):
+    """Spin until `count` callers are waiting on a running call"""
+    deadline = time.monotonic() + timeout
+    while flight.stats()['shared'] < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_concurrent_duplicates_share_one_call():
+    """Test callers arriving while a call runs get its result without running it again"""
+    flight = SingleFlight('test')
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {'layout': 'shared'}
+
+    def caller():
+        return flight.do('key', compute)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(caller) for _ in range(4)]
+        wait_for_waiters(flight, 3)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'shared': 3, 'shared_across_processes': 0,
+                              'wait_timeouts': 0}
+
+
+def test_waiters_get_the_leaders_exception():
+    """Test a failed call fails its waiters too, and the next call runs again"""
+    flight = SingleFlight('test')
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError('kmeans failed')
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(flight.do, 'key', fail) for _ in range(2)]
+        wait_for_waiters(flight, 1)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+
+    assert flight.do('key', lambda: 'retried') == 'retried'
+
+
+def test_waiter_gives_up_after_timeout():
+    """Test a waiter computes the result itself when the running call takes too long"""
+    flight = SingleFlight('test')
+    release = threading.Event()
+
+    def hang():
+        release.wait(5)
+        return 'leader'
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(flight.do, 'key', hang)
+        while not flight.stats()['in_flight']:
+            time.sleep(0.005)
+        start = time.monotonic()
+        assert flight.do('key', lambda: 'own', timeout=0.05) == 'own'
+        assert time.monotonic() - start < 1.0
+        release.set()
+        assert leader.result() == 'leader'
+
+    assert flight.stats()['wait_timeouts'] == 1
+
+
+def test_different_keys_run_separately():
+    """Test only identical keys are coalesced"""
+    flight = SingleFlight('test')
+    assert [flight.do(key, lambda key=key: key * 2) for key in ('a', 'b')] == ['aa', 'bb']
+    assert flight.stats()['leaders'] == 2
+
+
+def test_waiting_worker_takes_result_across_processes(tmp_path):
+    """Test a second worker waits on the lock file and reads the first worker's result"""
+    # Two instances on one directory stand in for two worker processes
+    first = SingleFlight('test', str(tmp_path))
+    second = SingleFlight('test', str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        return {'scene': [1, 2, 3]}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(first.do, 'key', compute)
+        started.wait(5)
+        follower = executor.submit(second.do, 'key', lambda: pytest.fail('computed twice'))
+        time.sleep(0.1)  # let the follower block on the lock
+        release.set()
+        assert leader.result() == follower.result() == {'scene': [1, 2, 3]}
+
+    assert second.stats()['shared_across_processes'] == 1
+
+
+def test_no_handover_without_waiting_worker(tmp_path):
+    """Test results are only written to disk when another worker waits for them"""
+    flight = SingleFlight('test', str(tmp_path))
+    assert flight.do('key', lambda: {'scene': 'large'}) == {'scene': 'large'}
+    assert not list(tmp_path.glob('*.result'))
+
+
+def test_waiting_worker_ignores_results_of_other_runs(tmp_path):
+    """Test a result left by an earlier run is not taken for the run the worker waited on"""
+    first = SingleFlight('test', str(tmp_path))
+    second = SingleFlight('test', str(tmp_path))
+    first._write_result(str(tmp_path / 'test-key.result'), 'earlier-run', {'scene': 'stale'})
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        return {'scene': 'fresh'}
+
+    # The leader misses the waiter's marker, as when it arrives just after the check
+    with patch.object(first, '_write_result'), ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(first.do, 'key', compute)
+        started.wait(5)
+        follower = executor.submit(second.do, 'key', lambda: {'scene': 'own'})
+        time.sleep(0.1)
+        release.set()
+        assert leader.result() == {'scene': 'fresh'}
+        assert follower.result() == {'scene': 'own'}
+
+    assert second.stats()['shared_across_processes'] == 0
+
+
+def test_handover_is_json(tmp_path):
+    """Test handed-over results are written as JSON, never unpickled"""
+    flight = SingleFlight('test', str(tmp_path))
+    path = str(tmp_path / 'test-key.result')
+    flight._write_result(path, 'token', {'scene': [1, 2]})
+    assert json.loads((tmp_path / 'test-key.result').read_text()) == {'token': 'token', 'result': {'scene': [1, 2]}}
+    (tmp_path / 'test-key.result').write_bytes(b'\x80\x04not json')
+    assert flight._read_result(path, 'token') is singleflight._MISSING
+
+
+def test_waiting_worker_gives_up_after_timeout(tmp_path):
+    """Test a worker stops waiting for another worker's lock at its timeout"""
+    first = SingleFlight('test', str(tmp_path))
+    second = SingleFlight('test', str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+
+    def hang():
+        started.set()
+        release.wait(5)
+        return 'first'
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(first.do, 'key', hang)
+        started.wait(5)
+        assert second.do('key', lambda: 'own', timeout=0.05) == 'own'
+        release.set()
+        assert leader.result() == 'first'
+
+    assert second.stats()['wait_timeouts'] == 1
+
+
+def test_waiting_worker_computes_when_leader_fails(tmp_path):
+    """Test no result is handed over from a failed computation"""
+    first = SingleFlight('test', str(tmp_path))
+    second = SingleFlight('test', str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('viewer crashed')
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(first.do, 'key', fail)
+        started.wait(5)
+        follower = executor.submit(second.do, 'key', lambda: 'own result')
+        time.sleep(0.1)
+        release.set()
+        with pytest.raises(RuntimeError):
+            leader.result()
+        assert follower.result() == 'own result'
+
+
+def test_expired_results_are_not_reused(tmp_path):
+    """Test a worker that did not wait computes its own result"""
+    flight = SingleFlight('test', str(tmp_path), result_ttl=0.0)
+    assert flight.do('key', lambda: 'first') == 'first'
+    assert flight.do('key', lambda: 'second') == 'second'
+
+
+def test_request_key_is_canonical(tmp_path):
+    """Test key order and volatile keys do not change the request key"""
+    assert request_key({'a': 1, 'b': 2}, None) == request_key({'b': 2, 'a': 1}, None)
+    assert request_key({'a': 1, 'generated_timestamp': 'now'}) == request_key({'a': 1})
+    assert request_key({'a': 1}) != request_key({'a': 2})
+    image = tmp_path / 'product.png'
+    image.write_bytes(b'png')
+    assert file_digest(str(image)) == file_digest(str(image))
+
+
+def test_concurrent_3d_previews_build_one_scene(client):
+    """Test identical concurrent 3D preview requests share one scene build"""
+    calls = []
+
+    def slow_scene(layout, image_features=None, brand_analysis=None, budget=None):
+        calls.append(1)
+        time.sleep(0.3)
+        return {'3d_elements': [], 'camera_position': [0, 0, 5]}
+
+    with patch.object(app.layout_generator, 'generate_3d_preview_data', side_effect=slow_scene):
+        responses = run_concurrently(4, lambda: client.application.test_client().post(
+            '/api/3d-preview', json={'layout': {'template': 'modern', 'sections': ['hero']}}))
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len(calls) == 1
+    assert all(response.get_json()['layout_data']['colors'] for response in responses)
+
+
+def test_concurrent_layouts_for_same_image_share_one_generation(client):
+    """Test identical concurrent layout requests analyze the image and generate the layout once"""
+    with open(os.path.join(client.application.config['UPLOAD_FOLDER'], 'product.png'), 'wb') as f:
+        f.write(b'not decoded, process_image is patched')
+    processed = []
+
+    def slow_process(path):
+        processed.append(path)
+        time.sleep(0.3)
+        return {'dominant_colors': ['#112233'], 'brightness': 120.0, 'contrast': 40.0}
+
+    body = {'brand_color': '#112233', 'font': 'Arial', 'style_prompt': 'modern', 'image_filename': 'product.png'}
+    with patch.object(app.ai_processor, 'process_image', side_effect=slow_process), \
+            patch.object(app.layout_generator, 'generate_layout',
+                         wraps=app.layout_generator.generate_layout) as generate:
+        responses = run_concurrently(3, lambda: client.application.test_client().post(
+            '/api/generate-layout', json=body))
+
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len(processed) == 1
+    assert generate.call_count == 1
+    assert len({response.get_json()['layout_id'] for response in responses}) == 1
@@ -0,0 +1,46 @@
+import os
+import pytest
+from unittest.mock import patch
+from app import HEAVY_MODULES
+from benchmarks.import_time import best_of, parse_importtime
+
+# Startup budget for `import app` in a fresh interpreter; raise on slow CI machines
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '400'))
+
+# Wall-clock timing depends on the machine and its load, so it only runs on request
+# (`python run_tests.py --startup` sets this)
+startup_budget = pytest.mark.skipif(os.getenv('STARTUP_BUDGET_TEST') != '1',
+                                    reason='set STARTUP_BUDGET_TEST=1 or use run_tests.py --startup')
+
+@pytest.fixture(scope='module')
+def import_report():
+    return best_of('app', runs=3)
+
+def test_parse_importtime():
+    """Test `-X importtime` lines are parsed with their nesting depth"""
+    entries = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     _json\n"
+        "import time:      1500 |       1620 |   json\n"
+        "import time:      3000 |       4620 | app\n"
+    )
+    assert [(e['module'], e['depth']) for e in entries] == [('_json', 2), ('json', 1), ('app', 0)]
+    assert entries[-1]['cumulative_ms'] == 4.62
+
+def test_heavy_modules_imported_lazily(import_report):
+    """Test importing the app does not pull in OpenCV, NumPy, Pillow, openai or requests"""
+    loaded = set(import_report['loaded_modules'])
+    assert [name for name in HEAVY_MODULES if name in loaded] == []
+
+@startup_budget
+def test_import_within_budget(import_report):
+    """Test the app imports within the startup budget"""
+    assert import_report['total_ms'] < IMPORT_BUDGET_MS
+
+def test_config_loaded_once():
+    """Test .env is loaded by the first load_config() call only"""
+    import config
+    with patch.object(config, '_loaded', False), patch('dotenv.load_dotenv') as load_dotenv:
+        config.load_config()
+        config.load_config()
+    load_dotenv.assert_called_once()
@@ -0,0 +1,89 @@
+import os
+import json
+from unittest.mock import patch, MagicMock
+from style_library import (StyleLibrary, build_library, combinations, default_library,
+                           STYLE_LIBRARY_PATH, CATEGORIES)
+from ai_personalizer import AIPersonalizationEngine
+from layout_generator import LayoutGenerator
+from resilience_utils import LatencyBudget
+
+def test_shipped_library_covers_every_combination():
+    """Test the shipped data file has a description for every (template, category)"""
+    library = StyleLibrary.load(STYLE_LIBRARY_PATH)
+    assert library.version >= 1
+    for template, category in combinations():
+        assert library.get(template, category)
+
+def test_engine_categories_are_enumerated():
+    """Test every category the engine can suggest is in the library"""
+    engine = AIPersonalizationEngine()
+    assert set(engine.product_categories) <= set(CATEGORIES)
+    assert {'luxury', 'general'} <= set(CATEGORIES)
+
+def test_load_missing_file(tmp_path):
+    """Test a missing data file yields an empty library"""
+    library = StyleLibrary.load(str(tmp_path / 'missing.json'))
+    assert len(library) == 0
+    assert library.get('modern', 'fashion') is None
+
+def test_build_library(tmp_path):
+    """Test the build step writes a new version with every combination"""
+    output = str(tmp_path / 'styles.json')
+    personalizer = MagicMock()
+    personalizer.model = 'gpt-3.5-turbo'
+    personalizer.request_style_description.side_effect = lambda prompt: f"Description of {prompt}"
+    
+    data = build_library(personalizer, output, templates=['modern'], categories=['fashion', 'art'])
+    assert data['version'] == 1
+    assert set(data['descriptions']) == {'modern/fashion', 'modern/art'}
+    
+    # A rebuild bumps the version and keeps old entries for failed calls
+    personalizer.request_style_description.side_effect = Exception("API error")
+    data = build_library(personalizer, output, templates=['modern'], categories=['fashion'])
+    assert data['version'] == 2
+    assert data['descriptions']['modern/fashion'].startswith('Description of modern style')
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"})
+@patch('openai.ChatCompletion.create')
+def test_enhance_3d_layout_uses_library(mock_openai_create):
+    """Test known combinations are served from memory without calling OpenAI"""
+    engine = AIPersonalizationEngine()
+    layout = {'metadata': {'template': 'elegant'}}
+    
+    enhanced = engine.enhance_3d_layout(layout, {'suggested_category': 'jewelry'})
+    
+    mock_openai_create.assert_not_called()
+    assert enhanced['metadata']['style_description'] == default_library().get('elegant', 'jewelry')
+    assert enhanced['metadata']['style_source'] == 'library'
+    assert enhanced['metadata']['ai_enhanced'] is False
+
+@patch('openai.ChatCompletion.create')
+def test_3d_preview_keeps_library_description_within_budget(mock_openai_create):
+    """Test a library description is kept, and not reported as AI output, when a budget applies"""
+    generator = LayoutGenerator()
+    layout = generator.generate_layout('#ff0000', 'Arial', 'modern')
+    image_features = {'dominant_colors': ['#ff0000'], 'brightness': 120, 'contrast': 40}
+    
+    preview = generator.generate_3d_preview_data(layout, image_features, budget=LatencyBudget(5))
+    
+    mock_openai_create.assert_not_called()
+    assert preview['metadata']['style_source'] == 'library'
+    assert preview['metadata']['style_description']
+    assert preview['metadata']['ai_enhanced'] is False
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"})
+@patch('openai.ChatCompletion.create')
+def test_enhance_3d_layout_novel_prompt_goes_live(mock_openai_create):
+    """Test combinations outside the library fall back to live generation"""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "A retro description."
+    mock_openai_create.return_value = mock_response
+    engine = AIPersonalizationEngine()
+    
+    enhanced = engine.enhance_3d_layout({'metadata': {'template': 'retro'}})
+    
+    mock_openai_create.assert_called_once()
+    assert enhanced['metadata']['style_description'] == "A retro description."
+    assert enhanced['metadata']['style_source'] == 'openai'
+    assert enhanced['metadata']['ai_enhanced'] is True
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import subprocess
+import pytest
+from unittest.mock import patch
+from flask import Flask
+
+import timing_utils
+from timing_utils import Histogram, RequestTimings, add_labels, stage, timed, stage_seconds
+from concurrency_utils import run_cpu_bound
+
+@pytest.fixture
+def timing_app():
+    flask_app = Flask(__name__)
+    timing_utils.init_app(flask_app)
+
+    @flask_app.route('/work')
+    def work():
+        with stage('test.decode'):
+            time.sleep(0.01)
+        run_cpu_bound(slow_kmeans)
+        slow_kmeans()
+        return 'ok'
+
+    return flask_app
+
+@timed('test.kmeans')
+def slow_kmeans():
+    time.sleep(0.005)
+
+def test_histogram_buckets_are_cumulative():
+    """Test observations land in every bucket at or above them"""
+    histogram = Histogram('test_seconds', 'Test.', ('stage',), buckets=(0.1, 1.0))
+    histogram.observe(('a',), 0.05)
+    histogram.observe(('a',), 0.5)
+    histogram.observe(('a',), 5)
+    lines = histogram.exposition()
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="a"} 3' in lines
+    assert 'test_seconds_sum{stage="a"} 5.55' in lines
+
+def test_request_timings_accumulate():
+    """Test repeated stages add up in the Server-Timing header"""
+    timings = RequestTimings()
+    timings.add('image.decode', 1.0)
+    timings.add('image.kmeans', 2.5)
+    timings.add('image.decode', 1.5)
+    header = timings.header()
+    assert header.startswith('image.decode;dur=2.5, image.kmeans;dur=2.5, total;dur=')
+
+def test_stage_outside_request_feeds_histogram_only():
+    """Test stages work without a request context"""
+    before = stage_seconds.count(('test.standalone',))
+    with stage('test.standalone'):
+        pass
+    assert stage_seconds.count(('test.standalone',)) == before + 1
+    assert timing_utils.current_timings() is None
+
+def test_server_timing_header(timing_app):
+    """Test stages, including ones on the CPU pool, are reported per request"""
+    response = timing_app.test_client().get('/work')
+    entries = dict(entry.split(';dur=') for entry in response.headers['Server-Timing'].split(', '))
+    assert float(entries['test.decode']) >= 10
+    assert float(entries['test.kmeans']) >= 10  # two calls, one on another thread
+    assert float(entries['total']) >= float(entries['test.decode'])
+    assert timing_utils.current_timings() is None
+
+def test_server_timing_can_be_disabled(monkeypatch):
+    """Test SERVER_TIMING=0 keeps the header off while still recording metrics"""
+    monkeypatch.setenv('SERVER_TIMING', '0')
+    flask_app = Flask(__name__)
+    timing_utils.init_app(flask_app)
+    flask_app.add_url_rule('/ping', 'ping', lambda: 'pong')
+    response = flask_app.test_client().get('/ping')
+    assert 'Server-Timing' not in response.headers
+    assert timing_utils.request_seconds.count(('/ping', 'GET', '200')) >= 1
+
+def test_metrics_endpoint(client):
+    """Test /metrics exposes stage histograms and cache gauges"""
+    response = client.post('/api/generate-layout', json={'brand_color': '#3366ff', 'style_prompt': 'modern'})
+    assert 'layout.generate;dur=' in response.headers['Server-Timing']
+
+    metrics = client.get('/metrics')
+    body = metrics.get_data(as_text=True)
+    worker = f'worker="{os.getpid()}"'
+    assert metrics.mimetype == 'text/plain'
+    assert f'holobrand_stage_duration_seconds_count{{stage="layout.generate",{worker}}}' in body
+    assert ('holobrand_request_duration_seconds_count{endpoint="/api/generate-layout",'
+            f'method="POST",status="200",{worker}}}') in body
+    assert '# TYPE holobrand_prompt_cache_lookups_total counter' in body
+    assert f'holobrand_viewers{{state="running",{worker}}}' in body
+    assert f'holobrand_github_shed_requests_total{{{worker}}}' in body
+
+def test_add_labels():
+    """Test constant labels are added to samples with and without labels, not to comments"""
+    lines = ['# TYPE x counter', 'x 1', 'y{a="b"} 2']
+    assert add_labels(lines, {'worker': 7}) == ['# TYPE x counter', 'x{worker="7"} 1', 'y{a="b",worker="7"} 2']
+
+def test_core_modules_do_not_import_flask():
+    """Test processing modules that use timing_utils load without the web framework"""
+    code = 'import sys, timing_utils, ai_utils, openai_utils; sys.exit("flask" in sys.modules)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, '-c', code], cwd=root).returncode == 0
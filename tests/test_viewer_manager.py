@@ -0,0 +1,115 @@
+import sys
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from viewer_manager import ViewerManager, ViewerError, ViewerBusyError
+from tests.helpers import STUB_VIEWER
+
+def stub_command(*args):
+    return [sys.executable, STUB_VIEWER, '--ipc', *args]
+
+@pytest.fixture
+def make_manager():
+    managers = []
+    def make(*args, **kwargs):
+        manager = ViewerManager(stub_command(*args), **kwargs)
+        managers.append(manager)
+        return manager
+    yield make
+    for manager in managers:
+        manager.shutdown()
+
+SCENE = {'ui_elements': [{'type': 'header'}, {'type': 'button'}]}
+
+def test_viewer_is_reused(make_manager):
+    """Test consecutive previews are served by the same warm process"""
+    manager = make_manager(max_viewers=2)
+    first = manager.show('holobrand://a', SCENE)
+    second = manager.show('holobrand://b', SCENE)
+    assert first['status'] == 'shown'
+    assert first['elements'] == 2
+    assert first['pid'] == second['pid']
+    assert manager.stats()['started'] == 1
+
+def test_concurrency_is_capped(make_manager):
+    """Test concurrent previews never start more than max_viewers processes"""
+    manager = make_manager('--render-ms', '50', max_viewers=2)
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append(manager.show('holobrand://x', SCENE)))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(replies) == 6
+    assert len({reply['pid'] for reply in replies}) <= 2
+    assert manager.stats()['running'] <= 2
+
+def test_busy_viewers_time_out(make_manager):
+    """Test callers give up when every viewer stays busy"""
+    manager = make_manager(max_viewers=1, acquire_timeout=0.05)
+    viewer = manager.acquire()
+    with pytest.raises(ViewerBusyError):
+        manager.show('holobrand://x', SCENE)
+    manager.release(viewer)
+
+def test_crashed_viewer_is_replaced(make_manager):
+    """Test a viewer that died between previews is reaped and replaced"""
+    manager = make_manager('--crash-after', '2', max_viewers=1)
+    first = manager.show('holobrand://a', SCENE)  # ping + scene
+    second = manager.show('holobrand://b', SCENE)
+    assert first['pid'] != second['pid']
+    assert manager.stats()['reaped'] == 1
+
+def test_idle_viewers_are_reaped(make_manager):
+    """Test viewers unused for idle_timeout are stopped"""
+    manager = make_manager(idle_timeout=0.01)
+    manager.show('holobrand://a', SCENE)
+    viewer = manager.idle[0]
+    viewer.last_used -= 1
+    manager.reap()
+    assert manager.stats()['idle'] == 0
+    assert not viewer.alive()
+
+def test_start_failure(make_manager):
+    """Test a viewer command that cannot run raises ViewerError"""
+    manager = ViewerManager(['/nonexistent/HolobrandViewer.exe'])
+    with pytest.raises(ViewerError):
+        manager.show('holobrand://a', SCENE)
+    assert manager.stats()['running'] == 0
+
+def test_3d_preview_endpoint_uses_viewer(client):
+    """Test /api/3d-preview reports 503 when the viewers are saturated"""
+    with patch('app.viewer_manager.show', side_effect=ViewerBusyError('busy')):
+        response = client.post('/api/3d-preview', json={'layout': {'template': 'modern'}})
+    assert response.status_code == 503
+
+def test_legacy_launch_without_ipc_command():
+    """Test the bundled viewer is launched per preview unless an IPC command is configured"""
+    manager = ViewerManager([], launch_path='/opt/HolobrandViewer.exe')
+    assert manager.configured()
+    with patch('viewer_manager.subprocess.Popen') as popen:
+        popen.return_value.pid = 4321
+        reply = manager.show('holobrand://a', SCENE)
+    popen.assert_called_once_with(['/opt/HolobrandViewer.exe', 'holobrand://a'])
+    assert reply == {'status': 'launched', 'pid': 4321}
+    assert manager.stats()['running'] == 0
+    assert manager.stats()['launched'] == 1
+
+def test_legacy_launches_are_capped_and_reaped():
+    """Test one-off viewers are capped at max_viewers and reaped once they exit"""
+    manager = ViewerManager([], launch_path='/opt/HolobrandViewer.exe', max_viewers=2)
+    processes = [MagicMock(pid=pid) for pid in (1, 2, 3)]
+    for process in processes:
+        process.poll.return_value = None
+    with patch('viewer_manager.subprocess.Popen', side_effect=processes) as popen:
+        manager.show('holobrand://a', SCENE)
+        manager.show('holobrand://b', SCENE)
+        with pytest.raises(ViewerBusyError):
+            manager.show('holobrand://c', SCENE)
+        assert popen.call_count == 2
+        
+        processes[0].poll.return_value = 0
+        assert manager.show('holobrand://c', SCENE)['pid'] == 3
+    assert manager.stats()['launched'] == 2
+    assert manager.stats()['reaped'] == 1
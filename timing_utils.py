@@ -0,0 +1,225 @@
+"""
+Per-stage timing for requests
+
+Wrap a unit of work in `with stage('image.kmeans'):` or decorate it with
+`@timed('image.kmeans')`. Its duration is added to the current request's
+timings, which are sent back in a `Server-Timing` header, and to process-wide
+latency histograms. The histograms are exposed in Prometheus text format on
+`/metrics`. Stages that run outside a request (CLI tools, benchmarks) only feed
+the histograms.
+
+Histograms and counters are per process. `/metrics` labels every series with the
+worker's pid, so each worker's series stays monotonic whichever worker a scrape
+reaches; aggregate across workers in the query.
+
+Flask is imported only by `init_app`, so the processing modules that use `stage`
+and `timed` do not depend on the web framework.
+"""
+
+import os
+import math
+import time
+import threading
+import functools
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+# Histogram bucket upper bounds in seconds, from cache hits to OpenAI round trips
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimings:
+    """Stage durations accumulated during one request, possibly from several threads"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = OrderedDict()  # stage -> total milliseconds
+        self.lock = threading.Lock()
+
+    def add(self, name: str, milliseconds: float):
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + milliseconds
+
+    def header(self) -> str:
+        """Server-Timing header value, stages in first-seen order plus the total"""
+        with self.lock:
+            entries = [f'{name};dur={ms:.1f}' for name, ms in self.stages.items()]
+        entries.append(f'total;dur={(time.perf_counter() - self.start) * 1000:.1f}')
+        return ', '.join(entries)
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with labels, in the Prometheus model"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...],
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], seconds: float):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[index] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    def count(self, label_values: Tuple[str, ...]) -> int:
+        with self.lock:
+            series = self.series.get(label_values)
+            return series[len(self.buckets)] if series else 0
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def exposition(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = sorted(self.series.items())
+        for label_values, values in series:
+            labels = dict(zip(self.label_names, label_values))
+            for bound, count in zip(self.buckets, values):
+                lines.append(sample(f'{self.name}_bucket', count, {**labels, 'le': repr(bound)}))
+            lines.append(sample(f'{self.name}_bucket', values[len(self.buckets)], {**labels, 'le': '+Inf'}))
+            lines.append(sample(f'{self.name}_sum', values[-1], labels))
+            lines.append(sample(f'{self.name}_count', values[len(self.buckets)], labels))
+        return lines
+
+
+stage_seconds = Histogram('holobrand_stage_duration_seconds',
+                          'Duration of instrumented processing stages.', ('stage',))
+request_seconds = Histogram('holobrand_request_duration_seconds',
+                            'Duration of HTTP requests by route.', ('endpoint', 'method', 'status'))
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe((name,), elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed * 1000)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of `stage`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def sample(name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> str:
+    """One line of Prometheus text exposition"""
+    label_text = ''
+    if labels:
+        label_text = '{' + ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items()) + '}'
+    return f'{name}{label_text} {float(value):g}'
+
+
+def family(name: str, metric_type: str, documentation: str,
+           samples: List[Tuple[Dict[str, Any], float]]) -> List[str]:
+    """A metric family; `samples` is a list of (labels, value)"""
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {metric_type}']
+    lines.extend(sample(name, value, labels) for labels, value in samples)
+    return lines
+
+
+def gauge(name: str, documentation: str, samples: List[Tuple[Dict[str, Any], float]]) -> List[str]:
+    return family(name, 'gauge', documentation, samples)
+
+
+def counter(name: str, documentation: str, samples: List[Tuple[Dict[str, Any], float]]) -> List[str]:
+    return family(name, 'counter', documentation, samples)
+
+
+def add_labels(lines: List[str], labels: Dict[str, Any]) -> List[str]:
+    """Exposition `lines` with `labels` added to every sample, e.g. the worker's pid"""
+    extra = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+    labelled = []
+    for line in lines:
+        if not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            if series.endswith('}'):
+                series = f'{series[:-1]},{extra}}}'
+            else:
+                series = f'{series}{{{extra}}}'
+            line = f'{series} {value}'
+        labelled.append(line)
+    return labelled
+
+
+def init_app(flask_app: 'Flask'):
+    """Collect stage timings per request and report them in Server-Timing"""
+    from flask import g, request
+
+    send_header = os.getenv('SERVER_TIMING', '1') != '0'
+
+    @flask_app.before_request
+    def start_timings():
+        timings = RequestTimings()
+        g.timing_token = _current.set(timings)
+        g.timings = timings
+
+    @flask_app.after_request
+    def report_timings(response):
+        timings = g.pop('timings', None)
+        if timings is None:
+            return response
+        if send_header:
+            response.headers['Server-Timing'] = timings.header()
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_seconds.observe((endpoint, request.method, str(response.status_code)),
+                                time.perf_counter() - timings.start)
+        return response
+
+    @flask_app.teardown_request
+    def clear_timings(_exc):
+        token = g.pop('timing_token', None)
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Torn down in a different context than the one it was set in
+                _current.set(None)
@@ -0,0 +1,270 @@
+"""
+Pool of long-lived 3D viewer processes
+
+Starting the Unreal viewer pays for process and engine startup every time.
+When HOLOBRAND_VIEWER_CMD names a viewer that speaks the IPC protocol, e.g.
+`python viewer_stub.py --ipc`, viewers are started on demand and kept running.
+Scenes are sent to them as JSON lines over stdin, and each scene is acknowledged
+on stdout (see viewer_stub.py for the protocol). At most `max_viewers` processes
+run at once. Viewers that died or sat idle too long are reaped before each
+request.
+
+Without HOLOBRAND_VIEWER_CMD, the bundled HolobrandViewer.exe is launched once
+per preview with the preview URL as its argument, as before. The pool is opt-in
+because the bundled executable is not known to speak the protocol. One-off
+viewers are capped at `max_viewers` too, and reaped once they exit.
+"""
+
+import os
+import json
+import time
+import queue
+import shlex
+import subprocess
+import threading
+from typing import Dict, Any, List, Optional
+
+from timing_utils import stage, timed
+
+DEFAULT_VIEWER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   'unreal_assets', 'Brand_Visualizer', 'HolobrandViewer.exe')
+
+
+class ViewerError(Exception):
+    """A viewer failed to start, crashed or gave an invalid reply"""
+
+
+class ViewerBusyError(ViewerError):
+    """Every viewer stayed busy for the whole acquire timeout"""
+
+
+def default_viewer_command() -> Optional[List[str]]:
+    """The IPC viewer command from HOLOBRAND_VIEWER_CMD, if set"""
+    command = os.getenv('HOLOBRAND_VIEWER_CMD')
+    return shlex.split(command) if command else None
+
+
+def default_launch_path() -> Optional[str]:
+    """The bundled executable, launched per preview when no IPC viewer is configured"""
+    return DEFAULT_VIEWER_PATH if os.path.exists(DEFAULT_VIEWER_PATH) else None
+
+
+class ViewerProcess:
+    """One viewer process and its JSON-lines channel"""
+
+    def __init__(self, command: List[str]):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self.replies = queue.Queue()
+        self.next_id = 0
+        self.last_used = time.monotonic()
+        # Pipes cannot be polled portably, so a thread drains stdout into a queue
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def _read_replies(self):
+        for line in self.process.stdout:
+            self.replies.put(line)
+        self.replies.put(None)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def request(self, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Send one request and wait for the reply with the same id"""
+        self.next_id += 1
+        message = {**message, 'id': self.next_id}
+        try:
+            self.process.stdin.write(json.dumps(message, default=str) + '\n')
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise ViewerError(f'Viewer {self.pid} is not accepting requests: {e}')
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self.replies.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise ViewerError(f'Viewer {self.pid} did not reply within {timeout}s')
+            if line is None:
+                raise ViewerError(f'Viewer {self.pid} exited')
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue  # log output from the engine, not a reply
+            if isinstance(reply, dict) and reply.get('id') == message['id']:
+                self.last_used = time.monotonic()
+                return reply
+
+    def close(self, timeout: float = 5.0):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class ViewerManager:
+    """Bounded pool of warm viewer processes shared by request threads"""
+
+    def __init__(self, command: Optional[List[str]] = None, max_viewers: Optional[int] = None,
+                 idle_timeout: Optional[float] = None, start_timeout: Optional[float] = None,
+                 request_timeout: Optional[float] = None, acquire_timeout: Optional[float] = None,
+                 launch_path: Optional[str] = None):
+        self.command = command if command is not None else default_viewer_command()
+        # Used only without an IPC command
+        self.launch_path = launch_path if launch_path is not None else default_launch_path()
+        self.max_viewers = max(1, max_viewers or int(os.getenv('MAX_VIEWERS', '2')))
+        self.idle_timeout = idle_timeout or float(os.getenv('VIEWER_IDLE_SECONDS', '600'))
+        self.start_timeout = start_timeout or float(os.getenv('VIEWER_START_TIMEOUT', '30'))
+        self.request_timeout = request_timeout or float(os.getenv('VIEWER_REQUEST_TIMEOUT', '10'))
+        self.acquire_timeout = acquire_timeout or float(os.getenv('VIEWER_ACQUIRE_TIMEOUT', '5'))
+        self.reset()
+
+    def reset(self):
+        """Forget viewers inherited from a parent process; they stay owned by the parent"""
+        self.condition = threading.Condition()
+        self.idle = []  # warm viewers, most recently used last
+        self.running = 0  # idle + busy + starting
+        self.launched = []  # one-off viewer processes still running
+        self.started = 0
+        self.reaped = 0
+
+    def configured(self) -> bool:
+        return bool(self.command or self.launch_path)
+
+    def reap(self):
+        """Drop idle viewers that exited or have not been used for `idle_timeout`, and exited one-off viewers"""
+        now = time.monotonic()
+        with self.condition:
+            # poll() collects the exit status, so finished one-off viewers do not linger as zombies
+            running = [process for process in self.launched if process.poll() is None]
+            self.reaped += len(self.launched) - len(running)
+            self.launched = running
+            keep, expired = [], []
+            for viewer in self.idle:
+                if viewer.alive() and now - viewer.last_used < self.idle_timeout:
+                    keep.append(viewer)
+                else:
+                    expired.append(viewer)
+            self.idle = keep
+            self.running -= len(expired)
+            self.reaped += len(expired)
+            if expired:
+                self.condition.notify_all()
+        for viewer in expired:
+            viewer.close()
+
+    @timed('viewer.start')
+    def _start(self) -> ViewerProcess:
+        try:
+            viewer = ViewerProcess(self.command)
+        except OSError as e:
+            raise ViewerError(f'Failed to start viewer: {e}')
+        try:
+            viewer.request({'type': 'ping'}, self.start_timeout)
+        except ViewerError:
+            viewer.close(timeout=1.0)
+            raise
+        with self.condition:
+            self.started += 1
+        return viewer
+
+    def acquire(self) -> ViewerProcess:
+        """A warm viewer, a newly started one if under the cap, or wait for one to free up"""
+        self.reap()
+        deadline = time.monotonic() + self.acquire_timeout
+        with self.condition:
+            while not self.idle and self.running >= self.max_viewers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ViewerBusyError(f'All {self.max_viewers} viewers are busy')
+                self.condition.wait(remaining)
+            if self.idle:
+                return self.idle.pop()
+            self.running += 1
+
+        try:
+            return self._start()
+        except ViewerError:
+            with self.condition:
+                self.running -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, viewer: ViewerProcess, healthy: bool = True):
+        healthy = healthy and viewer.alive()
+        with self.condition:
+            if healthy:
+                self.idle.append(viewer)
+            else:
+                self.running -= 1
+                self.reaped += 1
+            self.condition.notify()
+        if not healthy:
+            viewer.close(timeout=1.0)
+
+    def show(self, preview_url: str, scene: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a scene to a viewer and return its acknowledgement"""
+        if not self.command:
+            if not self.launch_path:
+                raise ViewerError('No viewer command configured')
+            return self._launch(preview_url)
+        message = {'type': 'scene', 'url': preview_url, 'scene': scene}
+        # A warm viewer may have died since its last use; retry once on a fresh one
+        for attempt in range(2):
+            with stage('viewer.acquire'):
+                viewer = self.acquire()
+            try:
+                with stage('viewer.show'):
+                    reply = viewer.request(message, self.request_timeout)
+            except ViewerError:
+                self.release(viewer, healthy=False)
+                if attempt:
+                    raise
+                continue
+            self.release(viewer)
+            if reply.get('status') != 'shown':
+                raise ViewerError(reply.get('error') or f"Viewer replied {reply.get('status')}")
+            return reply
+
+    @timed('viewer.launch')
+    def _launch(self, preview_url: str) -> Dict[str, Any]:
+        """Start a one-off viewer for this preview; it reads the scene from the URL"""
+        self.reap()
+        with self.condition:
+            if len(self.launched) >= self.max_viewers:
+                raise ViewerBusyError(f'All {self.max_viewers} viewers are still open')
+            try:
+                process = subprocess.Popen([self.launch_path, preview_url])
+            except (subprocess.SubprocessError, OSError) as e:
+                raise ViewerError(f'Failed to launch viewer: {e}')
+            self.launched.append(process)
+            self.started += 1
+        return {'status': 'launched', 'pid': process.pid}
+
+    def shutdown(self):
+        """Stop every idle viewer"""
+        with self.condition:
+            viewers, self.idle = self.idle, []
+            self.running -= len(viewers)
+        for viewer in viewers:
+            viewer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.condition:
+            return {
+                'max_viewers': self.max_viewers,
+                'running': self.running,
+                'idle': len(self.idle),
+                'launched': len(self.launched),
+                'started': self.started,
+                'reaped': self.reaped
+            }
@@ -0,0 +1,80 @@
+"""
+Local stand-in for the HolobrandViewer Unreal executable
+
+Speaks the viewer's IPC protocol so the 3D preview path can be exercised and
+benchmarked on machines without the real engine. In `--ipc` mode it reads one
+JSON request per line on stdin and answers each on stdout:
+
+    -> {"id": 1, "type": "scene", "url": "holobrand://...", "scene": {...}}
+    <- {"id": 1, "status": "shown", "elements": 12, "pid": 4242}
+
+    -> {"id": 2, "type": "ping"}
+    <- {"id": 2, "status": "ok", "pid": 4242}
+
+Without `--ipc` it behaves like the legacy launcher: it starts up, "shows" the
+`holobrand://` URL given as an argument, and exits.
+
+Usage:
+    python viewer_stub.py --ipc [--startup-ms 800] [--render-ms 20] [--crash-after N]
+    python viewer_stub.py holobrand://<base64 layout> [--startup-ms 800]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, Any, Optional, List
+
+
+def handle(message: Dict[str, Any], render_ms: float) -> Dict[str, Any]:
+    reply = {'id': message.get('id'), 'pid': os.getpid()}
+    if message.get('type') == 'ping':
+        reply['status'] = 'ok'
+    elif message.get('type') == 'scene':
+        time.sleep(render_ms / 1000.0)
+        scene = message.get('scene') or {}
+        reply['status'] = 'shown'
+        reply['elements'] = len(scene.get('ui_elements', []))
+    else:
+        reply['status'] = 'error'
+        reply['error'] = f"Unknown request type: {message.get('type')}"
+    return reply
+
+
+def serve(stdin, stdout, render_ms: float, crash_after: Optional[int] = None):
+    """Answer requests line by line until stdin closes"""
+    for handled, line in enumerate(stdin):
+        if crash_after is not None and handled >= crash_after:
+            os._exit(1)
+        try:
+            reply = handle(json.loads(line), render_ms)
+        except ValueError as e:
+            reply = {'id': None, 'status': 'error', 'error': f'Invalid request: {e}'}
+        stdout.write(json.dumps(reply) + '\n')
+        stdout.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Stand-in for the HolobrandViewer executable')
+    parser.add_argument('url', nargs='?', help='holobrand:// URL to show once and exit')
+    parser.add_argument('--ipc', action='store_true', help='Serve JSON-lines requests on stdin')
+    parser.add_argument('--startup-ms', type=float, default=float(os.getenv('VIEWER_STUB_STARTUP_MS', '0')),
+                        help='Simulated engine startup time')
+    parser.add_argument('--render-ms', type=float, default=float(os.getenv('VIEWER_STUB_RENDER_MS', '0')),
+                        help='Simulated time to load a scene')
+    parser.add_argument('--crash-after', type=int, help='Exit abruptly after this many requests')
+    args = parser.parse_args(argv)
+
+    time.sleep(args.startup_ms / 1000.0)
+    if args.ipc:
+        serve(sys.stdin, sys.stdout, args.render_ms, args.crash_after)
+        return 0
+    if not args.url:
+        parser.error('a holobrand:// URL is required without --ipc')
+    time.sleep(args.render_ms / 1000.0)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
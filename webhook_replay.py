@@ -0,0 +1,67 @@
+"""
+Replay recorded GitHub webhook deliveries against a local HoloBrand server
+
+Each recording is a JSON file of the form
+    {"event": "push", "delivery": "<id>", "payload": {...}}
+
+Usage:
+    python webhook_replay.py tests/webhooks/*.json \\
+        [--url http://127.0.0.1:5000/api/github/webhook] [--secret $GITHUB_WEBHOOK_SECRET]
+"""
+
+import os
+import sys
+import json
+import uuid
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+from github_webhooks import sign_payload
+
+
+def load_delivery(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_request(delivery: Dict[str, Any], secret: str) -> Tuple[Dict[str, str], bytes]:
+    """Headers and body GitHub would send for a recorded delivery"""
+    body = json.dumps(delivery['payload']).encode()
+    headers = {
+        'Content-Type': 'application/json',
+        'X-GitHub-Event': delivery['event'],
+        'X-GitHub-Delivery': delivery.get('delivery') or str(uuid.uuid4()),
+        'X-Hub-Signature-256': sign_payload(secret, body)
+    }
+    return headers, body
+
+
+def replay(paths: List[str], url: str, secret: str, post=None) -> int:
+    """Post each recording in order; returns the number of failed deliveries"""
+    if post is None:
+        import requests
+        post = requests.post
+    failures = 0
+    for path in paths:
+        headers, body = build_request(load_delivery(path), secret)
+        response = post(url, data=body, headers=headers, timeout=10)
+        print(f"{os.path.basename(path)}: {response.status_code} {response.text.strip()}")
+        if response.status_code >= 300:
+            failures += 1
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replay recorded GitHub webhook deliveries')
+    parser.add_argument('recordings', nargs='+', help='Recorded delivery JSON files')
+    parser.add_argument('--url', default='http://127.0.0.1:5000/api/github/webhook')
+    parser.add_argument('--secret', default=os.getenv('GITHUB_WEBHOOK_SECRET'))
+    args = parser.parse_args(argv)
+
+    if not args.secret:
+        parser.error('a webhook secret is required (--secret or GITHUB_WEBHOOK_SECRET)')
+    return 1 if replay(args.recordings, args.url, args.secret) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
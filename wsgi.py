@@ -0,0 +1,14 @@
+"""
+Production WSGI entry point
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module builds the heavy services in app.py once, and imports
+the libraries app.py otherwise loads lazily; with `preload_app` the gunicorn
+master does so before forking workers.
+"""
+
+from app import create_app, preload_heavy_modules
+
+preload_heavy_modules()
+app = create_app()